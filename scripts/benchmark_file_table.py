@@ -0,0 +1,106 @@
+"""
+Compares the memory held by the per-file state of a synthetic monorepo of
+one million paths: a list of pathlib.Path objects with a dict of metadata
+per file, the file table built from discovery, and the file table loaded
+from disk.  Each variant runs in its own process.
+
+usage: poetry run python scripts/benchmark_file_table.py [number of paths]
+"""
+
+import importlib.util
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+TABLE_MODULE = Path(__file__).resolve().parent.parent / "src" / "file" / "file_table.py"
+
+
+def load_file_table_module():
+    # loaded on its own, the file package reads the command line on import
+    spec = importlib.util.spec_from_file_location("file_table", TABLE_MODULE)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def synthetic_paths(count: int):
+    """
+    Paths of a monorepo: services of packages of directories of 20 files.
+    """
+    for index in range(count):
+        directory = index // 20
+        yield (
+            f"services/service{directory // 2500}/pkg{directory // 50 % 50}/"
+            f"module{directory % 50}/file_{index % 20}_{index}.py"
+        )
+
+
+def resident_bytes():
+    try:
+        with open("/proc/self/statm", "r", encoding="utf-8") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # peak rather than current, in kilobytes on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def measure(variant: str, count: int, table_path: str):
+    file_table = load_file_table_module()
+    # one path per directory, looked up as scheduling and caching would
+    lookups = list(synthetic_paths(count))[::20] if variant == "load" else []
+    baseline = resident_bytes()
+    start_time = time.perf_counter()
+
+    if variant == "paths":
+        root = Path("/repository")
+        paths = [root / path for path in synthetic_paths(count)]
+        state = paths, {
+            path: {"size": 1000, "mtime": 0, "latency": None, "status": 0} for path in paths
+        }
+    elif variant == "table":
+        state = file_table.FileTable()
+        state.build((path, 1000, 0) for path in synthetic_paths(count))
+        state.save(table_path)
+    else:
+        state = file_table.FileTable.load(table_path)
+
+    seconds = time.perf_counter() - start_time
+    for path in lookups:
+        assert state.row(path) is not None
+    print(f"{(resident_bytes() - baseline) / 2**20:.1f} {seconds:.3f}")
+
+
+def main():
+    if len(sys.argv) == 5 and sys.argv[1] == "--measure":
+        measure(sys.argv[2], int(sys.argv[3]), sys.argv[4])
+        return
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+    with tempfile.TemporaryDirectory() as directory:
+        table_path = os.path.join(directory, "files.bin")
+        print(f"-> {count} paths")
+
+        for variant, label in (
+            ("paths", "Path list and metadata dicts"),
+            ("table", "file table, built"),
+            ("load", "file table, loaded and read"),
+        ):
+            output = subprocess.run(
+                [sys.executable, __file__, "--measure", variant, str(count), table_path],
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout.split()
+            print(f"   {label:<30} {output[0]:>8} MB RSS  {output[1]:>7}s")
+
+        print(f"   saved table {os.path.getsize(table_path) / 2**20:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+#!/bin/bash
+#
+# Times the CPU-side preparation of a run on a synthetic repository: reading
+# and parsing every file for the import graph, indexing the context and
+# building every prompt (--dry-run), with one process and with one per core.
+#
+# usage: scripts/benchmark_preprocess.sh [number of files, default 20000]
+
+set -o pipefail
+set -e
+
+__here="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+__root="$__here/../"
+
+#------------------------------------------------------------------------------
+
+cd "$__root"
+
+files="${1:-20000}"
+cores="$(poetry run python -c 'import os; print(os.cpu_count())')"
+repo="$(mktemp -d)"
+trap 'rm -rf "$repo"' EXIT
+
+# Python modules in packages of 100, each importing a few others
+poetry run python - "$repo" "$files" <<'EOF'
+import random
+import sys
+from pathlib import Path
+
+root, count = Path(sys.argv[1]), int(sys.argv[2])
+random.seed(0)
+
+for index in range(count):
+    package = root / "src" / f"package{index // 100}"
+    package.mkdir(parents=True, exist_ok=True)
+    imports = "\n".join(
+        f"from package{other // 100}.module{other} import Model{other}"
+        for other in random.sample(range(count), min(3, count))
+    )
+    body = "\n\n".join(
+        f"def handle_{index}_{n}(request, limit=10):\n"
+        f'    """Handle request {n} of model {index}."""\n'
+        f"    values = [value * {n} for value in range(limit)]\n"
+        f"    return Model{index}(request, sum(values))\n"
+        for n in range(20)
+    )
+    (package / f"module{index}.py").write_text(
+        f'"""Synthetic module {index}."""\n\n{imports}\n\n\n'
+        f"class Model{index}:\n    def __init__(self, request, total):\n"
+        f"        self.request = request\n        self.total = total\n\n\n{body}"
+    )
+EOF
+
+echo "-> ${files} files, ${cores} cores"
+
+for processes in 1 "$cores"; do
+    TIMEFORMAT="-> ${processes} processes: %Rs"
+    time (
+        USER_CWD="$repo" AI_PROVIDER=openai OPENAI_API_KEY=benchmark AI_MODEL=benchmark \
+            poetry run python src/main.py "$repo" "$repo/docs" \
+            --file-types py --dry-run --processes "$processes" > /dev/null
+    )
+done
@@ -5,6 +5,14 @@ This file contains the base class for an AI provider.
 import os
 import sys
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import PurePosixPath
+from config import config
+from analysis import context_index, estimate_tokens, extract_outline, import_graph
+from document import doc_summaries
+from document.update_doc import DELETE_SECTION, INTRODUCTION, NO_CHANGES
+from file import is_source_file, read_source, render_tree
+from run import metrics
 
 
 default_prompt = """
@@ -17,7 +25,7 @@ The file layout is as follows:
 {document_tree}
 
 {function_block}
-
+{prefetched_files}{related_files}
 The file you must document is: {file_name}
 
 Make sure to include explanations for all functions, classes, and key logic in the file.
@@ -29,6 +37,42 @@ Do not wrap the output in a code block.  Do not start your document with a headi
 """
 
 
+update_prompt = """
+You are a top tier software developer skilled at documenting and explaining code.
+You previously documented a file in a project named {project_name}, and the file has changed since.
+
+The file layout is as follows:
+{document_tree}
+
+{function_block}
+{prefetched_files}{related_files}
+The file you documented is: {file_name}
+
+Your previous documentation of {file_name}:
+----------------------------------------
+{previous_documentation}
+----------------------------------------
+
+The changes made to {file_name} since then, as a unified diff:
+----------------------------------------
+{diff}
+----------------------------------------
+
+Update the documentation for these changes.  Return only the sections that must change, each
+starting with its heading line exactly as it appears in the previous documentation, followed by
+the complete new text of the section up to the next heading.  The text before the first heading
+is the section headed "{introduction}".  A section with a new heading is inserted after the
+section you return before it.  To delete a section, return its heading followed by the single
+line "{delete_section}".  Leave out every section that is still accurate, and if the whole
+documentation is still accurate, return only "{no_changes}".  Do not wrap the output in a code
+block.
+
+{file_name} Contents:
+----------------------------------------
+{file_contents}
+"""
+
+
 class AIProvider(ABC):
     """
     Base class for an AI provider. Extend this class to add support for other providers.
@@ -42,6 +86,8 @@ class AIProvider(ABC):
         file_contents: str,
         notify_user_toast: str,
         tree: str,
+        model: str = None,
+        update=None,
     ):
         """
         Document a file.
@@ -50,6 +96,9 @@ class AIProvider(ABC):
         :param file_contents: The contents of the file.
         :param notify_user_toast: The toast notification to display to the user.
         :param tree: The tree structure of the project.
+        :param model: The model to use, defaults to the configured AI_MODEL.
+        :param update: A (previous documentation, diff) tuple to ask only for the
+            sections to change, or None to document the file from scratch.
         :return: The document created by the AI.
         """
 
@@ -60,30 +109,131 @@ class AIProvider(ABC):
         :return: The default function block as a string.
         """
         return """
-You may ask for the contents of any file in the project via function calling. Do not hesitate
-to ask for the contents of a file if it would help you document the file you are currently working on.
+You may ask for the contents of any files in the project via function calling. Do not hesitate
+to ask for the contents of files if it would help you document the file you are currently working on.
+Request all the files you need in a single call.  Files are returned as an outline of their
+signatures with line numbers; ask for detail "full", or for a line range, when you need the source.
+        """
+
+    @property
+    def prefers_prefix_locality(self):
+        """
+        Whether the provider keeps a prompt cache of its own, so that prompts
+        sharing a prefix should be sent back-to-back.
+        :return: False unless overridden.
+        """
+        return False
+
+    def last_model(self):
         """
+        The model that produced the documentation last returned to the
+        calling thread, for providers that choose the model themselves.
+        :return: The model name, or None if it is the configured AI_MODEL.
+        """
+        return None
+
+    def order_files(self, files):
+        """
+        Order files for documentation.  Dependencies still go first.
+        :param files: The files to document.
+        :return: The files in their preferred order.
+        """
+        return files
+
+    @property
+    def tool_parameters(self):
+        """
+        JSON schema of the arguments of the get_additional_files tool.
+        :return: The schema as a dict.
+        """
+        return {
+            "type": "object",
+            "properties": {
+                "files": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "file_path": {"type": "string"},
+                            "detail": {"type": "string", "enum": ["outline", "full"]},
+                            "start_line": {"type": "integer"},
+                            "end_line": {"type": "integer"},
+                        },
+                        "required": ["file_path"],
+                    },
+                },
+            },
+            "required": ["files"],
+        }
+
+    def tool_requests(self, name: str, args):
+        """
+        Normalize the arguments of a file tool call to a list of requests.
+        The single-file get_additional_file form is still accepted.
+        :return: A list of dicts with file_path and optional detail and line range.
+        """
+        if name == "get_additional_files":
+            return list(args.get("files", []))
+
+        if name == "get_additional_file":
+            return [{"file_path": args["file_path"]}]
+
+        sys.exit("Unknown tool call")
 
     def generate_prompt(
-        self, file_name: str, project_path: str, file_contents: str, tree: str
+        self,
+        file_name: str,
+        project_path: str,
+        file_contents: str,
+        tree: str,
+        update=None,
     ):
         """
         Generate a prompt for the user to provide documentation for a file.
+        :param update: A (previous documentation, diff) tuple for an update prompt.
         :return: The prompt.
         """
-        from config import config
-
         custom_prompt_template = default_prompt
 
         if config.ai_prompt:
             custom_prompt_template = config.ai_prompt
 
+        # an update keeps the wording of the previous documentation, so it
+        # does not use the custom prompt
+        update_values = {}
+        if update is not None:
+            custom_prompt_template = update_prompt
+            update_values = {
+                "previous_documentation": update[0],
+                "diff": update[1],
+                "introduction": INTRODUCTION,
+                "delete_section": DELETE_SECTION,
+                "no_changes": NO_CHANGES,
+            }
+
+        file = PurePosixPath(str(project_path), file_name).as_posix()
+        dependencies = import_graph.dependencies(file)
+        related = context_index.related(
+            file, file_contents, config.related_files, exclude=dependencies
+        )
+
         prompt = custom_prompt_template.format(
             project_name=config.project_name,
-            document_tree=tree,
+            document_tree=self.generate_document_tree(
+                file, tree, dependencies + [path for path, _ in related]
+            ),
             file_name=f"{project_path}/{file_name}",
             file_contents=file_contents,
             function_block=self.function_block,
+            prefetched_files=self.generate_prefetched_files(
+                import_graph.prefetch(
+                    file,
+                    config.prefetch_token_budget,
+                    self.read_context_file,
+                )
+            ),
+            related_files=self.generate_related_files(related),
+            **update_values,
         )
 
         if config.prompt_debug:
@@ -92,26 +242,238 @@ to ask for the contents of a file if it would help you document the file you are
 
         return prompt
 
-    def retrieve_file_contents(self, file_path: str):
+    def generate_prefetched_files(self, prefetched):
+        """
+        Render the local dependencies selected by the import graph.
+        :param prefetched: A list of (path, contents) tuples.
+        :return: The prompt section, or an empty string.
+        """
+        metrics.add("prefetched_files", len(prefetched))
+
+        if not prefetched:
+            return ""
+
+        block = "\nThese local files are imported by the file you must document. "
+        block += "They are included here, so do not request them again.\n"
+
+        for path, contents in prefetched:
+            block += f"\n{path} Contents:\n"
+            block += "----------------------------------------\n"
+            block += f"{contents}\n"
+
+        return block
+
+    def generate_related_files(self, related):
+        """
+        Render the files ranked as related by the context index: their
+        outlines (or summaries, once documented) while the token budget lasts,
+        then their paths only.
+        :param related: A list of (path, score) tuples, best first.
+        :return: The prompt section, or an empty string.
+        """
+        metrics.add("related_files", len(related))
+
+        if not related:
+            return ""
+
+        block = (
+            "\nThese project files are likely related to the file you must document. "
+        )
+        block += "Request them if you need more than what is shown.\n"
+        token_budget = config.related_token_budget
+
+        for path, _ in related:
+            contents = self.generated_summary(path)
+
+            if contents is None:
+                try:
+                    contents = extract_outline(self.read_project_file(path), path)
+                except (OSError, UnicodeDecodeError, ValueError):
+                    contents = None
+
+            tokens = estimate_tokens(contents)
+            if contents and tokens <= token_budget:
+                token_budget -= tokens
+                block += f"\n{path} Outline:\n"
+                block += "----------------------------------------\n"
+                block += f"{contents}\n"
+            else:
+                block += f"\n{path}\n"
+
+        return block
+
+    def generate_document_tree(self, file: str, tree: str, shown):
+        """
+        The project tree for a prompt.  Trees larger than the token budget
+        are cut down to the file, its imports and its related files.
+        :param file: The file being documented.
+        :param tree: The rendered tree of the whole project.
+        :param shown: Paths of the files to keep in a cut down tree.
+        :return: The tree to put in the prompt.
+        """
+        if (
+            not config.tree_token_budget
+            or estimate_tokens(tree) <= config.tree_token_budget
+        ):
+            return tree
+
+        root_path = config.targets_root_path
+        files = [root_path / path for path in sorted({file, *shown})]
+
+        return (
+            render_tree(
+                [path for path in files if is_source_file(path)], False, True, root_path
+            )
+            + "(only the files related to this file are shown)\n"
+        )
+
+    def read_context_file(self, file_path: str):
+        """
+        The content to show the model for another project file: the summary of
+        its generated documentation when it was documented in this run,
+        otherwise its source.
+        :param file_path: The path to the file, relative to the project root.
+        :return: The content, or None if the file cannot be read.
+        """
+        summary = self.generated_summary(file_path)
+        if summary is not None:
+            return summary
+
+        try:
+            return self.read_project_file(file_path)
+        except (OSError, UnicodeDecodeError, ValueError):
+            return None
+
+    def retrieve_files(self, requests, notify_user_toast):
+        """
+        Retrieve several files concurrently for one tool round.
+        :param requests: A list of dicts with file_path and optional detail
+            ("outline" or "full") and start_line and end_line (1-based,
+            inclusive).  A line range always returns source.
+        :param notify_user_toast: A function to notify the user.
+        :return: A list of dicts with file_path and either contents or error,
+            in the order of the requests.
+        """
+        if not requests:
+            return []
+
+        # counted here, metrics are attributed to the calling thread
+        metrics.add("requested_files", len(requests))
+
+        paths = ", ".join(str(request.get("file_path")) for request in requests)
+        notify_user_toast(f"LLM requested additional files: {paths}")
+
+        def retrieve(request):
+            file_path = str(request.get("file_path"))
+            start_line = request.get("start_line")
+            end_line = request.get("end_line")
+
+            try:
+                source = self.read_project_file(file_path)
+
+                if start_line or end_line:
+                    lines = source.splitlines(keepends=True)
+                    contents = "".join(
+                        lines[
+                            max(int(start_line or 1), 1)
+                            - 1 : int(end_line or len(lines))
+                        ]
+                    )
+                else:
+                    contents = self.retrieve_file_contents(
+                        file_path, request.get("detail", "outline"), source
+                    )
+            except (OSError, UnicodeDecodeError, ValueError) as e:
+                return {"file_path": file_path, "error": str(e)}, 0
+
+            encoded = contents.encode("utf-8")
+            if len(encoded) > config.max_tool_file_bytes:
+                contents = encoded[: config.max_tool_file_bytes].decode(
+                    "utf-8", "ignore"
+                )
+                contents += "\n... [truncated, request a line range for more]"
+
+            return {"file_path": file_path, "contents": contents}, len(
+                source.encode("utf-8")
+            )
+
+        with ThreadPoolExecutor(max_workers=min(8, len(requests))) as executor:
+            retrieved = list(executor.map(retrieve, requests))
+
+        results = [result for result, _ in retrieved]
+        metrics.add("tool_source_bytes", sum(size for _, size in retrieved))
+        metrics.add(
+            "tool_bytes",
+            sum(len(result.get("contents", "").encode("utf-8")) for result in results),
+        )
+
+        return results
+
+    def retrieve_file_contents(
+        self, file_path: str, detail: str = "outline", source=None
+    ):
+        """
+        Retrieve the contents of a file requested by the model.  Unless the
+        full source is asked for, files that were already documented in this
+        run are returned as the summary of their documentation, and other
+        files as an outline of their signatures.  Both are much shorter than
+        the source.
+        :param file_path: The path to the file, relative to the project root.
+        :param detail: "outline" or "full".
+        :param source: The source of the file, if it was already read.
+        :return: The contents of the file.
+        """
+        if source is None:
+            source = self.read_project_file(file_path)
+
+        if detail == "full":
+            return source
+
+        summary = self.generated_summary(file_path)
+        if summary is not None:
+            return summary
+
+        outline = extract_outline(source, file_path)
+        if outline is None:
+            return source
+
+        return (
+            f'(Outline of {file_path}, request detail "full" or a line range '
+            f"for the source)\n{outline}"
+        )
+
+    def generated_summary(self, file_path: str):
+        """
+        The summary of the documentation generated for a file in this run.
+        :param file_path: The path to the file, relative to the project root.
+        :return: The labelled summary, or None.
+        """
+        summary = doc_summaries.get(file_path)
+        if summary is None:
+            return None
+
+        return f"(Summary of the generated documentation for {file_path})\n{summary}"
+
+    def read_project_file(self, file_path: str):
         """
-        Retrieve the contents of a file.
-        :param file_path: The path to the file.
+        Read the source of a project file.
+        :param file_path: The path to the file, relative to the project root.
         :return: The contents of the file.
         """
         # validate the file path is relative
-        if not os.path.isabs(file_path):
+        if os.path.isabs(file_path):
             raise ValueError("File path must be relative.")
 
         # validate the file path does not contain ".."
         if ".." in file_path:
             raise ValueError("File path cannot contain '..'.")
 
-        # convert the file path to an absolute path
-        file_path = os.path.abspath(file_path)
+        # convert the file path to an absolute path within the project
+        root_path = str(config.targets_root_path)
+        file_path = os.path.abspath(os.path.join(root_path, file_path))
 
-        # validate the file path is within the current directory
-        if not file_path.startswith(os.getcwd()):
-            raise ValueError("File path must be within the current directory.")
+        # validate the file path is within the project
+        if not file_path.startswith(root_path + os.sep):
+            raise ValueError("File path must be within the project.")
 
-        with open(file_path, "r") as file:
-            return file.read()
+        return read_source(file_path)
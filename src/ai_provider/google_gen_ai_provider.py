@@ -4,6 +4,8 @@ This module provides an AI provider for interacting with the Google GenAI API.
 
 import os
 import google.generativeai as genai
+from config import config
+from run import rate_limiter, request_policy
 from .ai_provider import AIProvider
 
 
@@ -23,7 +25,14 @@ class GoogleGenAIProvider(AIProvider):
         genai.configure(api_key=api_key)
 
     def document_file(
-        self, file_name, project_path, file_contents, notify_user_toast, tree
+        self,
+        file_name,
+        project_path,
+        file_contents,
+        notify_user_toast,
+        tree,
+        model=None,
+        update=None,
     ):
         """
         Documents a file using the Google GenAI API by providing the file path,
@@ -35,19 +44,30 @@ class GoogleGenAIProvider(AIProvider):
             file_contents (str): The contents of the file to be documented.
             notify_user_toast (function): A function to notify the user with a toast message.
             tree (QTreeWidget): The tree widget to update with the generated documentation
+            model (str): The model to use, defaults to the configured model.
+            update (tuple): The previous documentation and a diff of the file, to
+                ask for changed sections only.
 
         Returns:
             str: The generated documentation for the file.
         """
-        from config import config
-
-        prompt = self.generate_prompt(file_name, project_path, file_contents, tree)
+        prompt = self.generate_prompt(
+            file_name, project_path, file_contents, tree, update
+        )
 
         # Prepare the request payload for the chat API
         try:
-            model = genai.GenerativeModel(config.model)
+            model = model or config.model
+            generative_model = genai.GenerativeModel(model)
 
-            response = model.generate_content(prompt)
+            rate_limiter.acquire()
+            response = request_policy.call(
+                model,
+                # the client does not retry underneath the request policy
+                lambda timeout: generative_model.generate_content(
+                    prompt, request_options={"timeout": timeout, "retry": None}
+                ),
+            )
 
             # Extract and return the documentation from the response
             return response.text
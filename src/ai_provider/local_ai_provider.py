@@ -0,0 +1,292 @@
+"""
+This module provides an AI provider for local inference servers: Ollama and
+the llama.cpp server.
+"""
+
+import http.client
+import json
+import os
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+from config import config
+from run import rate_limiter, request_policy
+from .ai_provider import AIProvider
+from .tool_budget import FINAL_ANSWER_PROMPT, ToolBudget
+
+SYSTEM_MESSAGE = "You are a helpful assistant that documents code in detail."
+
+
+class LocalAIProvider(AIProvider):
+    """
+    AI provider for a local inference server.
+
+    Every worker thread keeps one persistent HTTP connection, and the server
+    is asked to keep the model loaded between requests.  Requests are limited
+    to the number of parallel slots of the server, since extra requests only
+    queue inside the server and evict each other's prompt cache.  With the
+    llama.cpp server, every request holds a slot of its own, preferably the
+    one its thread used last, so that the cached prompt prefix (the project
+    tree) is reused by the next file.
+    """
+
+    def __init__(self):
+        url = urlsplit(os.getenv("LOCAL_API_URL", "http://127.0.0.1:11434"))
+
+        self.host = url.hostname
+        self.port = url.port or (443 if url.scheme == "https" else 80)
+        self.https = url.scheme == "https"
+        self.base_path = url.path.rstrip("/")
+        self.flavor = os.getenv("LOCAL_API_FLAVOR", "ollama").lower()
+        self.keep_alive = os.getenv("LOCAL_KEEP_ALIVE", "30m")
+        self.num_ctx = int(os.getenv("LOCAL_NUM_CTX", "0"))
+        self.parallel = max(1, int(os.getenv("LOCAL_PARALLEL", "1")))
+
+        if self.flavor not in ("ollama", "llama.cpp"):
+            raise ValueError("LOCAL_API_FLAVOR must be 'ollama' or 'llama.cpp'.")
+
+        self._free_slots = list(range(self.parallel))
+        self._slots_changed = threading.Condition()
+        self._local = threading.local()
+
+        print(
+            f"-> Local {self.flavor} server at {url.geturl()}, "
+            f"{self.parallel} parallel requests"
+        )
+
+    @property
+    def prefers_prefix_locality(self):
+        return True
+
+    def document_file(
+        self,
+        file_name,
+        project_path,
+        file_contents,
+        notify_user_toast,
+        tree,
+        model=None,
+        update=None,
+    ):
+        """
+        Documents a file using the local inference server.
+
+        Args:
+            file_name (str): The name of the file to document.
+            project_path (str): The project path where the file is located.
+            file_contents (str): The contents of the file to be documented.
+            notify_user_toast (function): A function to notify the user with a toast message.
+            tree (dict): The tree structure of the project.
+            model (str): The model to use, defaults to the configured model.
+            update (tuple): The previous documentation and a diff of the file, to
+                ask for changed sections only.
+
+        Returns:
+            str: The generated documentation for the file.
+        """
+        prompt = self.generate_prompt(
+            file_name, project_path, file_contents, tree, update
+        )
+
+        messages = [
+            {"role": "system", "content": SYSTEM_MESSAGE},
+            {"role": "user", "content": prompt},
+        ]
+
+        return self.get_completions(messages, notify_user_toast, model)
+
+    def get_completions(self, messages, notify_user_toast, model=None):
+        model = model or config.model
+
+        tools = [
+            {
+                "type": "function",
+                "function": {
+                    "name": "get_additional_files",
+                    "description": (
+                        "Retrieve the contents of additional files required for documentation."
+                    ),
+                    "parameters": self.tool_parameters,
+                },
+            }
+        ]
+        budget = ToolBudget.from_config()
+
+        while True:
+            try:
+                # once a budget of the tool loop is used up, force a final answer
+                offered_tools = tools if budget.allows_tools() else None
+                if budget.final_answer_due():
+                    notify_user_toast(f"Tool budget used up after {budget.exhausted}")
+                    messages.append({"role": "user", "content": FINAL_ANSWER_PROMPT})
+                budget.record_request(json.dumps(messages, default=str))
+
+                # a hedge would only queue behind the same slots, and the
+                # socket timeout of the connection is the deadline
+                with self.slot():
+                    rate_limiter.acquire()
+                    message = request_policy.call(
+                        model,
+                        lambda _timeout: self.chat(model, messages, offered_tools),
+                        hedge=False,
+                    )
+
+                tool_calls = message.get("tool_calls") or []
+
+                if not tool_calls:
+                    return message.get("content")
+
+                budget.record_round()
+
+                if message.get("content"):
+                    notify_user_toast(message["content"])
+
+                # let the llm know what it requested
+                messages.append(message)
+
+                # answer every tool call of this round with one batch of reads
+                requests = [
+                    self.tool_requests(
+                        tool_call["function"]["name"],
+                        parse_arguments(tool_call["function"]["arguments"]),
+                    )
+                    for tool_call in tool_calls
+                ]
+                results = self.retrieve_files(
+                    [request for batch in requests for request in batch],
+                    notify_user_toast,
+                )
+
+                # the whole conversation is sent again, keep older files short
+                if budget.should_compact():
+                    budget.compact_messages(messages)
+
+                for tool_call, batch in zip(tool_calls, requests):
+                    # send the additional file contents to the llm
+                    messages.append(
+                        {
+                            "role": "tool",
+                            "tool_call_id": tool_call.get("id", ""),
+                            "tool_name": tool_call["function"]["name"],
+                            "content": json.dumps(results[: len(batch)]),
+                        }
+                    )
+                    results = results[len(batch) :]
+
+            except Exception as e:
+                print(f"Error occurred while generating documentation: {e}")
+                return None
+
+    def chat(self, model, messages, tools):
+        """
+        Send one chat request in the native format of the server.
+        :return: The assistant message as a dict.
+        """
+        if self.flavor == "ollama":
+            body = {
+                "model": model,
+                "messages": messages,
+                "stream": False,
+                "keep_alive": self.keep_alive,
+                "options": {"temperature": 0.7},
+            }
+            if self.num_ctx:
+                body["options"]["num_ctx"] = self.num_ctx
+            if tools:
+                body["tools"] = tools
+
+            return self.post("/api/chat", body)["message"]
+
+        body = {
+            "model": model,
+            "messages": messages,
+            "temperature": 0.7,
+            "max_tokens": 4096,
+            "cache_prompt": True,
+            "id_slot": self._local.slot_id,
+        }
+        if tools:
+            body["tools"] = tools
+
+        return self.post("/v1/chat/completions", body)["choices"][0]["message"]
+
+    def post(self, path: str, body):
+        """
+        POST a JSON body on the persistent connection of this thread, and
+        reconnect once if the server closed it.
+        """
+        payload = json.dumps(body).encode("utf-8")
+        headers = {"Content-Type": "application/json", "Connection": "keep-alive"}
+
+        for attempt in range(2):
+            connection = self.connection()
+            try:
+                connection.request("POST", self.base_path + path, payload, headers)
+                response = connection.getresponse()
+                data = response.read()
+                break
+            except TimeoutError:
+                # the late response would arrive on this connection
+                connection.close()
+                self._local.connection = None
+                raise
+            except (http.client.HTTPException, ConnectionError):
+                connection.close()
+                self._local.connection = None
+                if attempt:
+                    raise
+
+        if response.status != 200:
+            raise RuntimeError(
+                f"Local server returned {response.status}: {data.decode('utf-8', 'replace')}"
+            )
+
+        return json.loads(data)
+
+    def connection(self):
+        connection = getattr(self._local, "connection", None)
+
+        if connection is None:
+            connection_class = (
+                http.client.HTTPSConnection
+                if self.https
+                else http.client.HTTPConnection
+            )
+            connection = self._local.connection = connection_class(
+                self.host, self.port, timeout=config.request_timeout or None
+            )
+
+        return connection
+
+    @contextmanager
+    def slot(self):
+        """
+        Hold a slot of the server for one request, waiting for a free one.
+        No two requests share a slot, or they would overwrite each other's
+        cache.  The slot the thread used last is taken when it is free.
+        """
+        with self._slots_changed:
+            self._slots_changed.wait_for(lambda: self._free_slots)
+            slot_id = getattr(self._local, "slot_id", None)
+            if slot_id not in self._free_slots:
+                slot_id = self._free_slots[0]
+            self._free_slots.remove(slot_id)
+
+        self._local.slot_id = slot_id
+        try:
+            yield slot_id
+        finally:
+            with self._slots_changed:
+                self._free_slots.append(slot_id)
+                self._slots_changed.notify()
+
+
+def parse_arguments(arguments):
+    """
+    Ollama returns tool call arguments as an object, OpenAI-style servers as
+    a JSON string.
+    """
+    if isinstance(arguments, str):
+        return json.loads(arguments)
+
+    return arguments
@@ -0,0 +1,235 @@
+"""
+This module provides a routing layer that sends each file to a model tier
+chosen from its size, language and complexity.
+"""
+
+import threading
+import time
+from pathlib import PurePosixPath
+from config import config
+from analysis import estimate_tokens, count_definitions
+from file import guess_language_for_markdown, read_source
+from run import content_hash, metrics, request_policy, response_cache
+from .ai_provider import AIProvider
+
+# Data and markup formats are cheap to explain regardless of their length
+SIMPLE_LANGUAGES = {"json", "yaml", "xml", "markdown", "html", "css", ""}
+
+
+class ModelRouter(AIProvider):
+    """
+    Wraps an AI provider and picks a model per file.  Files that are small and
+    simple go to the fast tier, everything else goes to the strong tier.
+    """
+
+    def __init__(self, provider: AIProvider, fallback: AIProvider = None):
+        self.provider = provider
+        self._local = threading.local()
+        self.tiers = {
+            "strong": (config.model, parse_cost(config.model_cost)),
+        }
+        self.fallback = None
+
+        if config.model_fast:
+            self.tiers["fast"] = (config.model_fast, parse_cost(config.model_fast_cost))
+            print(f"-> Routing small files to {config.model_fast}")
+
+        if fallback is not None:
+            fallback_model = config.fallback_model or config.model
+            self.fallback = (
+                fallback,
+                fallback_model,
+                parse_cost(config.fallback_model_cost),
+            )
+            print(f"-> Falling back to {fallback_model} when requests keep timing out")
+
+    @property
+    def function_block(self):
+        return self.provider.function_block
+
+    @property
+    def prefers_prefix_locality(self):
+        return self.provider.prefers_prefix_locality
+
+    def last_model(self):
+        """
+        The model that produced the documentation last returned to the
+        calling thread: its tier's model, or the fallback model.
+        """
+        return getattr(self._local, "model", None)
+
+    def order_files(self, files):
+        """
+        For providers with a prompt cache, send the files of one tier, and
+        within it of one directory, back-to-back: the model stays loaded and
+        consecutive prompts share the tree and usually their prefetched
+        imports.
+        """
+        if not self.prefers_prefix_locality:
+            return files
+
+        def tier(file):
+            if "fast" not in self.tiers:
+                return "strong"
+            try:
+                return self.choose_tier(file.name, read_source(file))
+            except (OSError, UnicodeDecodeError):
+                return "strong"
+
+        return sorted(files, key=lambda file: (tier(file), str(file.parent)))
+
+    def choose_tier(self, file_name: str, file_contents: str) -> str:
+        """
+        Pick the tier for a file.
+        :param file_name: The name of the file.
+        :param file_contents: The contents of the file.
+        :return: The tier name.
+        """
+        if "fast" not in self.tiers:
+            return "strong"
+
+        tokens = estimate_tokens(file_contents)
+        language = guess_language_for_markdown(file_name)
+
+        if language in SIMPLE_LANGUAGES:
+            tokens //= 2
+
+        if tokens > config.routing_fast_max_tokens:
+            return "strong"
+
+        if (
+            count_definitions(file_contents, file_name)
+            > config.routing_fast_max_definitions
+        ):
+            return "strong"
+
+        return "fast"
+
+    def document_file(
+        self,
+        file_name,
+        project_path,
+        file_contents,
+        notify_user_toast,
+        tree,
+        model=None,
+        update=None,
+    ):
+        """
+        Documents a file with the model of the tier chosen for it and records
+        the latency, estimated tokens and estimated cost of the call.  Files
+        already documented from identical contents by this process are served
+        from the shared response cache.
+        """
+        tier = self.choose_tier(file_name, file_contents)
+        tier_model, costs = self.tiers[tier]
+        model = model or tier_model
+
+        key = f"{model}\0{project_path}/{file_name}\0{file_contents}"
+        if update is not None:
+            key += "\0" + "\0".join(update)
+        key = content_hash(key)
+        computed = []
+
+        arguments = {
+            "file_name": file_name,
+            "project_path": project_path,
+            "file_contents": file_contents,
+            "notify_user_toast": notify_user_toast,
+            "tree": tree,
+            "update": update,
+        }
+
+        # cached with the model that produced it, which is not the tier's
+        # model when it came from the fallback
+        def compute():
+            computed.append(True)
+
+            if self.fallback is not None and request_policy.is_failing(model):
+                return self.call_fallback(arguments)
+
+            documentation = self.call_provider(tier, model, costs, arguments)
+
+            # switch once the model timed out repeatedly, not on the first timeout
+            if (
+                documentation is None
+                and self.fallback is not None
+                and request_policy.timed_out()
+                and request_policy.is_failing(model)
+            ):
+                print(
+                    f"-> {model} keeps timing out, retrying {file_name} with the fallback"
+                )
+                return self.call_fallback(arguments)
+
+            return (documentation, model) if documentation else None
+
+        result = response_cache.get_or_compute(key, compute)
+
+        if not computed:
+            metrics.record_call("cached", model, latency=0.0)
+
+        documentation, self._local.model = result or (None, None)
+        return documentation
+
+    def call_fallback(self, arguments):
+        """
+        Send a file to the fallback provider and model.
+        :return: A (documentation, model) tuple, or None on failure.
+        """
+        provider, model, costs = self.fallback
+        documentation = self.call_provider(
+            "fallback", model, costs, arguments, provider
+        )
+
+        return (documentation, model) if documentation else None
+
+    def call_provider(self, tier, model, costs, arguments, provider=None):
+        """
+        Send a file to the wrapped provider, or the given one, and record
+        metrics for the call.
+        """
+        provider = provider or self.provider
+        input_cost, output_cost = costs
+        start_time = time.time()
+        documentation = None
+
+        try:
+            documentation = provider.document_file(model=model, **arguments)
+        finally:
+            input_tokens = estimate_tokens(
+                arguments["file_contents"]
+            ) + estimate_tokens(arguments["tree"])
+            if arguments["update"] is not None:
+                input_tokens += sum(
+                    estimate_tokens(text) for text in arguments["update"]
+                )
+            output_tokens = estimate_tokens(documentation)
+
+            metrics.record_call(
+                tier,
+                model,
+                file=PurePosixPath(
+                    str(arguments["project_path"]), arguments["file_name"]
+                ).as_posix(),
+                latency=time.time() - start_time,
+                input_tokens=input_tokens,
+                output_tokens=output_tokens,
+                cost=(input_tokens * input_cost + output_tokens * output_cost)
+                / 1_000_000,
+                failed=documentation is None,
+            )
+
+        return documentation
+
+
+def parse_cost(cost: str):
+    """
+    Parse an "input,output" price pair in USD per million tokens.
+    :return: A tuple of (input_cost, output_cost), zero when unset.
+    """
+    if not cost:
+        return 0.0, 0.0
+
+    input_cost, _, output_cost = cost.partition(",")
+    return float(input_cost), float(output_cost or input_cost)
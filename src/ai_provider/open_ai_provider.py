@@ -4,9 +4,11 @@ This module provides an AI provider for interacting with the OpenAI API.
 
 import json
 import os
-import sys
 import openai
+from config import config
+from run import rate_limiter, request_policy
 from .ai_provider import AIProvider
+from .tool_budget import FINAL_ANSWER_PROMPT, ToolBudget
 
 
 class OpenAIProvider(AIProvider):
@@ -20,13 +22,22 @@ class OpenAIProvider(AIProvider):
     def configure_openai(self):
         """
         Configures the OpenAI API using the environment variables
-        OPENAI_API_KEY and OPENAI_API_URL.
+        OPENAI_API_KEY and OPENAI_API_URL.  The client does not retry on its
+        own, timeouts and retries are left to the request policy.
         """
         openai.api_key = os.getenv("OPENAI_API_KEY")
         openai.base_url = os.getenv("OPENAI_API_URL")
+        openai.max_retries = 0
 
     def document_file(
-        self, file_name, project_path, file_contents, notify_user_toast, tree
+        self,
+        file_name,
+        project_path,
+        file_contents,
+        notify_user_toast,
+        tree,
+        model=None,
+        update=None,
     ):
         """
         Documents a file using the OpenAI API by providing the file path, file
@@ -38,12 +49,17 @@ class OpenAIProvider(AIProvider):
             file_contents (str): The contents of the file to be documented.
             notify_user_toast (function): A function to notify the user with a toast message.
             tree (dict): The tree structure of the project.
+            model (str): The model to use, defaults to the configured model.
+            update (tuple): The previous documentation and a diff of the file, to
+                ask for changed sections only.
 
         Returns:
             str: The generated documentation for the file.
         """
 
-        prompt = self.generate_prompt(file_name, project_path, file_contents, tree)
+        prompt = self.generate_prompt(
+            file_name, project_path, file_contents, tree, update
+        )
 
         # Prepare the message for the chat completion API
         messages = [
@@ -54,43 +70,51 @@ class OpenAIProvider(AIProvider):
             {"role": "user", "content": prompt},
         ]
 
-        return self.get_completions(messages, notify_user_toast)
+        return self.get_completions(messages, notify_user_toast, model)
 
-    def get_completions(self, messages, notify_user_toast):
-        from config import config
+    def get_completions(self, messages, notify_user_toast, model=None):
+        model = model or config.model
 
         tools = [
             {
                 "type": "function",
                 "function": {
-                    "name": "get_additional_file",
-                    "description": "Retrieve the contents of an additional files required for documentation.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "file_path": {
-                                "type": "string",
-                            },
-                        },
-                        "required": ["file_path"],
-                        "additionalProperties": False,
-                    },
+                    "name": "get_additional_files",
+                    "description": (
+                        "Retrieve the contents of additional files required for documentation."
+                    ),
+                    "parameters": self.tool_parameters,
                 },
             }
         ]
+        budget = ToolBudget.from_config()
 
         while True:
             try:
-                response = openai.chat.completions.create(
-                    model=config.model,
-                    messages=messages,
-                    tools=tools,
-                    max_tokens=4096,
-                    temperature=0.7,
-                    n=1,
+                # once a budget of the tool loop is used up, force a final answer
+                tool_choice = "auto" if budget.allows_tools() else "none"
+                if budget.final_answer_due():
+                    notify_user_toast(f"Tool budget used up after {budget.exhausted}")
+                    messages.append({"role": "user", "content": FINAL_ANSWER_PROMPT})
+                budget.record_request(json.dumps(messages, default=str))
+
+                rate_limiter.acquire()
+                response = request_policy.call(
+                    model,
+                    lambda timeout: openai.chat.completions.create(
+                        model=model,
+                        messages=messages,
+                        tools=tools,
+                        tool_choice=tool_choice,
+                        max_tokens=4096,
+                        temperature=0.7,
+                        n=1,
+                        timeout=timeout,
+                    ),
                 )
 
                 if response.choices[0].finish_reason == "tool_calls":
+                    budget.record_round()
                     message = response.choices[0].message
 
                     if message.content is not None:
@@ -101,31 +125,36 @@ class OpenAIProvider(AIProvider):
 
                     tool_calls = response.choices[0].message.tool_calls
 
-                    for tool_call in tool_calls:
-                        if tool_call.function.name == "get_additional_file":
-                            args = json.loads(tool_call.function.arguments)
-                            file_path = args["file_path"]
-                            notify_user_toast(
-                                f"LLM requested additional file: {file_path}"
-                            )
-
-                            additional_file_contents = self.retrieve_file_contents(
-                                file_path
-                            )
-
-                            # send the additional file contents to the llm
-                            messages.append(
-                                {
-                                    "role": "tool",
-                                    "tool_call_id": tool_call.id,
-                                    "name": "get_additional_file",
-                                    "content": json.dumps(additional_file_contents),
-                                }
-                            )
-                        else:
-                            sys.exit("Unknown tool call")
-
-                elif response.choices[0].finish_reason == "stop":
+                    # answer every tool call of this round with one batch of reads
+                    requests = [
+                        self.tool_requests(
+                            tool_call.function.name,
+                            json.loads(tool_call.function.arguments),
+                        )
+                        for tool_call in tool_calls
+                    ]
+                    results = self.retrieve_files(
+                        [request for batch in requests for request in batch],
+                        notify_user_toast,
+                    )
+
+                    # the whole conversation is sent again, keep older files short
+                    if budget.should_compact():
+                        budget.compact_messages(messages)
+
+                    for tool_call, batch in zip(tool_calls, requests):
+                        # send the additional file contents to the llm
+                        messages.append(
+                            {
+                                "role": "tool",
+                                "tool_call_id": tool_call.id,
+                                "name": tool_call.function.name,
+                                "content": json.dumps(results[: len(batch)]),
+                            }
+                        )
+                        results = results[len(batch) :]
+
+                else:
                     return response.choices[0].message.content
 
             except Exception as e:
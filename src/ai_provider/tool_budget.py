@@ -0,0 +1,173 @@
+"""
+This module bounds the tool loop of a provider while it documents one file:
+the number of tool rounds, the input tokens sent over all rounds and the
+wall clock time.  The whole conversation is sent again every round, so the
+file contents returned more than a few rounds ago are compacted into short
+summaries.  When a budget runs out, the model is
+asked for its final answer and no longer offered the tool.
+"""
+
+import json
+import time
+from config import config
+from analysis import estimate_tokens
+from run.progress import format_duration
+from run import metrics
+
+# Characters of each compacted file kept as its summary
+SUMMARY_CHARS = 300
+
+FINAL_ANSWER_PROMPT = (
+    "You cannot request more files. Write the complete documentation now, "
+    "using the files you have already received."
+)
+
+
+class ToolBudget:
+    """
+    The budgets of the tool loop for one file.  A limit of 0 is no limit.
+    """
+
+    def __init__(
+        self,
+        max_rounds: int,
+        max_input_tokens: int,
+        max_seconds: float,
+        compact_after: int,
+    ):
+        self.max_rounds = max_rounds
+        self.max_input_tokens = max_input_tokens
+        self.max_seconds = max_seconds
+        self.compact_after = compact_after
+        self.rounds = 0
+        self.input_tokens = 0
+        self.start_time = time.monotonic()
+        self.exhausted = None
+        self.prompted = False
+
+    @classmethod
+    def from_config(cls):
+        return cls(
+            config.max_tool_rounds,
+            config.max_tool_input_tokens,
+            config.max_tool_seconds,
+            config.compact_tool_results_after,
+        )
+
+    def record_request(self, text: str):
+        """
+        Count the input of a request, given as its serialized messages.
+        """
+        self.input_tokens += estimate_tokens(text)
+
+    def record_round(self):
+        """
+        The model requested files.
+        """
+        self.rounds += 1
+        metrics.add("tool_rounds")
+
+    def allows_tools(self) -> bool:
+        """
+        True while the model may request files.  Once a budget runs out, the
+        next request must force the final answer.
+        """
+        if self.exhausted is None:
+            elapsed = time.monotonic() - self.start_time
+
+            if self.max_rounds and self.rounds >= self.max_rounds:
+                self.exhausted = f"{self.rounds} tool rounds"
+            elif self.max_input_tokens and self.input_tokens >= self.max_input_tokens:
+                self.exhausted = f"~{self.input_tokens} input tokens"
+            elif self.max_seconds and elapsed >= self.max_seconds:
+                self.exhausted = format_duration(elapsed)
+
+            # with no rounds taken, the tool was never offered rather than stopped
+            if self.exhausted is not None and self.rounds:
+                metrics.add("tool_budget_stops")
+
+        return self.exhausted is None
+
+    def final_answer_due(self) -> bool:
+        """
+        True once, when the loop was stopped and the model should be told to
+        answer with what it has.
+        """
+        if self.exhausted is None or self.prompted or not self.rounds:
+            return False
+
+        self.prompted = True
+        return True
+
+    def should_compact(self) -> bool:
+        """
+        True when results returned more than compact_after rounds ago may
+        be in the conversation, before the results of this round are added.
+        """
+        return bool(self.compact_after) and self.rounds > self.compact_after
+
+    def compacted_rounds(self, messages, is_result):
+        """
+        The indexes of the tool result messages returned more than
+        compact_after rounds ago.  The results of one round are consecutive
+        messages, the results of the last compact_after rounds are kept.
+
+        :param messages: The conversation, before the results of this round.
+        :param is_result: A function telling whether a message holds tool results.
+        """
+        rounds = []
+        previous = False
+        for index, message in enumerate(messages):
+            result = is_result(message)
+            if result and not previous:
+                rounds.append([])
+            if result:
+                rounds[-1].append(index)
+            previous = result
+
+        older = rounds[: max(0, len(rounds) - self.compact_after)]
+        return [index for indexes in older for index in indexes]
+
+    def compact_messages(self, messages):
+        """
+        Compact the older tool results of chat messages in the OpenAI
+        format, in place.
+        """
+        for index in self.compacted_rounds(
+            messages,
+            lambda message: isinstance(message, dict) and message.get("role") == "tool",
+        ):
+            message = messages[index]
+
+            try:
+                results = json.loads(message["content"])
+            except (TypeError, ValueError):
+                continue
+
+            message["content"] = json.dumps(self.compact_results(results))
+
+    def compact_results(self, results):
+        """
+        Replace the contents of every file in a list of tool results with a
+        short summary.  Results compacted before are left as they are.
+        """
+        compacted = []
+
+        for result in results:
+            if not isinstance(result, dict) or "contents" not in result:
+                compacted.append(result)
+                continue
+
+            contents = result["contents"]
+            metrics.add("compacted_tool_results")
+            compacted.append(
+                {
+                    "file_path": result.get("file_path"),
+                    "summary": contents[:SUMMARY_CHARS]
+                    + ("..." if len(contents) > SUMMARY_CHARS else ""),
+                    "note": f"{contents.count(chr(10)) + 1} lines returned in an earlier "
+                    "round, compacted. Request the file again if you need it.",
+                }
+            )
+
+        return compacted
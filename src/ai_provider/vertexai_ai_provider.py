@@ -4,7 +4,7 @@ This module provides an implementation of the AIProvider interface using the Ver
 
 import json
 import os
-import sys
+from collections.abc import Iterable, Mapping
 import vertexai
 from vertexai.preview.generative_models import (
     Content,
@@ -13,7 +13,10 @@ from vertexai.preview.generative_models import (
     GenerativeModel,
     FunctionDeclaration,
 )
+from config import config
+from run import rate_limiter, request_policy
 from .ai_provider import AIProvider
+from .tool_budget import FINAL_ANSWER_PROMPT, ToolBudget
 
 
 class VertexAIProvider(AIProvider):
@@ -38,11 +41,17 @@ class VertexAIProvider(AIProvider):
         region = os.environ["GOOGLE_VERTEXAI_LOCATION"]
         vertexai.init(project=project_id, location=region)
 
-        if not hasattr(self, "_model"):
-            self._model = ""
+        self._models = {}
 
     def document_file(
-        self, file_name, project_path, file_contents, notify_user_toast, tree
+        self,
+        file_name,
+        project_path,
+        file_contents,
+        notify_user_toast,
+        tree,
+        model=None,
+        update=None,
     ):
         """
         Documents a file using the Google Vertexai API by providing the file path,
@@ -54,17 +63,22 @@ class VertexAIProvider(AIProvider):
             file_contents (str): The contents of the file to be documented.
             notify_user_toast (function): A function to notify the user with a toast message.
             tree (dict): The tree of the project.
+            model (str): The model to use, defaults to the configured model.
+            update (tuple): The previous documentation and a diff of the file, to
+                ask for changed sections only.
 
         Returns:
             str: The generated documentation for the file.
 
         """
-        from config import config
+        model = model or config.model
 
-        if self._model is None or self._model == "":
-            self._model = GenerativeModel(config.model)
+        if model not in self._models:
+            self._models[model] = GenerativeModel(model)
 
-        prompt = self.generate_prompt(file_name, project_path, file_contents, tree)
+        prompt = self.generate_prompt(
+            file_name, project_path, file_contents, tree, update
+        )
 
         messages = [
             Content(
@@ -75,80 +89,94 @@ class VertexAIProvider(AIProvider):
             ),
         ]
 
-        return self.get_completions(messages, notify_user_toast)
+        return self.get_completions(
+            messages, notify_user_toast, self._models[model], model
+        )
 
-    def get_completions(self, messages, notify_user_toast):
+    def get_completions(self, messages, notify_user_toast, generative_model, model):
         """
         Get completions for the given messages using the Google Vertexai API.
 
         Args:
             messages (list): A list of messages to generate completions for.
             notify_user_toast (function): A function to notify the user with a toast message.
+            generative_model (GenerativeModel): The model to generate content with.
+            model (str): The name of the model, for its request deadlines.
 
         Returns:
             list: A list of completions generated by the AI model.
 
         """
 
-        get_additional_file = FunctionDeclaration(
-            name="get_additional_file",
-            description="Retrieve the contents of an additional file required for documentation.",
-            parameters={
-                "type": "object",
-                "properties": {
-                    "file_path": {"type": "string"},
-                },
-                "required": ["file_path"],
-            },
+        get_additional_files = FunctionDeclaration(
+            name="get_additional_files",
+            description="Retrieve the contents of additional files required for documentation.",
+            parameters=self.tool_parameters,
         )
 
-        get_additional_file_tool = Tool(
-            function_declarations=[get_additional_file],
+        get_additional_files_tool = Tool(
+            function_declarations=[get_additional_files],
         )
+        budget = ToolBudget.from_config()
 
         while True:
             try:
+                # once a budget of the tool loop is used up, force a final answer
+                tools = [get_additional_files_tool] if budget.allows_tools() else None
+                if budget.final_answer_due():
+                    notify_user_toast(f"Tool budget used up after {budget.exhausted}")
+                    messages.append(
+                        Content(
+                            role="user", parts=[Part.from_text(FINAL_ANSWER_PROMPT)]
+                        )
+                    )
+                budget.record_request(
+                    json.dumps([message.to_dict() for message in messages], default=str)
+                )
 
-                response = self._model.generate_content(
-                    contents=messages,
-                    tools=[get_additional_file_tool],
+                rate_limiter.acquire()
+                response = request_policy.call(
+                    model,
+                    lambda timeout: generate_content(
+                        generative_model, messages, tools, timeout
+                    ),
                 )
 
                 if response.candidates[0].content.parts[0].function_call is not None:
                     # one or more function calls
+                    budget.record_round()
 
                     messages.append(response.candidates[0].content)
-                    parts = response.candidates[0].content.parts
-
-                    function_return_parts = []
-
-                    for part in parts:
-                        function_name = part.function_call.name
-
-                        if function_name == "get_additional_file":
-                            file_path = part.function_call.args["file_path"]
+                    calls = [
+                        part.function_call
+                        for part in response.candidates[0].content.parts
+                        if part.function_call is not None and part.function_call.name
+                    ]
+
+                    # answer every function call of this round with one batch of reads
+                    requests = [
+                        self.tool_requests(call.name, to_plain(call.args))
+                        for call in calls
+                    ]
+                    results = self.retrieve_files(
+                        [request for batch in requests for request in batch],
+                        notify_user_toast,
+                    )
 
-                            notify_user_toast(
-                                f"LLM requested additional file: {file_path}"
-                            )
+                    # the whole conversation is sent again, keep older files short
+                    if budget.should_compact():
+                        compact_function_responses(messages, budget)
 
-                            additional_file_contents = self.retrieve_file_contents(
-                                file_path
-                            )
+                    function_return_parts = []
 
-                            function_return_parts.append(
-                                Part.from_function_response(
-                                    name="get_additional_file",
-                                    response={
-                                        "content": {
-                                            "contents": additional_file_contents
-                                        }
-                                    },
-                                )
+                    for call, batch in zip(calls, requests):
+                        function_return_parts.append(
+                            Part.from_function_response(
+                                name=call.name,
+                                response={"content": {"files": results[: len(batch)]}},
                             )
-
-                        else:
-                            sys.exit("Unknown function call")
+                        )
+                        results = results[len(batch) :]
 
                     messages.append(
                         Content(
@@ -160,5 +188,60 @@ class VertexAIProvider(AIProvider):
                 else:
                     return response.candidates[0].content.parts[0].text
 
+            except TimeoutError as e:
+                # like the other providers, so that the router can fall back
+                print(f"Error occurred while generating documentation: {e}")
+                return None
+
             except Exception as e:
                 raise RuntimeError(f"Failed to generate documentation: {str(e)}") from e
+
+
+def generate_content(generative_model, contents, tools, timeout):
+    """
+    GenerativeModel.generate_content with a timeout and without retries,
+    which the SDK only takes on its prediction client.  The request is built
+    and parsed as the SDK does.
+    """
+    # pylint: disable=protected-access
+    request = generative_model._prepare_request(contents=contents, tools=tools)
+    response = generative_model._prediction_client.generate_content(
+        request=request, timeout=timeout, retry=None
+    )
+    return generative_model._parse_response(response)
+
+
+def compact_function_responses(messages, budget):
+    """
+    Compact the files of the function responses of older rounds, in place.
+    """
+    for index in budget.compacted_rounds(
+        messages, lambda message: message.role == "function"
+    ):
+        message = messages[index]
+        parts = []
+        for part in message.parts:
+            response = to_plain(part.function_response.response)
+            files = response.get("content", {}).get("files", [])
+            parts.append(
+                Part.from_function_response(
+                    name=part.function_response.name,
+                    response={"content": {"files": budget.compact_results(files)}},
+                )
+            )
+
+        messages[index] = Content(role="function", parts=parts)
+
+
+def to_plain(value):
+    """
+    Convert the protobuf maps and lists of function call arguments to plain
+    dicts and lists.
+    """
+    if isinstance(value, Mapping):
+        return {key: to_plain(item) for key, item in value.items()}
+
+    if isinstance(value, Iterable) and not isinstance(value, (str, bytes)):
+        return [to_plain(item) for item in value]
+
+    return value
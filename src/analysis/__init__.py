@@ -0,0 +1,20 @@
+# analysis/__init__.py
+from .estimate_tokens import estimate_tokens
+from .count_definitions import count_definitions
+from .import_graph import ImportGraph, import_graph
+from .extract_outline import extract_outline
+from .forecast_run import forecast_run
+from .estimate_file_costs import estimate_file_costs
+from .context_index import ContextIndex, context_index
+
+__all__ = [
+    "estimate_tokens",
+    "count_definitions",
+    "ImportGraph",
+    "import_graph",
+    "extract_outline",
+    "forecast_run",
+    "estimate_file_costs",
+    "ContextIndex",
+    "context_index",
+]
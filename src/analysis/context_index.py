@@ -0,0 +1,226 @@
+"""
+This module ranks the project files related to a file with BM25 over source
+identifiers and paths, so that prompts can name the few files that matter
+instead of leaving the model to guess from the whole project tree.
+
+Each project file is indexed by the terms of its path and of its outline (its
+definitions); a file being documented is matched by the most distinctive
+terms of its full source, which include the names it uses from other files.
+The terms of every file are cached between runs in the output folder and
+only recomputed for files whose size or modification time changed.
+"""
+
+import json
+import os
+import threading
+from collections import Counter
+from pathlib import Path
+from file import read_source, source_stamp
+from run import map_in_processes
+from search import tokenize_identifiers
+from search.search_index import B, K1, bm25_idf
+from .extract_outline import extract_outline
+
+CACHE_FILE_NAME = ".doc-buddy-context-index.json"
+CACHE_VERSION = 1
+
+# Terms of the path count more than terms of the definitions
+PATH_WEIGHT = 3
+
+# The number of distinctive terms of a file used to find related files
+QUERY_TERMS = 24
+
+# The index being built, inherited by forked worker processes
+_state = {}
+
+
+class ContextIndex:
+    """
+    In-memory BM25 index over the files of the project (posix paths
+    relative to the project root).
+    """
+
+    def __init__(self):
+        self.root_path = None
+        self.output_path = None
+        self.cache_path = None
+        self.entries = {}
+        self.postings = {}
+        self.average_length = 0.0
+        self._lock = threading.Lock()
+
+    def build(self, files, root_path: Path, output_path: Path = None):
+        """
+        Index every file, reusing the terms cached by a previous run for
+        files that did not change.  Called once per run.
+
+        :param files: List of absolute file paths in the project.
+        :param root_path: The project root the paths are relative to.
+        :param output_path: The documentation root holding the cache, or None
+            to not cache.  Generated documentation in it is not indexed.
+        """
+        self.root_path = Path(root_path)
+        self.output_path = Path(output_path).resolve() if output_path else None
+        self.cache_path = self.output_path / CACHE_FILE_NAME if output_path else None
+        cached = self.load_cache()
+
+        entries = {}
+        stale = {}
+        for file in self.source_files(files):
+            path = Path(os.path.relpath(file, root_path)).as_posix()
+            stamp = self.stamp(path)
+            entry = cached.get(path)
+
+            if entry is None or entry["stamp"] != stamp:
+                stale[path] = stamp
+                entry = None
+
+            entries[path] = entry
+
+        # extracting the terms of the changed files is spread over cores
+        _state["index"] = self
+        for (path, stamp), terms in zip(
+            stale.items(), map_in_processes(index_terms, stale)
+        ):
+            entries[path] = {"stamp": stamp, "terms": terms}
+
+        reused = sum(1 for path, entry in entries.items() if cached.get(path) is entry)
+        self.set_entries(entries)
+        self.save_cache()
+
+        print(f"-> Context index contains {len(entries)} files, {reused} unchanged.")
+
+    def update(self, files, changed):
+        """
+        Re-index after some files changed.
+
+        :param files: List of absolute file paths now in the project.
+        :param changed: List of absolute paths of files added or modified.
+        """
+        changed = {
+            Path(os.path.relpath(file, self.root_path)).as_posix() for file in changed
+        }
+        entries = {}
+
+        for file in self.source_files(files):
+            path = Path(os.path.relpath(file, self.root_path)).as_posix()
+            entry = self.entries.get(path)
+
+            if entry is None or path in changed:
+                entry = {"stamp": self.stamp(path), "terms": self.index_terms(path)}
+
+            entries[path] = entry
+
+        self.set_entries(entries)
+        self.save_cache()
+
+    def source_files(self, files):
+        if self.output_path is None:
+            return files
+
+        return [file for file in files if self.output_path not in Path(file).parents]
+
+    def set_entries(self, entries):
+        postings = {}
+        for path, entry in entries.items():
+            length = sum(entry["terms"].values())
+            for term, frequency in entry["terms"].items():
+                postings.setdefault(term, []).append((path, frequency, length))
+
+        total = sum(sum(entry["terms"].values()) for entry in entries.values())
+
+        with self._lock:
+            self.entries = entries
+            self.postings = postings
+            self.average_length = total / len(entries) if entries else 0.0
+
+    def related(self, file: str, file_contents: str, limit: int, exclude=()):
+        """
+        The files most related to a file.
+
+        :param file: Posix path relative to the project root.
+        :param file_contents: The source of the file.
+        :param limit: The maximum number of files.
+        :param exclude: Paths not to return, such as files already in the prompt.
+        :return: A list of (path, score) tuples, best first.
+        """
+        with self._lock:
+            postings, average_length = self.postings, self.average_length
+            count = len(self.entries)
+
+        if limit <= 0 or not count:
+            return []
+
+        # the most distinctive terms of the file, by tf-idf
+        weights = {
+            term: frequency * bm25_idf(count, len(postings[term]))
+            for term, frequency in Counter(tokenize_identifiers(file_contents)).items()
+            if term in postings
+        }
+        query = sorted(weights, key=weights.get, reverse=True)[:QUERY_TERMS]
+
+        excluded = set(exclude) | {file}
+        scores = Counter()
+
+        for term in query:
+            idf = bm25_idf(count, len(postings[term]))
+            for path, frequency, length in postings[term]:
+                if path in excluded:
+                    continue
+                norm = 1 - B + B * length / (average_length or 1)
+                scores[path] += idf * frequency * (K1 + 1) / (frequency + K1 * norm)
+
+        return scores.most_common(limit)
+
+    def index_terms(self, path: str):
+        terms = Counter()
+
+        for term in tokenize_identifiers(path):
+            terms[term] += PATH_WEIGHT
+
+        try:
+            contents = read_source(self.root_path / path)
+        except (OSError, UnicodeDecodeError):
+            return dict(terms)
+
+        terms.update(tokenize_identifiers(extract_outline(contents, path) or contents))
+
+        return dict(terms)
+
+    def stamp(self, path: str):
+        return source_stamp(self.root_path / path)
+
+    def load_cache(self):
+        if self.cache_path is None:
+            return {}
+
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as file:
+                cache = json.load(file)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+        if cache.get("version") != CACHE_VERSION:
+            return {}
+
+        return cache.get("files", {})
+
+    def save_cache(self):
+        if self.cache_path is None:
+            return
+
+        os.makedirs(self.cache_path.parent, exist_ok=True)
+        temporary_path = self.cache_path.with_name(self.cache_path.name + ".tmp")
+
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            json.dump({"version": CACHE_VERSION, "files": self.entries}, file)
+
+        os.replace(temporary_path, self.cache_path)
+
+
+def index_terms(path: str):
+    return _state["index"].index_terms(path)
+
+
+# Create a global context index to be shared across all modules
+context_index = ContextIndex()
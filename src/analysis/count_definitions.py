@@ -0,0 +1,48 @@
+import re
+from file import guess_language_for_markdown
+
+# Patterns that match the start of a function, class or type definition
+DEFINITION_PATTERNS = {
+    "python": re.compile(r"^\s*(?:async\s+def|def|class)\s+\w+", re.MULTILINE),
+    "javascript": re.compile(
+        r"^\s*(?:export\s+)?(?:default\s+)?(?:async\s+)?(?:function\*?|class)\s+\w+"
+        r"|^\s*(?:export\s+)?(?:const|let|var)\s+\w+\s*=\s*(?:async\s+)?\([^)]*\)\s*=>",
+        re.MULTILINE,
+    ),
+    "go": re.compile(r"^func\s+|^type\s+\w+\s+(?:struct|interface)", re.MULTILINE),
+    "rust": re.compile(
+        r"^\s*(?:pub(?:\([^)]*\))?\s+)?(?:async\s+)?(?:fn|struct|enum|trait|impl)\b",
+        re.MULTILINE,
+    ),
+    "ruby": re.compile(r"^\s*(?:def|class|module)\s+", re.MULTILINE),
+    "php": re.compile(
+        r"^\s*(?:[a-z]+\s+)*(?:function|class|interface|trait)\s+\w+", re.MULTILINE
+    ),
+    "bash": re.compile(r"^\s*(?:function\s+)?\w+\s*\(\)\s*\{", re.MULTILINE),
+}
+DEFINITION_PATTERNS["typescript"] = DEFINITION_PATTERNS["javascript"]
+
+# Fallback for C-like languages: a word followed by an argument list and a brace
+GENERIC_DEFINITION_PATTERN = re.compile(
+    r"^\s*(?:class|struct|interface|fun|func|fn|def|function)\s+\w+"
+    r"|^[\w<>\[\]*&:, ]+\s+\**\w+\s*\([^;]*\)\s*\{?\s*$",
+    re.MULTILINE,
+)
+
+
+def count_definitions(file_contents: str, file_name: str) -> int:
+    """
+    Cheap complexity measure: the number of function, class and type
+    definitions in a file, found with a per-language regular expression.
+
+    Args:
+        file_contents: The source code.
+        file_name: The name of the file, used to pick the language.
+
+    Returns:
+        The number of definitions found.
+    """
+    language = guess_language_for_markdown(file_name)
+    pattern = DEFINITION_PATTERNS.get(language, GENERIC_DEFINITION_PATTERN)
+
+    return len(pattern.findall(file_contents))
@@ -0,0 +1,81 @@
+"""
+This module estimates how long each file will take to document, so that the
+scheduler can start the longest files first and no worker is left with one
+large file after all the others went idle.
+"""
+
+import os
+from pathlib import Path
+from file import file_table, source_size
+from run import read_report
+from run.metrics import tool_rounds_per_file
+from .estimate_tokens import CHARS_PER_TOKEN
+from .forecast_run import (
+    MAX_OUTPUT_TOKENS,
+    MIN_OUTPUT_TOKENS,
+    OUTPUT_RATIO,
+    OUTPUT_TOKENS_PER_SECOND,
+    SECONDS_PER_REQUEST,
+)
+
+# Assumed prompt processing speed, so that files past the output token
+# bound still rank by size
+INPUT_TOKENS_PER_SECOND = 2000.0
+
+# Files documented in a previous run needed to calibrate the estimate
+MIN_CALIBRATION_FILES = 5
+
+
+def estimate_file_costs(files, root_path: Path, report_path: Path = None):
+    """
+    Estimate the seconds needed to document each file.
+
+    A file documented by a previous run is expected to take as long as it did
+    then, as recorded in the file table or else in the run report.  Other
+    files are estimated from their size and the tool rounds per file of the
+    previous run, scaled by how well that estimate matched the files of the
+    previous run.
+
+    Args:
+        files: Absolute paths of the files to document.
+        root_path: The project root the run report paths are relative to.
+        report_path: The run report of a previous run, if any.
+
+    Returns:
+        A dict of file path to estimated seconds.
+    """
+    report = read_report(report_path) if report_path else None
+    history = (report or {}).get("files", {})
+    rounds = tool_rounds_per_file(report) or 0.0
+
+    estimates = {}
+    measured = {}
+    for file in files:
+        try:
+            tokens = source_size(file) / CHARS_PER_TOKEN
+        except OSError:
+            tokens = 0
+
+        output_tokens = min(
+            max(tokens * OUTPUT_RATIO, MIN_OUTPUT_TOKENS), MAX_OUTPUT_TOKENS
+        )
+        estimates[file] = (
+            (1 + rounds) * SECONDS_PER_REQUEST
+            + tokens / INPUT_TOKENS_PER_SECOND
+            + output_tokens / OUTPUT_TOKENS_PER_SECOND
+        )
+
+        path = Path(os.path.relpath(file, root_path)).as_posix()
+        latency = file_table.latency(path)
+        if latency is not None:
+            measured[file] = latency
+        elif path in history:
+            measured[file] = history[path]["latency"]
+
+    scale = 1.0
+    if len(measured) >= MIN_CALIBRATION_FILES:
+        scale = (
+            sum(measured.values()) / sum(estimates[file] for file in measured) or 1.0
+        )
+
+    return {file: measured.get(file, estimates[file] * scale) for file in files}
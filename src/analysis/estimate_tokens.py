@@ -0,0 +1,20 @@
+import math
+
+# Average characters per token for code with BPE tokenizers (cl100k, Gemini)
+CHARS_PER_TOKEN = 3.8
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens in a string without calling a tokenizer.
+
+    Args:
+        text: The text to estimate.
+
+    Returns:
+        The estimated token count, rounded up.
+    """
+    if not text:
+        return 0
+
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
@@ -0,0 +1,231 @@
+"""
+This module extracts outlines of source files: the module docstring, imports,
+classes, function signatures and constants, each prefixed with its line
+number.  An outline is usually enough to explain a call site and is a small
+fraction of the size of the file.
+
+Python is outlined with ast, other languages with per-language regular
+expressions matching declaration lines.
+"""
+
+import ast
+import re
+import threading
+from collections import OrderedDict
+from file import guess_language_for_markdown
+from run import content_hash
+
+# Outlines that do not shrink the file by at least this factor are not used
+MIN_SAVING_RATIO = 0.6
+MAX_LINE_LENGTH = 160
+MAX_HEADER_COMMENT_LINES = 10
+
+# Outlines kept in memory, the least recently used are dropped first
+MAX_CACHED_OUTLINES = 4096
+
+DECLARATION_PATTERNS = {
+    "javascript": r"^import\s|^\s*(?:export\s+)?(?:default\s+)?(?:async\s+)?"
+    r"(?:function\*?|class|interface|type|enum|const|let|var|abstract\s+class)\s"
+    r"|^\s+(?:static\s+|async\s+|get\s+|set\s+|public\s+|private\s+|protected\s+)*"
+    r"(?!if\b|for\b|while\b|switch\b|catch\b|return\b)\w+\s*\([^)]*\)\s*(?::[^{]*)?\{\s*$",
+    "go": r"^(?:package|import|func|type|const|var)\b|^\t\w+\s+[\w.*\[\]]+(?:\s+`[^`]*`)?$",
+    "rust": r"^\s*(?:pub(?:\([^)]*\))?\s+)?(?:async\s+|unsafe\s+|const\s+)*"
+    r"(?:fn|struct|enum|trait|impl|mod|const|static|type|use)\b",
+    "java": r"^\s*(?:@\w+\s+)*(?:(?:public|private|protected|static|final|abstract|"
+    r"synchronized|native|default|sealed)\s+)+[\w<>\[\],.? ]+\(|"
+    r"^\s*(?:(?:public|private|protected|static|final|abstract|sealed)\s+)*"
+    r"(?:class|interface|enum|record|@interface)\s|^(?:package|import)\s",
+    "csharp": r"^\s*(?:\[[^\]]+\]\s*)*(?:(?:public|private|protected|internal|static|"
+    r"virtual|override|abstract|sealed|async|partial|readonly)\s+)+[\w<>\[\],.? ]+\(|"
+    r"^\s*(?:(?:public|private|protected|internal|static|abstract|sealed|partial)\s+)*"
+    r"(?:class|interface|enum|struct|record|namespace)\s|^using\s",
+    "kotlin": r"^\s*(?:(?:public|private|protected|internal|open|override|abstract|"
+    r"suspend|inline|data|sealed|enum|annotation|companion)\s+)*"
+    r"(?:fun|class|interface|object|val|var|typealias)\s|^(?:package|import)\s",
+    "swift": r"^\s*(?:(?:public|private|fileprivate|internal|open|static|final|"
+    r"override|mutating|@\w+)\s+)*(?:func|class|struct|enum|protocol|extension|"
+    r"init|typealias|let|var)\b|^import\s",
+    "scala": r"^\s*(?:(?:private|protected|override|final|sealed|abstract|implicit|"
+    r"case|lazy)\s+)*(?:def|class|object|trait|val|type)\s|^(?:package|import)\s",
+    "c": r"^(?:typedef|struct|union|enum|#define|#include|extern)\b"
+    r"|^[A-Za-z_][\w\s\*]*\s\**\w+\s*\([^;]*\)\s*\{?\s*$",
+    "cpp": r"^\s*(?:typedef|struct|class|union|enum|namespace|template|using|"
+    r"#define|#include)\b|^[A-Za-z_][\w\s\*&:<>,~]*\s?[\*&]*[\w:~]+\s*\([^;]*\)"
+    r"\s*(?:const)?\s*(?:override)?\s*\{?\s*$",
+    "ruby": r"^\s*(?:class|module|def|attr_reader|attr_writer|attr_accessor|"
+    r"include|extend|require|require_relative)\b|^\s*[A-Z][A-Z0-9_]*\s*=",
+    "php": r"^\s*(?:(?:abstract|final|public|private|protected|static|readonly)\s+)*"
+    r"(?:function|class|interface|trait|enum|const)\b|^\s*(?:namespace|use)\s",
+    "bash": r"^\s*(?:function\s+)?[\w-]+\s*\(\)\s*\{?|^\s*(?:export\s+|readonly\s+)?"
+    r"[A-Z_][A-Z0-9_]*=|^\s*(?:source|\.)\s",
+    "lua": r"^\s*(?:local\s+)?function\b|^\s*local\s+\w+\s*=\s*require",
+    "haskell": r"^\w+\s*::|^(?:data|newtype|type|class|instance|module|import)\b",
+    "perl": r"^\s*(?:sub|package|use)\b",
+    "r": r"^\s*[\w.]+\s*(?:<-|=)\s*function|^\s*(?:library|source)\(",
+    "matlab": r"^\s*(?:function|classdef|properties|methods)\b",
+    "powershell": r"(?i)^\s*(?:function|class|filter|param|enum)\b",
+    "vim": r"^\s*(?:fu|fun|function|command|augroup)!?\s",
+    "sql": r"(?i)^\s*(?:create|alter)\s",
+    "css": r"^[^\s@{}][^{]*\{|^@(?:media|keyframes|import|font-face)",
+    "markdown": r"^#{1,6}\s",
+}
+DECLARATION_PATTERNS["typescript"] = DECLARATION_PATTERNS["javascript"]
+
+COMMENT_PATTERN = re.compile(r"^\s*(?://|#(?!include|define|!)|/\*|\*|--|%|;|\"|')")
+
+_compiled = {
+    language: re.compile(pattern, re.MULTILINE)
+    for language, pattern in DECLARATION_PATTERNS.items()
+}
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def extract_outline(file_contents: str, file_name: str):
+    """
+    Extract the outline of a source file.  The latest outlines are cached per
+    content hash, so a file requested for many other files is only parsed
+    once, and --watch and --serve do not keep every version of a file.
+
+    Args:
+        file_contents: The source code.
+        file_name: The name of the file, used to pick the language.
+
+    Returns:
+        The outline, or None if the language is not supported or the outline
+        would not be much smaller than the file.
+    """
+    language = guess_language_for_markdown(file_name)
+    key = content_hash(f"{language}\0{file_contents}")
+
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    if language == "python":
+        outline = outline_python(file_contents)
+    elif language in _compiled:
+        outline = outline_with_pattern(file_contents, _compiled[language])
+    else:
+        outline = None
+
+    if outline is not None and len(outline) > len(file_contents) * MIN_SAVING_RATIO:
+        outline = None
+
+    with _cache_lock:
+        _cache[key] = outline
+        if len(_cache) > MAX_CACHED_OUTLINES:
+            _cache.popitem(last=False)
+
+    return outline
+
+
+def outline_python(file_contents: str):
+    try:
+        tree = ast.parse(file_contents)
+    except (SyntaxError, ValueError):
+        return None
+
+    lines = []
+    docstring = ast.get_docstring(tree)
+    if docstring:
+        lines.append(f'L1: """{first_paragraph(docstring)}"""')
+
+    for node in tree.body:
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            lines.append(f"L{node.lineno}: {shorten(ast.unparse(node))}")
+
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            lines += outline_python_function(node, "")
+
+        elif isinstance(node, ast.ClassDef):
+            lines += outline_python_class(node, "")
+
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            names = [target.id for target in targets if isinstance(target, ast.Name)]
+            if names and (isinstance(node, ast.AnnAssign) or names[0].isupper()):
+                lines.append(f"L{node.lineno}: {shorten(ast.unparse(node))}")
+
+    return "\n".join(lines)
+
+
+def outline_python_function(node, indent: str):
+    lines = [
+        f"L{d.lineno}: {indent}@{shorten(ast.unparse(d))}" for d in node.decorator_list
+    ]
+
+    prefix = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+    returns = f" -> {ast.unparse(node.returns)}" if node.returns else ""
+    lines.append(
+        f"L{node.lineno}: {indent}{prefix} {node.name}({ast.unparse(node.args)}){returns}: ..."
+    )
+
+    docstring = ast.get_docstring(node)
+    if docstring:
+        lines.append(
+            f'{" " * len(f"L{node.lineno}: ")}{indent}    """{first_line(docstring)}"""'
+        )
+
+    return lines
+
+
+def outline_python_class(node, indent: str):
+    lines = [
+        f"L{d.lineno}: {indent}@{shorten(ast.unparse(d))}" for d in node.decorator_list
+    ]
+
+    bases = ", ".join(ast.unparse(base) for base in node.bases + node.keywords)
+    bases = f"({bases})" if bases else ""
+    lines.append(f"L{node.lineno}: {indent}class {node.name}{bases}:")
+
+    docstring = ast.get_docstring(node)
+    if docstring:
+        lines.append(
+            f'{" " * len(f"L{node.lineno}: ")}{indent}    """{first_line(docstring)}"""'
+        )
+
+    for child in node.body:
+        if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            lines += outline_python_function(child, indent + "    ")
+        elif isinstance(child, ast.ClassDef):
+            lines += outline_python_class(child, indent + "    ")
+        elif isinstance(child, (ast.Assign, ast.AnnAssign)):
+            lines.append(f"L{child.lineno}: {indent}    {shorten(ast.unparse(child))}")
+
+    return lines
+
+
+def outline_with_pattern(file_contents: str, pattern):
+    source_lines = file_contents.splitlines()
+    lines = []
+
+    # keep the header comment, which usually describes the file
+    for number, line in enumerate(source_lines[:MAX_HEADER_COMMENT_LINES], start=1):
+        if not COMMENT_PATTERN.match(line):
+            break
+        lines.append(f"L{number}: {shorten(line.rstrip())}")
+
+    for number, line in enumerate(source_lines, start=1):
+        if pattern.match(line):
+            line = line.rstrip()
+            if line.endswith("{"):
+                line = line[:-1].rstrip()
+            lines.append(f"L{number}: {shorten(line)}")
+
+    return "\n".join(lines)
+
+
+def first_paragraph(text: str):
+    return shorten(text.strip().split("\n\n", 1)[0].replace("\n", " "))
+
+
+def first_line(text: str):
+    return shorten(text.strip().splitlines()[0])
+
+
+def shorten(text: str):
+    if len(text) <= MAX_LINE_LENGTH:
+        return text
+    return text[: MAX_LINE_LENGTH - 3] + "..."
@@ -0,0 +1,156 @@
+"""
+This module forecasts the tokens, cost and duration of a run without sending
+anything to a provider.  Every prompt is built exactly as it would be sent,
+in parallel across cores, and sized with the same token estimate the model
+router uses.
+"""
+
+from pathlib import Path
+from config import config
+from file import read_source
+from run import map_in_processes, read_report
+from run.progress import format_duration
+from .estimate_tokens import estimate_tokens
+
+# Projected output tokens per token of source, and its bounds
+OUTPUT_RATIO = 0.6
+MIN_OUTPUT_TOKENS = 300
+MAX_OUTPUT_TOKENS = 4000
+
+# Assumed latency when no previous run report is available
+SECONDS_PER_REQUEST = 2.0
+OUTPUT_TOKENS_PER_SECOND = 50.0
+
+# Shared with forked worker processes, which inherit it instead of pickling
+# the provider and the context tree
+_state = {}
+
+
+def forecast_files(files, provider, tree):
+    """
+    Build the prompt of every file and estimate its size.
+
+    Args:
+        files: The files to document.
+        provider: The initialized AI provider, used to build prompts.
+        tree: The rendered context tree of the project.
+
+    Returns:
+        A list of dicts with path, tier, prompt_tokens and output_tokens, or
+        error for files that cannot be read.
+    """
+    _state.update(provider=provider, tree=tree)
+
+    return map_in_processes(forecast_file, files)
+
+
+def forecast_file(file_path: Path):
+    provider, tree = _state["provider"], _state["tree"]
+    relative_path = Path(file_path).relative_to(config.targets_root_path)
+
+    try:
+        file_contents = read_source(file_path)
+    except (OSError, UnicodeDecodeError) as e:
+        return {"path": str(relative_path), "error": str(e)}
+
+    prompt = provider.generate_prompt(
+        relative_path.name, relative_path.parent, file_contents, tree
+    )
+    choose_tier = getattr(provider, "choose_tier", None)
+    file_tokens = estimate_tokens(file_contents)
+
+    return {
+        "path": str(relative_path),
+        "tier": (
+            choose_tier(relative_path.name, file_contents) if choose_tier else "strong"
+        ),
+        "prompt_tokens": estimate_tokens(prompt),
+        "output_tokens": min(
+            max(int(file_tokens * OUTPUT_RATIO), MIN_OUTPUT_TOKENS), MAX_OUTPUT_TOKENS
+        ),
+    }
+
+
+def forecast_run(files, provider, tree, report_path: Path):
+    """
+    Print the forecast of a run: tokens and cost per tier, the expected wall
+    clock time for the configured workers and rate limit, and the files whose
+    prompt would not fit in the model context.  Latency and tool rounds are
+    taken from the previous run report when there is one.
+
+    Args:
+        files: The files to document.
+        provider: The initialized AI provider.
+        tree: The rendered context tree of the project.
+        report_path: The path of the run report of a previous run.
+
+    Returns:
+        The list of per-file forecasts.
+    """
+    forecasts = forecast_files(files, provider, tree)
+    previous = (read_report(report_path) or {}).get("tiers", {})
+    tiers = getattr(provider, "tiers", {"strong": (config.model, (0.0, 0.0))})
+
+    print("-> Forecast:")
+
+    latencies = []
+    requests = 0
+    for tier, (model, (input_cost, output_cost)) in tiers.items():
+        tier_files = [f for f in forecasts if f.get("tier") == tier]
+        if not tier_files:
+            continue
+
+        prompt_tokens = sum(f["prompt_tokens"] for f in tier_files)
+        output_tokens = sum(f["output_tokens"] for f in tier_files)
+        cost = (prompt_tokens * input_cost + output_tokens * output_cost) / 1_000_000
+
+        history = previous.get(tier, {})
+        rounds = 0
+        if history.get("files"):
+            rounds = history.get("tool_rounds", 0) / history["files"]
+
+        for forecast in tier_files:
+            if history.get("latency_median"):
+                latencies.append(history["latency_median"])
+            else:
+                latencies.append(
+                    SECONDS_PER_REQUEST
+                    + forecast["output_tokens"] / OUTPUT_TOKENS_PER_SECOND
+                )
+        requests += round(len(tier_files) * (1 + rounds))
+
+        print(
+            f"   {tier:<8} {len(tier_files):>5} files  {model}  "
+            f"~{prompt_tokens} in / {output_tokens} out tokens  ~${cost:.4f}"
+        )
+
+    # a lower bound: workers are never idle and the longest file runs alone
+    seconds = max([sum(latencies) / config.workers, *latencies])
+    if config.rate_limit_rpm > 0:
+        seconds = max(seconds, requests * 60.0 / config.rate_limit_rpm)
+    limit = (
+        f" at {config.rate_limit_rpm:g} requests per minute"
+        if config.rate_limit_rpm
+        else ""
+    )
+    print(f"   ~{format_duration(seconds)} with {config.workers} workers{limit}")
+
+    for forecast in forecasts:
+        if "error" in forecast:
+            continue
+        if (
+            forecast["prompt_tokens"] + forecast["output_tokens"]
+            <= config.context_tokens
+        ):
+            continue
+        print(
+            f"   ! {forecast['path']}: ~{forecast['prompt_tokens']} prompt and "
+            f"{forecast['output_tokens']} output tokens exceed the "
+            f"{config.context_tokens} token context"
+        )
+
+    for forecast in forecasts:
+        if "error" in forecast:
+            print(f"   ! {forecast['path']}: {forecast['error']}")
+
+    return forecasts
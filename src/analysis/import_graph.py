@@ -0,0 +1,290 @@
+"""
+This module builds a static import graph of the project, so that the local
+files a file depends on can be handed to the model up front instead of being
+requested one tool call at a time.
+
+Supported languages:
+    python                  - ast based, absolute and relative imports
+    javascript/typescript   - relative import, export-from, require() and import()
+    go                      - imports below the module path declared in go.mod
+"""
+
+import ast
+import os
+import re
+import threading
+from functools import partial
+from pathlib import Path, PurePosixPath
+from file import read_source
+from run import map_in_processes
+from .estimate_tokens import estimate_tokens
+
+JS_EXTENSIONS = (".js", ".jsx", ".mjs", ".cjs", ".ts", ".tsx")
+JS_IMPORT_PATTERN = re.compile(
+    r"""(?:^|[^\w.$])(?:import|export)\s[^'"`;]*?from\s*['"]([^'"]+)['"]"""
+    r"""|(?:^|[^\w.$])import\s*['"]([^'"]+)['"]"""
+    r"""|(?:^|[^\w.$])(?:require|import)\s*\(\s*['"]([^'"]+)['"]\s*\)""",
+    re.MULTILINE,
+)
+GO_IMPORT_BLOCK_PATTERN = re.compile(r"^import\s*\((.*?)^\)", re.MULTILINE | re.DOTALL)
+GO_IMPORT_LINE_PATTERN = re.compile(r'^import\s+(?:[\w.]+\s+)?"([^"]+)"', re.MULTILINE)
+GO_IMPORT_SPEC_PATTERN = re.compile(r'"([^"]+)"')
+GO_MODULE_PATTERN = re.compile(r"^module\s+(\S+)", re.MULTILINE)
+
+# The graph being built, inherited by forked worker processes
+_state = {}
+
+
+class ImportGraph:
+    """
+    Maps each project file (posix path relative to the project root) to the
+    project files it imports.
+    """
+
+    def __init__(self):
+        self.root_path = None
+        self.files = set()
+        self.imports = {}
+        self._go_modules = {}
+        self._go_packages = {}
+        self._lock = threading.Lock()
+
+    def build(self, files, root_path: Path):
+        """
+        Index the imports of every file.  Called once per run.
+
+        :param files: List of absolute file paths in the project.
+        :param root_path: The project root the paths are relative to.
+        """
+        self.root_path = Path(root_path)
+        self.files = {
+            Path(os.path.relpath(file, root_path)).as_posix() for file in files
+        }
+        self._go_modules = self.find_go_modules()
+        self._go_packages = {}
+        for file in sorted(self.files):
+            if file.endswith(".go") and not file.endswith("_test.go"):
+                self._go_packages.setdefault(
+                    str(PurePosixPath(file).parent), []
+                ).append(file)
+
+        # reading and parsing every file is the costly part, spread it over cores
+        _state["graph"] = self
+        files = sorted(self.files)
+        imports = dict(zip(files, map_in_processes(find_imports, files)))
+
+        with self._lock:
+            self.imports = imports
+
+        edges = sum(len(deps) for deps in imports.values())
+        print(f"-> Import graph contains {edges} local imports.")
+
+    def update(self, files, changed):
+        """
+        Re-index after some files changed, without re-reading the others.
+
+        :param files: List of absolute file paths now in the project.
+        :param changed: List of absolute paths of files added or modified.
+        """
+        previous_files = self.files
+        self.files = {
+            Path(os.path.relpath(file, self.root_path)).as_posix() for file in files
+        }
+
+        if self.files != previous_files or any(
+            Path(file).name == "go.mod" for file in changed
+        ):
+            # resolution of every file may change when files appear or vanish,
+            # or when a go.mod declares a different module path
+            self.build(files, self.root_path)
+            return
+
+        imports = dict(self.imports)
+        for file in changed:
+            relative = Path(os.path.relpath(file, self.root_path)).as_posix()
+            imports[relative] = self.find_imports(relative)
+
+        with self._lock:
+            self.imports = imports
+
+    def dependencies(self, file: str):
+        """
+        The project files imported by a file, in import order.
+        :param file: Posix path relative to the project root.
+        """
+        return self.imports.get(PurePosixPath(file).as_posix(), [])
+
+    def dependents(self, file: str):
+        """
+        The project files that import a file.
+        :param file: Posix path relative to the project root.
+        """
+        file = PurePosixPath(file).as_posix()
+        return sorted(path for path, deps in self.imports.items() if file in deps)
+
+    def prefetch(self, file: str, token_budget: int, read=None):
+        """
+        Select the local dependencies of a file to inline in its prompt.
+
+        Direct imports are taken in import order and skipped when they would
+        exceed the remaining token budget.
+
+        :param file: Posix path relative to the project root.
+        :param token_budget: Maximum estimated tokens of inlined content.
+        :param read: Function returning the content to inline for a path,
+            defaults to the file's source.
+        :return: A list of (path, contents) tuples.
+        """
+        selected = []
+        read = read or self.read
+
+        if token_budget <= 0:
+            return selected
+
+        for dependency in self.dependencies(file):
+            contents = read(dependency)
+            if contents is None:
+                continue
+
+            tokens = estimate_tokens(contents)
+            if tokens > token_budget:
+                continue
+
+            token_budget -= tokens
+            selected.append((dependency, contents))
+
+        return selected
+
+    def read(self, file: str):
+        try:
+            return read_source(self.root_path / file)
+        except (OSError, UnicodeDecodeError):
+            return None
+
+    def find_imports(self, file: str):
+        if file.endswith(".py"):
+            finder = partial(self.find_python_imports, file)
+        elif file.endswith(JS_EXTENSIONS):
+            finder = partial(self.find_js_imports, file)
+        elif file.endswith(".go") and self._go_modules:
+            finder = self.find_go_imports
+        else:
+            return []
+
+        contents = self.read(file)
+        if contents is None:
+            return []
+
+        found = []
+        for dependency in finder(contents):
+            if dependency != file and dependency not in found:
+                found.append(dependency)
+
+        return found
+
+    def find_python_imports(self, file: str, contents: str):
+        try:
+            tree = ast.parse(contents)
+        except (SyntaxError, ValueError):
+            return
+
+        package = PurePosixPath(file).parent
+
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                for alias in node.names:
+                    yield from self.resolve_python_module(file, alias.name)
+
+            elif isinstance(node, ast.ImportFrom):
+                if node.level:
+                    base = package
+                    for _ in range(node.level - 1):
+                        base = base.parent
+                    parts = [] if str(base) == "." else [str(base)]
+                    module = "/".join(parts + (node.module or "").split("."))
+                    module = module.rstrip("/")
+                    candidates = [module] + [
+                        f"{module}/{alias.name}" for alias in node.names
+                    ]
+                    for candidate in candidates:
+                        yield from self.resolve_python_path(candidate)
+                else:
+                    yield from self.resolve_python_module(file, node.module)
+                    for alias in node.names:
+                        yield from self.resolve_python_module(
+                            file, f"{node.module}.{alias.name}"
+                        )
+
+    def resolve_python_module(self, file: str, module: str):
+        """
+        Resolve a dotted module name against the project root and every
+        directory containing the importing file (covers src/ layouts).
+        """
+        module_path = module.replace(".", "/")
+        parents = [PurePosixPath(file).parent, *PurePosixPath(file).parent.parents]
+
+        for parent in parents:
+            candidate = module_path if str(parent) == "." else f"{parent}/{module_path}"
+            resolved = list(self.resolve_python_path(candidate))
+            if resolved:
+                yield from resolved
+                return
+
+    def resolve_python_path(self, candidate: str):
+        for path in (f"{candidate}.py", f"{candidate}/__init__.py"):
+            if path in self.files:
+                yield path
+                return
+
+    def find_js_imports(self, file: str, contents: str):
+        directory = PurePosixPath(file).parent
+
+        for match in JS_IMPORT_PATTERN.finditer(contents):
+            specifier = next((group for group in match.groups() if group), None)
+            if specifier is None or not specifier.startswith("."):
+                continue
+
+            candidate = os.path.normpath((directory / specifier).as_posix())
+            for path in (
+                [candidate]
+                + [f"{candidate}{ext}" for ext in JS_EXTENSIONS]
+                + [f"{candidate}/index{ext}" for ext in JS_EXTENSIONS]
+            ):
+                if path in self.files:
+                    yield path
+                    break
+
+    def find_go_modules(self):
+        """
+        Map the directory of every go.mod to its module path.
+        """
+        modules = {}
+        for file in self.files:
+            if PurePosixPath(file).name == "go.mod":
+                match = GO_MODULE_PATTERN.search(self.read(file) or "")
+                if match:
+                    modules[str(PurePosixPath(file).parent)] = match.group(1)
+        return modules
+
+    def find_go_imports(self, contents: str):
+        specs = GO_IMPORT_LINE_PATTERN.findall(contents)
+        for block in GO_IMPORT_BLOCK_PATTERN.findall(contents):
+            specs += GO_IMPORT_SPEC_PATTERN.findall(block)
+
+        for spec in specs:
+            for module_dir, module in self._go_modules.items():
+                if spec != module and not spec.startswith(module + "/"):
+                    continue
+
+                package_dir = str(
+                    PurePosixPath(module_dir, spec[len(module) :].strip("/"))
+                )
+                yield from self._go_packages.get(package_dir, [])
+
+
+def find_imports(file: str):
+    return _state["graph"].find_imports(file)
+
+
+# Create a global import graph, built once per run by main
+import_graph = ImportGraph()
@@ -0,0 +1,185 @@
+"""
+Batch mode: document every repository listed in a manifest in one run, with
+one provider, one rate limiter and one response cache for all of them.
+
+The repositories are documented one after the other in this process, each
+with all of the --workers workers.  The configuration, the run context, the
+output store and the search index describe one repository at a time, so they
+take over those of each repository in turn, while the provider clients stay
+warm across repositories.
+
+manifest:
+    {
+        "repositories": [
+            {"input": "../billing", "output": "docs/billing"},
+            {"input": "../search", "output": "docs/search", "options": ["--ref", "v2"]}
+        ]
+    }
+"""
+
+import json
+import subprocess
+from pathlib import Path
+from config import Config, config
+from run_context import RunContext, run_context
+from file import git_ref
+from document import doc_summaries, output_store
+from run import metrics, response_cache
+from search import search_index
+
+
+def read_manifest(manifest_path: Path):
+    """
+    Read the repositories of a manifest.  Paths are relative to the manifest.
+
+    Args:
+        manifest_path: The path to the JSON manifest.
+
+    Returns:
+        A list of (name, input path, output path, options) tuples, or None if
+        the manifest is invalid.
+    """
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Error: cannot read manifest '{manifest_path}': {e}")
+        return None
+
+    entries = manifest.get("repositories") if isinstance(manifest, dict) else manifest
+    if not isinstance(entries, list) or not entries:
+        print(f"Error: manifest '{manifest_path}' lists no repositories.")
+        return None
+
+    repositories = []
+    names = set()
+    for index, entry in enumerate(entries, start=1):
+        if (
+            not isinstance(entry, dict)
+            or not entry.get("input")
+            or not entry.get("output")
+        ):
+            print(
+                f"Error: repository {index} of the manifest needs an input and an output."
+            )
+            return None
+
+        input_path = (manifest_path.parent / entry["input"]).resolve()
+        output_path = (manifest_path.parent / entry["output"]).resolve()
+        if not input_path.exists() and "--ref" not in entry.get("options", []):
+            print(f"Error: '{input_path}' does not exist.")
+            return None
+
+        # names tell the output of the repositories apart
+        name = entry.get("name") or input_path.name
+        while name in names:
+            name = f"{name}-{index}"
+        names.add(name)
+
+        repositories.append(
+            (name, input_path, output_path, list(entry.get("options", [])))
+        )
+
+    return repositories
+
+
+class Repository:
+    """
+    One repository of a batch run, with its own configuration, run context,
+    output store and search index.  The journal and the indexes of the
+    project are opened by the run documenting it.
+    """
+
+    def __init__(self, name: str, input_path: Path, output_path: Path, options):
+        self.name = name
+        self.argv = [str(input_path), str(output_path), *options]
+        self.config = None
+        self.run_context = None
+
+    def open(self):
+        """
+        Make the modules of doc-buddy describe this repository.
+
+        Raises:
+            SystemExit: If its options or its ref are invalid.
+        """
+        self.config = Config(self.argv)
+        config.take(self.config)
+
+        try:
+            git_ref.open(config.targets_root_path, config.ref)
+        except subprocess.CalledProcessError as e:
+            print(f"Error: cannot read ref '{config.ref}': {e.stderr.decode().strip()}")
+            raise SystemExit(1) from e
+
+        self.run_context = RunContext()
+        run_context.take(self.run_context)
+        output_store.reopen()
+        search_index.reopen(config.output_path)
+
+        # summaries and metrics of the previous repository do not carry over
+        doc_summaries.clear()
+        metrics.reset()
+
+    def close(self):
+        output_store.close()
+        search_index.close()
+        git_ref.close()
+
+
+def run_batch(document) -> bool:
+    """
+    Document every repository of the manifest given to "doc-buddy batch".
+
+    Repositories are documented one after the other with the --workers
+    workers, and share one provider, the AI_RATE_LIMIT_RPM request budget and
+    one response cache.
+
+    Args:
+        document: The function documenting the configured project, called
+            with the input path, dry run and summary flags of each repository.
+
+    Returns:
+        True if every repository was documented.
+    """
+    repositories = read_manifest(Path(config.manifest))
+    if repositories is None:
+        return False
+
+    options = ["--workers", str(config.workers), *config.batch_options]
+
+    print(
+        f"-> Documenting {len(repositories)} repositories with {config.workers} workers."
+    )
+
+    failed = []
+    for index, (name, input_path, output_path, extra) in enumerate(
+        repositories, start=1
+    ):
+        print(f"-> {name} ({index}/{len(repositories)})")
+        repository = Repository(name, input_path, output_path, [*options, *extra])
+
+        try:
+            repository.open()
+            document(config.input_path, config.dry_run, config.summary)
+            ok = True
+        except SystemExit as e:
+            ok = e.code in (None, 0)
+        except Exception as e:
+            print(f"Error: documenting {name} failed: {e}")
+            ok = False
+        finally:
+            repository.close()
+
+        print(f"-> {name}: {'done' if ok else 'failed'}")
+        if not ok:
+            failed.append(name)
+
+    print(
+        f"-> Shared cache: {response_cache.hits} hits, {response_cache.misses} misses."
+    )
+
+    if failed:
+        print(f"Warning: {len(failed)} repositories failed: {', '.join(failed)}")
+
+    return not failed
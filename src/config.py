@@ -10,6 +10,7 @@ paths:
 """
 
 import os
+import sys
 import argparse
 from pathlib import Path
 from typing import List
@@ -34,27 +35,92 @@ class Config(BaseModel):
     docbuddy_root_path: Path
 
     file_types: List[str]
+    priority: List[str] = []
     dry_run: bool = False
     summary: bool = False
     gitmode: bool = False
     provider: str
     model: str = ""
+    model_fast: str = ""
+    model_cost: str = ""
+    model_fast_cost: str = ""
+    routing_fast_max_tokens: int = 2000
+    routing_fast_max_definitions: int = 12
+    prefetch_token_budget: int = 6000
+    related_files: int = 8
+    related_token_budget: int = 1500
+    tree_token_budget: int = 8000
+    rate_limit_rpm: float = 0
+    request_timeout: float = 300
+    hedge_budget: float = 0
+    fallback_provider: str = ""
+    fallback_model: str = ""
+    fallback_model_cost: str = ""
+    fallback_after_timeouts: int = 2
+    max_tool_rounds: int = 8
+    max_tool_input_tokens: int = 200000
+    max_tool_seconds: float = 300
+    compact_tool_results_after: int = 3
+    max_tool_file_bytes: int = 100000
+    context_tokens: int = 128000
     documentation_suffix: str = ".md"
     project_name: str = ""
     ai_prompt: str = ""
     prompt_debug: bool = False
+    resume: bool = False
+    update: bool = False
+    workers: int = 1
+    processes: int = 0
+    watch: bool = False
+    serve: bool = False
+    port: int = 8765
+    command: str = "document"
+    bundle: bool = False
+    ref: str = ""
+    search_query: str = ""
+    manifest: str = ""
+    batch_options: List[str] = []
+    search_limit: int = 10
+    shard_index: int = 0
+    shard_count: int = 0
 
-    def __init__(self):
+    def __init__(self, argv: List[str] = None):
         user_cwd = Path(os.getenv("USER_CWD", os.getcwd()))
         load_dotenv()
         os.chdir(user_cwd)
 
         docbuddy_root_path = Path(__file__).resolve().parent
 
-        args = self.parse_args()
+        args = self.parse_args(argv)
 
         provider = os.getenv("AI_PROVIDER", "")
         model = os.getenv("AI_MODEL", "")
+        model_fast = os.getenv("AI_MODEL_FAST", "")
+        model_cost = os.getenv("AI_MODEL_COST", "")
+        model_fast_cost = os.getenv("AI_MODEL_FAST_COST", "")
+        routing_fast_max_tokens = int(os.getenv("AI_ROUTING_FAST_MAX_TOKENS", "2000"))
+        routing_fast_max_definitions = int(
+            os.getenv("AI_ROUTING_FAST_MAX_DEFINITIONS", "12")
+        )
+        prefetch_token_budget = int(os.getenv("AI_PREFETCH_TOKEN_BUDGET", "6000"))
+        related_files = int(os.getenv("AI_RELATED_FILES", "8"))
+        related_token_budget = int(os.getenv("AI_RELATED_TOKEN_BUDGET", "1500"))
+        tree_token_budget = int(os.getenv("AI_TREE_TOKEN_BUDGET", "8000"))
+        rate_limit_rpm = float(os.getenv("AI_RATE_LIMIT_RPM", "0"))
+        request_timeout = float(os.getenv("AI_REQUEST_TIMEOUT", "300"))
+        hedge_budget = float(os.getenv("AI_HEDGE_BUDGET", "0"))
+        fallback_provider = os.getenv("AI_FALLBACK_PROVIDER", "")
+        fallback_model = os.getenv("AI_FALLBACK_MODEL", "")
+        fallback_model_cost = os.getenv("AI_FALLBACK_MODEL_COST", "")
+        fallback_after_timeouts = int(os.getenv("AI_FALLBACK_AFTER_TIMEOUTS", "2"))
+        max_tool_rounds = int(os.getenv("AI_MAX_TOOL_ROUNDS", "8"))
+        max_tool_input_tokens = int(os.getenv("AI_MAX_TOOL_INPUT_TOKENS", "200000"))
+        max_tool_seconds = float(os.getenv("AI_MAX_TOOL_SECONDS", "300"))
+        compact_tool_results_after = int(
+            os.getenv("AI_COMPACT_TOOL_RESULTS_AFTER", "3")
+        )
+        max_tool_file_bytes = int(os.getenv("AI_MAX_TOOL_FILE_BYTES", "100000"))
+        context_tokens = int(os.getenv("AI_CONTEXT_TOKENS", "128000"))
         ai_prompt = os.getenv("AI_PROMPT", "")
         documentation_suffix = os.getenv("DOCUMENTATION_SUFFIX", ".md")
 
@@ -72,9 +138,37 @@ class Config(BaseModel):
         )
 
         file_types = args.file_types if args.file_types is not None else []
+        priority = args.priority if args.priority is not None else []
         dry_run = args.dry_run if args.dry_run is not None else False
         summary = args.summary if args.summary is not None else False
         prompt_debug = args.prompt_debug if args.prompt_debug is not None else False
+        resume = args.resume if args.resume is not None else False
+        update = args.update if args.update is not None else False
+        workers = max(1, args.workers) if args.workers is not None else 1
+        processes = max(1, args.processes) if args.processes is not None else 0
+        watch = args.watch if args.watch is not None else False
+        serve = args.serve if args.serve is not None else False
+        port = args.port if args.port is not None else 8765
+        bundle = args.bundle if args.bundle is not None else False
+        ref = args.ref if args.ref is not None else ""
+        shard_index, shard_count = args.shard if args.shard is not None else (0, 0)
+
+        if ref and not gitmode:
+            print("Error: --ref needs a git repository.")
+            sys.exit(1)
+
+        if args.command == "batch" and (watch or serve or args.shard or ref):
+            print("Error: batch runs cannot be used with --watch, --serve or --shard.")
+            print(
+                "A --ref can be given in the options of a repository of the manifest."
+            )
+            sys.exit(1)
+
+        if ref and (watch or serve):
+            print(
+                "Error: --ref documents a fixed ref, it cannot be used with --watch or --serve."
+            )
+            sys.exit(1)
 
         super().__init__(
             docbuddy_root_path=docbuddy_root_path,
@@ -83,21 +177,118 @@ class Config(BaseModel):
             targets_root_path=targets_root_path,
             user_cwd=user_cwd,
             file_types=file_types,
+            priority=priority,
             dry_run=dry_run,
             summary=summary,
             gitmode=gitmode,
             provider=provider,
             model=model,
+            model_fast=model_fast,
+            model_cost=model_cost,
+            model_fast_cost=model_fast_cost,
+            routing_fast_max_tokens=routing_fast_max_tokens,
+            routing_fast_max_definitions=routing_fast_max_definitions,
+            prefetch_token_budget=prefetch_token_budget,
+            related_files=related_files,
+            related_token_budget=related_token_budget,
+            tree_token_budget=tree_token_budget,
+            rate_limit_rpm=rate_limit_rpm,
+            request_timeout=request_timeout,
+            hedge_budget=hedge_budget,
+            fallback_provider=fallback_provider,
+            fallback_model=fallback_model,
+            fallback_model_cost=fallback_model_cost,
+            fallback_after_timeouts=fallback_after_timeouts,
+            max_tool_rounds=max_tool_rounds,
+            max_tool_input_tokens=max_tool_input_tokens,
+            max_tool_seconds=max_tool_seconds,
+            compact_tool_results_after=compact_tool_results_after,
+            max_tool_file_bytes=max_tool_file_bytes,
+            context_tokens=context_tokens,
             ai_prompt=ai_prompt,
             project_name=project_name,
             documentation_suffix=documentation_suffix,
             prompt_debug=prompt_debug,
+            resume=resume,
+            update=update,
+            workers=workers,
+            processes=processes,
+            watch=watch,
+            serve=serve,
+            port=port,
+            command=args.command,
+            bundle=bundle,
+            ref=ref,
+            search_query=" ".join(args.query),
+            search_limit=args.limit,
+            manifest=str(Path(args.manifest).resolve()) if args.manifest else "",
+            batch_options=args.batch_options,
+            shard_index=shard_index,
+            shard_count=shard_count,
         )
 
         # change to the project path
         os.chdir(os.getenv("USER_CWD", os.getcwd()))
 
-    def parse_args(self):
+    def take(self, other: "Config"):
+        """
+        Take over the settings of another configuration, so that every module
+        holding this one sees them.  A batch run takes over the configuration
+        of each repository in turn.
+        """
+        for name, value in other:
+            setattr(self, name, value)
+
+    def parse_args(self, argv: List[str] = None):
+        argv = list(sys.argv[1:] if argv is None else argv)
+        command = "document"
+
+        # "doc-buddy merge <input> <output>" combines the output of sharded runs,
+        # "doc-buddy export <input> <output>" exports a bundle to markdown files
+        if argv and argv[0] in ("merge", "export", "search", "batch"):
+            command = argv.pop(0)
+
+        # "doc-buddy search <query>" searches the documentation in --docs
+        search_args = None
+        if command == "search":
+            search_parser = argparse.ArgumentParser(
+                prog="doc-buddy search",
+                description="Search the generated documentation.",
+            )
+            search_parser.add_argument(
+                "query", type=str, nargs="+", help="Search terms."
+            )
+            search_parser.add_argument(
+                "--docs",
+                type=str,
+                default="docs",
+                help="The path to the documentation root (default 'docs').",
+            )
+            search_parser.add_argument(
+                "--limit", type=int, default=10, help="Number of results (default 10)."
+            )
+            search_args = search_parser.parse_args(argv)
+            argv = [".", search_args.docs]
+
+        # "doc-buddy batch <manifest>" documents every repository of a manifest,
+        # the options that follow apply to each of them
+        batch_args = None
+        if command == "batch":
+            batch_parser = argparse.ArgumentParser(
+                prog="doc-buddy batch",
+                description="Document the repositories listed in a manifest in one run.",
+            )
+            batch_parser.add_argument(
+                "manifest", type=str, help="A JSON file listing input and output paths."
+            )
+            batch_parser.add_argument(
+                "options",
+                nargs=argparse.REMAINDER,
+                help="Options for every repository (e.g., '--file-types py --workers 8').",
+            )
+            batch_args = batch_parser.parse_args(argv)
+            argv = [".", ".", *batch_args.options]
+
         parser = argparse.ArgumentParser(
             description="Read a file or directory and optionally run in dry-run mode."
         )
@@ -113,10 +304,16 @@ class Config(BaseModel):
             nargs="*",
             help="File types to process when input is a directory (e.g., 'py js jsx').",
         )
+        parser.add_argument(
+            "--priority",
+            type=str,
+            nargs="+",
+            help="Path globs of files to document first, in order (e.g., 'src/core/*').",
+        )
         parser.add_argument(
             "--dry-run",
             action="store_true",
-            help="Perform a dry run without actually reading the file.",
+            help="Forecast tokens, cost and time without generating documentation.",
         )
         parser.add_argument(
             "--summary",
@@ -128,11 +325,81 @@ class Config(BaseModel):
             action="store_true",
             help="Print the prompt for the AI model and exit.",
         )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Skip files completed by a previous interrupted run and retry failures.",
+        )
+        parser.add_argument(
+            "--update",
+            action="store_true",
+            help="Patch the documentation of changed files from a diff of their source.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            help="Number of files to document concurrently (default 1).",
+        )
+        parser.add_argument(
+            "--processes",
+            type=int,
+            help="Number of processes parsing and indexing files (default: one per core).",
+        )
+        parser.add_argument(
+            "--watch",
+            action="store_true",
+            help="Keep running and re-document files in the directory as they change.",
+        )
+        parser.add_argument(
+            "--serve",
+            action="store_true",
+            help="Run a local HTTP service that documents files submitted as jobs.",
+        )
+        parser.add_argument(
+            "--port",
+            type=int,
+            help="Port for --serve (default 8765).",
+        )
+        parser.add_argument(
+            "--bundle",
+            action="store_true",
+            help="Write all documentation into one SQLite bundle in the output folder.",
+        )
+        parser.add_argument(
+            "--ref",
+            type=str,
+            help="Document a git tag, branch or commit without checking it out.",
+        )
+        parser.add_argument(
+            "--shard",
+            type=self.parse_shard,
+            help="Only document shard i of N (e.g., '2/4'), then run 'merge'.",
+        )
 
         # Parsing the arguments
-        args = parser.parse_args()
+        args = parser.parse_args(argv)
+        args.command = command
+        args.query = search_args.query if search_args else []
+        args.limit = search_args.limit if search_args else 10
+        args.manifest = batch_args.manifest if batch_args else ""
+        args.batch_options = batch_args.options if batch_args else []
         return args
 
+    @staticmethod
+    def parse_shard(value: str):
+        """
+        Parse a 1-based "i/N" shard specification.
+        """
+        try:
+            index, count = (int(part) for part in value.split("/"))
+        except ValueError as e:
+            raise argparse.ArgumentTypeError("shard must look like 'i/N'") from e
+
+        if not 1 <= index <= count:
+            raise argparse.ArgumentTypeError("shard index must be between 1 and N")
+
+        return index, count
+
     def find_gitmode(self, input_path: Path, user_cwd: Path):
         targets_root_path = input_path
         gitmode = False
@@ -140,7 +407,8 @@ class Config(BaseModel):
         # Change directory to the file's parent or the directory itself
         if input_path.is_file():
             os.chdir(input_path.parent)
-        else:
+        elif input_path.is_dir():
+            # with --ref, the input may only exist in the ref
             os.chdir(input_path)
 
         # Start searching for a ".git" directory in containing directories
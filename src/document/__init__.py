@@ -2,17 +2,28 @@
 from .generate_toc import generate_toc
 from .generate_doc import generate_doc
 from .generate_footer import generate_footer
-from .guess_language_for_markdown import guess_language_for_markdown
 from .generate_preface import generate_preface
 from .generate_code_block import generate_code_block
 from .add_readme import add_readme
+from .doc_summaries import DocSummaries, doc_summaries
+from .document_files import document_files
+from .merge_shards import merge_shards
+from .output_store import MarkdownOutput, BundleOutput, output_store
+from .export_bundle import export_bundle
 
 __all__ = [
     "generate_toc",
     "generate_doc",
     "generate_footer",
-    "guess_language_for_markdown",
     "generate_preface",
     "generate_code_block",
     "add_readme",
+    "DocSummaries",
+    "doc_summaries",
+    "document_files",
+    "merge_shards",
+    "MarkdownOutput",
+    "BundleOutput",
+    "output_store",
+    "export_bundle",
 ]
@@ -1,5 +1,5 @@
-import os
 from config import config
+from .output_store import output_store
 
 
 def add_readme():
@@ -9,6 +9,5 @@ def add_readme():
     with open(readme_path, "r", encoding="utf-8") as file:
         readme = file.read()
 
-    # write that file to config.output_path / 'README.txt'
-    with open(config.output_path / "README.txt", "w", encoding="utf-8") as file:
-        file.write(readme)
+    # write that file to README.txt in the output
+    output_store.write("README.txt", readme)
@@ -0,0 +1,83 @@
+"""
+This module keeps short summaries of the documentation generated during a run,
+so that files which import an already documented file can be given its
+summary instead of its full source.
+"""
+
+import threading
+from pathlib import PurePosixPath
+
+SUMMARY_MAX_CHARS = 1500
+CODE_LISTING_MARKER = "\n# Full listing of "
+
+
+class DocSummaries:
+    """
+    Thread-safe map of project file (posix path relative to the project
+    root) to a summary of its generated documentation.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._summaries = {}
+
+    def add(self, file, documentation: str):
+        """
+        Store the summary of the documentation generated for a file.
+        :param file: Path relative to the project root.
+        :param documentation: The documentation returned by the AI provider.
+        """
+        summary = summarize_documentation(documentation)
+
+        if summary:
+            with self._lock:
+                self._summaries[PurePosixPath(file).as_posix()] = summary
+
+    def add_from_output(self, file, documentation):
+        """
+        Store the summary of documentation written by a previous run.
+        :param file: Path relative to the project root.
+        :param documentation: The generated markdown page, or None.
+        """
+        if documentation is None:
+            return
+
+        # drop the preface (everything up to the first rule) and the listing
+        _, rule, body = documentation.partition("\n---\n")
+        body = body if rule else documentation
+        self.add(file, body.split(CODE_LISTING_MARKER, 1)[0])
+
+    def clear(self):
+        """
+        Forget every summary, before documenting another project.
+        """
+        with self._lock:
+            self._summaries = {}
+
+    def get(self, file):
+        """
+        The summary for a file, or None if it was not documented in this run.
+        """
+        with self._lock:
+            return self._summaries.get(PurePosixPath(file).as_posix())
+
+
+def summarize_documentation(documentation: str, max_chars=SUMMARY_MAX_CHARS):
+    """
+    Shorten documentation to its opening paragraphs.
+    :return: At most max_chars characters, cut at a paragraph break if possible.
+    """
+    documentation = (documentation or "").strip()
+
+    if len(documentation) <= max_chars:
+        return documentation
+
+    cut = documentation.rfind("\n\n", 0, max_chars)
+    if cut < max_chars // 2:
+        cut = max_chars
+
+    return documentation[:cut].rstrip() + "\n..."
+
+
+# Create a global summary store to be shared across all modules
+doc_summaries = DocSummaries()
@@ -0,0 +1,103 @@
+from fnmatch import fnmatch
+from config import config
+from analysis import estimate_file_costs, import_graph
+from file import file_table, get_file_table_path
+from run import (
+    get_report_path,
+    metrics,
+    progress,
+    run_in_dependency_order,
+    shard_name,
+)
+from .generate_doc import generate_doc
+
+
+def document_files(files, provider, tree, journal=None):
+    """
+    Document several files on the configured number of workers.
+
+    Imported files are documented first, so that their summaries can stand in
+    for their source in the files importing them.  With several workers, or
+    with --priority globs, the longest files start first.
+
+    Args:
+        files: List of absolute paths of the files to document.
+        provider: The AI provider.
+        tree: The rendered context tree of the project.
+        journal: Optional journal recording the outcome of each file.
+
+    Returns:
+        A dict of file path to True if its documentation is up to date.
+    """
+    results = {}
+
+    def relative(file):
+        return file.relative_to(config.targets_root_path).as_posix()
+
+    by_relative_path = {relative(file): file for file in files}
+
+    def dependencies(file):
+        return [
+            by_relative_path[dependency]
+            for dependency in import_graph.dependencies(relative(file))
+            if dependency in by_relative_path
+        ]
+
+    def worker(file):
+        results[file] = generate_doc(file, provider, tree, journal)
+
+    costs = None
+    if config.workers > 1 or config.priority:
+        costs = schedule_costs(files)
+
+    progress.start(len(files))
+    try:
+        run_in_dependency_order(
+            provider.order_files(files), dependencies, worker, config.workers, costs
+        )
+    finally:
+        progress.stop()
+
+    save_outcomes(results)
+
+    return results
+
+
+def save_outcomes(results):
+    """
+    Record the outcome of every file, and the time its requests took, in the
+    file table, and save it for scheduling the next run.
+    """
+    name = (
+        shard_name(config.shard_index, config.shard_count) if config.shard_count else ""
+    )
+    history = metrics.file_history()
+
+    for file, succeeded in results.items():
+        path = file.relative_to(config.targets_root_path).as_posix()
+        file_table.record(path, succeeded, history.get(path, {}).get("latency"))
+
+    file_table.save(get_file_table_path(config.output_path, name))
+
+
+def schedule_costs(files):
+    """
+    Estimated cost of every file, raised for files matching --priority globs
+    so that they outrank every file matching a later glob or none.
+    """
+    name = (
+        shard_name(config.shard_index, config.shard_count) if config.shard_count else ""
+    )
+    costs = estimate_file_costs(
+        files, config.targets_root_path, get_report_path(config.output_path, name)
+    )
+    boost = sum(costs.values()) + 1
+
+    for file in files:
+        path = file.relative_to(config.targets_root_path).as_posix()
+        for index, pattern in enumerate(config.priority):
+            if fnmatch(path, pattern):
+                costs[file] += boost * (len(config.priority) - index)
+                break
+
+    return costs
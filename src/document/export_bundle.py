@@ -0,0 +1,30 @@
+from config import config
+from .output_store import BundleOutput, MarkdownOutput
+
+
+def export_bundle():
+    """
+    Export the documentation bundle in the output directory to the markdown
+    layout: one file per documented source file next to index.md.
+
+    Returns:
+        True if a bundle was found and exported.
+    """
+    bundle = BundleOutput(config.output_path)
+
+    if not bundle.path.exists():
+        print(f"Error: no documentation bundle found in '{config.output_path}'.")
+        return False
+
+    markdown = MarkdownOutput(config.output_path)
+
+    try:
+        names = bundle.names()
+        for name in names:
+            markdown.write(name, bundle.read(name))
+    finally:
+        bundle.close()
+
+    print(f"-> Exported {len(names)} files from {bundle.path.name}.")
+
+    return True
@@ -1,4 +1,4 @@
-from .guess_language_for_markdown import guess_language_for_markdown
+from file import guess_language_for_markdown
 
 
 def generate_code_block(code: str, file_name: str) -> str:
@@ -1,121 +1,138 @@
-import os
-import sys
-import threading
-import time
 from pathlib import Path
 from os.path import basename
 from config import config
+from run import metrics, progress
+from file import read_source, source_key
+from analysis import extract_outline
+from search import search_index
 from .generate_footer import generate_footer
 from .generate_preface import generate_preface
 from .generate_code_block import generate_code_block
+from .doc_summaries import doc_summaries
+from .output_store import output_store
+from .update_doc import read_previous, diff_source, is_small_change, apply_sections
 
-done = False
-current_file = None
-messages = []
 
-
-def spinner():
-    """
-    Function to show a spinner while a task is running.
-    Displays any additional messages (e.g., LLM file requests).
-    """
-    spinner_chars = ["|", "/", "-", "\\"]
-    idx = 0
-    last_message_count = 0  # Track the number of messages previously displayed
-
-    while not done:
-        # If new messages have arrived, print them once
-        if len(messages) > last_message_count:
-            # Move cursor up and clear the line to remove the spinner
-            sys.stdout.write("\r\033[K")  # Clear the current line (spinner line)
-
-            # Print the new message
-            new_message = messages[last_message_count]
-            sys.stdout.write(f"{new_message}\n")
-
-            last_message_count += 1  # Update count of printed messages
-
-        # Always rewrite the spinner line at the bottom
-        sys.stdout.write(f"\rDocumenting file {current_file} {spinner_chars[idx]}")
-        sys.stdout.flush()
-
-        idx = (idx + 1) % len(spinner_chars)
-        time.sleep(0.1)
-
-    messages.clear()  # Clear any remaining messages
-    idx = 0
-
-
-def notify_user_toast(message: str):
-    """
-    Function to add a message to the list that should be displayed to the user.
-    This allows the spinner to show messages without breaking the output format.
-    """
-    messages.append(message)
-
-
-def generate_doc(file_path: Path, provider, tree):
+def generate_doc(file_path: Path, provider, tree, journal=None):
     """
     Document a single file and write the output to a file with suffix.
+    If a journal is given, files it already records as complete are skipped
+    and the outcome of this file is appended to it.  Progress is reported to
+    the run progress, which shows every file in flight.
+
+    Returns True if the documentation is up to date, False on failure.
     """
     suffix = config.documentation_suffix
 
-    global done, current_file
-    done = False
-    current_file = file_path
-    input_path = config.input_path
-
     # get a path for the file_path without the input_path
     relative_path = file_path.relative_to(config.targets_root_path)
 
-    # Start spinner in a separate thread
-    spinner_thread = threading.Thread(target=spinner)
-    spinner_thread.start()
+    output_name = (relative_path.parent / (basename(relative_path) + suffix)).as_posix()
+    task = relative_path.as_posix()
+
+    try:
+        file_contents = read_source(file_path)
+    except (OSError, UnicodeDecodeError) as e:
+        print(f"Unable to read file {file_path}: {e}")
+        if journal is not None:
+            journal.record_failed(relative_path, "", str(e))
+        return False
+
+    source_hash = source_key(file_path, file_contents)
+
+    if journal is not None and journal.is_complete(
+        relative_path, source_hash, lambda: output_store.exists(output_name)
+    ):
+        progress.task_skipped(task, "completed in a previous run")
+        doc_summaries.add_from_output(relative_path, output_store.read(output_name))
+        return True
+
+    previous = read_previous(output_store.read(output_name)) if config.update else None
+    previous_documentation, previous_source = previous or (None, None)
+
+    if previous_source == file_contents:
+        progress.task_skipped(task, "unchanged since it was documented")
+        doc_summaries.add(relative_path, previous_documentation)
+        if journal is not None:
+            journal.record_done(
+                relative_path, source_hash, output_store.read(output_name)
+            )
+        return True
+
+    progress.task_started(task)
 
-    start_time = time.time()
+    def notify(message):
+        progress.task_message(task, message)
+
+    succeeded = False
 
     try:
-        with open(file_path, "r", encoding="utf-8") as file:
-            file_contents = file.read()
+        documentation = generate_preface(relative_path)
+
+        explanation = None
+
+        # Patch the previous documentation of a file with small changes
+        if previous_source is not None and is_small_change(
+            previous_source, file_contents
+        ):
+            explanation = apply_sections(
+                previous_documentation,
+                provider.document_file(
+                    file_name=basename(file_path),
+                    project_path=(relative_path.parent),
+                    file_contents=file_contents,
+                    notify_user_toast=notify,
+                    tree=tree,
+                    update=(
+                        previous_documentation,
+                        diff_source(
+                            previous_source, file_contents, relative_path.as_posix()
+                        ),
+                    ),
+                ),
+            )
 
-            documentation = generate_preface(relative_path)
+            # counted on the update call, whose outcome is only known now
+            metrics.amend(
+                "diff_updates" if explanation is not None else "diff_update_fallbacks"
+            )
 
-            # Document the file using the provider
-            documentation += provider.document_file(
+        # Document the file using the provider
+        if explanation is None:
+            explanation = provider.document_file(
                 file_name=basename(file_path),
                 project_path=(relative_path.parent),
                 file_contents=file_contents,
-                notify_user_toast=notify_user_toast,
+                notify_user_toast=notify,
                 tree=tree,
             )
+        documentation += explanation
 
-            if documentation:
-                footer = generate_footer(relative_path)
-                documentation += generate_code_block(file_contents, relative_path)
-                documentation += footer
+        if documentation:
+            footer = generate_footer(relative_path, model=provider.last_model())
+            documentation += generate_code_block(file_contents, relative_path)
+            documentation += footer
 
-                output_file_path = (
-                    config.output_path
-                    / relative_path.parent
-                    / (basename(relative_path) + suffix)
-                )
+            # Write the documentation to the output
+            output_store.write(output_name, documentation)
 
-                # create the directory if it does not exist
-                os.makedirs(os.path.dirname(output_file_path), exist_ok=True)
+            doc_summaries.add(relative_path, explanation)
+            search_index.update(
+                relative_path.as_posix(),
+                explanation,
+                extract_outline(file_contents, file_path.name) or file_contents,
+            )
+
+            if journal is not None:
+                journal.record_done(relative_path, source_hash, documentation)
 
-                # Write the documentation to the file
-                with open(output_file_path, "w", encoding="utf-8") as doc_file:
-                    doc_file.write(documentation)
+            succeeded = True
 
     except Exception as e:
         print(f"An error occurred during execution: {e}")
+        if journal is not None:
+            journal.record_failed(relative_path, source_hash, str(e))
     finally:
-        # Stop the spinner
-        done = True
-        spinner_thread.join()
-
-        # Clear the spinner line and print elapsed time
-        elapsed_time = time.time() - start_time
-        sys.stdout.write(
-            f"\rDocumenting file {file_path} - {elapsed_time:.2f} seconds\n"
-        )
+        progress.task_finished(task, succeeded)
+
+    return succeeded
@@ -1,5 +1,5 @@
 from pathlib import Path
-from config import config
+from run_context import run_context
 
 
 def generate_preface(file_path: Path):
@@ -20,10 +20,11 @@ def generate_preface(file_path: Path):
         raise ValueError("file_path must have at least 2 parts (e.g., dir/file)")
 
     block = ""
+    # the index page of the directory, which links up to the root
+    block += "[<< Table of Contents](index.md)\n\n"
     block += (
-        f"[<< Table of Contents](../{'../' * (len(file_path.parts) -2)}index.md)\n\n"
+        f"# AI Generated documentation for `{run_context.project_name}/{file_path}`\n"
     )
-    block += f"# AI Generated documentation for `{config.project_name}/{file_path}`\n"
     block += "---\n"
 
     return block
@@ -1,48 +1,242 @@
 """
 This module generates the Table of Contents (TOC) for the documentation.
+
+The table of contents is one small index page per directory, listing its
+subdirectories with their file counts and its documented files, split into
+pages of at most ENTRIES_PER_PAGE entries.  A hash of every page is kept in
+the output folder, so a run only rewrites the pages of directories whose
+contents changed.
 """
 
+import json
 import os
-from datetime import datetime
-from file import render_tree_html
+from pathlib import PurePosixPath
+from urllib.parse import quote
 from config import config
+from run import content_hash
+from run_context import run_context
 from .generate_footer import generate_footer
+from .output_store import output_store
+
+INDEX_FILE_NAME = "index.md"
+STATE_FILE_NAME = ".doc-buddy-toc.json"
+
+# The maximum number of subdirectories and files listed on one index page
+ENTRIES_PER_PAGE = 200
 
 
 def generate_toc(files):
     """
     Generates the Table of Contents (TOC) for the documentation.
     """
-    name = find_name()
-    header = generate_header(name)
-    body = render_tree_html(files, config.documentation_suffix)
-    footer = generate_footer(name, True)
+    name = run_context.project_name
+    directories = collect_directories(files)
+    previous = load_state()
+    pages = {}
+    written = 0
+
+    for directory in sorted(directories):
+        for page_name, body in render_directory(directory, directories):
+            page_hash = content_hash(body)
+            pages[page_name] = page_hash
+
+            # the root page is always rewritten, its footer records the commit
+            if (
+                page_name != INDEX_FILE_NAME
+                and previous.get(page_name) == page_hash
+                and output_store.exists(page_name)
+            ):
+                continue
+
+            footer = (
+                generate_footer(name, True)
+                if not directory
+                else generate_footer(directory)
+            )
+            output_store.write(page_name, body + footer)
+            written += 1
+
+    # a run over part of the tree leaves the pages of other directories alone
+    for page_name in sorted(set(previous) - set(pages)):
+        if is_stale_page(page_name, directories):
+            output_store.remove(page_name)
+        else:
+            pages[page_name] = previous[page_name]
+
+    save_state(pages)
+
+    print(f"-> Table of contents has {len(pages)} pages, {written} rewritten.")
+
+    output_store.write_metadata(
+        {
+            "project_name": name,
+            "commit_hash": run_context.commit_hash,
+            "branch": run_context.branch,
+            "dirty": run_context.dirty,
+            "timestamp": run_context.timestamp,
+            "files": len(files),
+        }
+    )
+
+
+def is_stale_page(page_name, directories):
+    """
+    Whether an index page of an earlier run that this run did not write is
+    out of date: its directory was indexed by this run, which needed fewer
+    pages, or no longer exists in the project.
 
-    path = str(config.output_path) + os.sep + "index.md"
-    with open(path, "w", encoding="utf-8") as f:
-        f.write(header)
-        f.write(body)
-        f.write(footer)
+    :param page_name: The posix name of the page, such as "src/index-2.md".
+    :param directories: The result of collect_directories.
+    """
+    directory = PurePosixPath(page_name).parent.as_posix()
+    directory = "" if directory == "." else directory
+
+    return (
+        directory in directories or not (config.targets_root_path / directory).is_dir()
+    )
 
 
-def generate_header(name):
+def collect_directories(files):
     """
-    Generates the header for the Table of Contents (TOC).
+    Group the documented files by directory.
+
+    :param files: List of absolute file paths.
+    :return: A dict of posix directory path ("" for the root) to a dict with
+        the names of its "directories" and "files" and its recursive file "count".
     """
-    date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    directories = {"": {"directories": set(), "files": [], "count": 0}}
+
+    for file_path in files:
+        path = PurePosixPath(
+            os.path.relpath(file_path, config.targets_root_path).replace(os.sep, "/")
+        )
+        parent = ""
+
+        for part in path.parts[:-1]:
+            directory = f"{parent}/{part}" if parent else part
+            directories[parent]["directories"].add(part)
+            directories[parent]["count"] += 1
+            directories.setdefault(
+                directory, {"directories": set(), "files": [], "count": 0}
+            )
+            parent = directory
+
+        directories[parent]["files"].append(path.name)
+        directories[parent]["count"] += 1
+
+    return directories
+
+
+def render_directory(directory, directories):
+    """
+    Render the index pages of one directory.
+
+    :param directory: Posix path of the directory, "" for the root.
+    :param directories: The result of collect_directories.
+    :return: A list of (page name, markdown without footer) tuples.
+    """
+    entry = directories[directory]
+    suffix = config.documentation_suffix
+
+    lines = []
+    for child in sorted(entry["directories"]):
+        count = directories[f"{directory}/{child}" if directory else child]["count"]
+        lines.append(
+            f"- [{child}/]({quote(child)}/{INDEX_FILE_NAME}) "
+            f"({plural(count, 'file')})\n"
+        )
+    for file in sorted(entry["files"]):
+        lines.append(f"- [{file}]({quote(file + suffix)})\n")
 
-    header = f"# Auto-generated Documentation for `{name}`\n"
-    header += "This documentation is generated automatically from the source code. "
-    header += "Do not edit this file directly.\n"
+    chunks = [
+        lines[i : i + ENTRIES_PER_PAGE] for i in range(0, len(lines), ENTRIES_PER_PAGE)
+    ]
+    chunks = chunks or [[]]
+    base = f"{directory}/" if directory else ""
+
+    pages = []
+    for number, chunk in enumerate(chunks, start=1):
+        body = generate_header(directory)
+        body += f"\n{plural(entry['count'], 'documented file')} in total, "
+        body += f"{plural(len(entry['directories']), 'directory', 'directories')} and "
+        body += f"{plural(len(entry['files']), 'file')} here.\n\n"
+        body += "".join(chunk)
+
+        if len(chunks) > 1:
+            body += "\n" + generate_page_links(number, len(chunks)) + "\n"
+
+        pages.append((base + page_file_name(number), body))
+
+    return pages
+
+
+def generate_header(directory):
+    """
+    Generates the header for an index page, with links to its parent directories.
+    """
+    name = run_context.project_name
+
+    if not directory:
+        header = f"# Auto-generated Documentation for `{name}`\n"
+        header += "This documentation is generated automatically from the source code. "
+        header += "Do not edit this file directly.\n"
+
+        return header
+
+    parts = directory.split("/")
+    crumbs = [f"[{name}]({'../' * len(parts)}{INDEX_FILE_NAME})"]
+    for depth, part in enumerate(parts[:-1], start=1):
+        crumbs.append(f"[{part}]({'../' * (len(parts) - depth)}{INDEX_FILE_NAME})")
+    crumbs.append(parts[-1])
+
+    header = f"# Auto-generated Documentation for `{name}/{directory}`\n"
+    header += " / ".join(crumbs) + "\n"
 
     return header
 
 
-def find_name():
+def generate_page_links(number, count):
     """
-    Finds the name of the project.
+    Links to the previous and next pages of a directory index.
     """
-    if config.gitmode:
-        return os.path.basename(config.targets_root_path)
+    links = []
+    if number > 1:
+        links.append(f"[<< Previous]({page_file_name(number - 1)})")
+    links.append(f"Page {number} of {count}")
+    if number < count:
+        links.append(f"[Next >>]({page_file_name(number + 1)})")
+
+    return " | ".join(links)
+
+
+def plural(count, singular, plural_form=None):
+    if count == 1:
+        return f"1 {singular}"
+
+    return f"{count} {plural_form or singular + 's'}"
+
+
+def page_file_name(number):
+    return INDEX_FILE_NAME if number == 1 else f"index-{number}.md"
+
+
+def load_state():
+    """
+    The page hashes written by the previous run, or an empty dict.
+    """
+    try:
+        with open(config.output_path / STATE_FILE_NAME, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def save_state(pages):
+    os.makedirs(config.output_path, exist_ok=True)
+    path = config.output_path / STATE_FILE_NAME
+    temporary_path = path.with_name(path.name + ".tmp")
+
+    with open(temporary_path, "w", encoding="utf-8") as file:
+        json.dump(pages, file)
 
-    return os.path.basename(os.getcwd())
+    os.replace(temporary_path, path)
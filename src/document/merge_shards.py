@@ -0,0 +1,109 @@
+from config import config
+from run import read_shard_manifests, shard_name
+from search import get_search_index_path, search_index
+from .generate_toc import generate_toc
+from .add_readme import add_readme
+from .output_store import get_bundle_path, output_store
+
+
+def merge_shards():
+    """
+    Combine the output of a sharded run: read the shard manifests in the
+    output directory, combine the bundles and search indexes of the
+    shards, then generate the table of contents and README once for all
+    shards.
+
+    Returns:
+        True if every shard was present and documented all of its files.
+    """
+    manifests = read_shard_manifests(config.output_path)
+
+    if not manifests:
+        print(f"Error: no shard manifests found in '{config.output_path}'.")
+        return False
+
+    shard_count = manifests[0]["shard_count"]
+    found = {manifest["shard_index"] for manifest in manifests}
+    missing = sorted(set(range(1, shard_count + 1)) - found)
+    commits = {manifest["commit_hash"] for manifest in manifests}
+
+    if missing:
+        print(f"Warning: missing manifests for shards {missing} of {shard_count}.")
+
+    if any(manifest["shard_count"] != shard_count for manifest in manifests):
+        print("Warning: manifests from runs with different shard counts were found.")
+
+    if len(commits) > 1:
+        print(f"Warning: shards documented different commits: {sorted(commits)}.")
+
+    statuses = {}
+    for manifest in manifests:
+        statuses.update(manifest["files"])
+
+    failed = sorted(path for path, status in statuses.items() if status != "done")
+    files = sorted(config.targets_root_path / path for path in statuses)
+
+    print(f"-> Merging {len(manifests)} shards with {len(files)} files.")
+    if failed:
+        print(f"Warning: {len(failed)} files failed to document: {', '.join(failed)}")
+
+    if not merge_bundles(manifests):
+        return False
+
+    merge_search_indexes(manifests)
+    generate_toc(files)
+    add_readme()
+
+    return not missing and not failed
+
+
+def merge_bundles(manifests):
+    """
+    Combine the bundle of every shard run with --bundle into the bundle of
+    the output directory.
+
+    Returns:
+        False if shards wrote bundles but the merge was not run with --bundle.
+    """
+    bundle_paths = [
+        get_bundle_path(
+            config.output_path,
+            shard_name(manifest["shard_index"], manifest["shard_count"]),
+        )
+        for manifest in manifests
+    ]
+    bundle_paths = [path for path in bundle_paths if path.exists()]
+
+    if not bundle_paths:
+        return True
+
+    # only a bundle can take in the bundles of the shards
+    if not hasattr(output_store, "merge"):
+        print(
+            "Error: the shards were documented with --bundle, merge them with --bundle."
+        )
+        return False
+
+    for bundle_path in bundle_paths:
+        output_store.merge(bundle_path)
+
+    print(f"-> Bundle combined from {len(bundle_paths)} shards.")
+    return True
+
+
+def merge_search_indexes(manifests):
+    """
+    Combine the search index of every shard into the search index of the
+    output directory.
+    """
+    merged = 0
+
+    for manifest in manifests:
+        name = shard_name(manifest["shard_index"], manifest["shard_count"])
+        index_path = get_search_index_path(config.output_path, name)
+        if index_path.exists():
+            search_index.merge(index_path)
+            merged += 1
+
+    if merged:
+        print(f"-> Search index combined from {merged} shards.")
@@ -0,0 +1,253 @@
+"""
+This module stores the generated documentation.  Documentation is either
+written as a tree of markdown files mirroring the project, or into a single
+SQLite bundle in the output folder, which is much faster to write, sync and
+serve for large projects.
+
+Outputs are named by their posix path relative to the output folder, for
+example "src/main.py.md" or "index.md", in both layouts.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from config import config
+from run import shard_name
+
+BUNDLE_FILE_NAME = "doc-buddy-bundle.sqlite"
+
+
+class MarkdownOutput:
+    """
+    Writes each output to its own file under the output folder.
+    """
+
+    def __init__(self, output_path: Path):
+        self.output_path = Path(output_path)
+
+    def write(self, name: str, content: str):
+        path = self.output_path / name
+        os.makedirs(path.parent, exist_ok=True)
+
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(content)
+
+    def read(self, name: str):
+        """
+        The content of an output, or None if it does not exist.
+        """
+        try:
+            with open(self.output_path / name, "r", encoding="utf-8") as file:
+                return file.read()
+        except (OSError, UnicodeDecodeError):
+            return None
+
+    def exists(self, name: str) -> bool:
+        return (self.output_path / name).is_file()
+
+    def remove(self, name: str) -> bool:
+        """
+        Remove an output.
+        :return: True if it existed.
+        """
+        path = self.output_path / name
+
+        if not path.exists():
+            return False
+
+        path.unlink()
+        return True
+
+    def write_metadata(self, values):
+        """
+        Markdown output keeps its metadata in the page footers.
+        """
+
+    def close(self):
+        """
+        Nothing to close for markdown output.
+        """
+
+
+class BundleOutput:
+    """
+    Writes all outputs into one SQLite database.  Every output is one
+    zlib-compressed row keyed by its name, so single documents can be read
+    or replaced without touching the rest of the bundle, and an interrupted
+    run loses at most the document being written.
+    """
+
+    def __init__(self, output_path: Path, name: str = ""):
+        self.path = get_bundle_path(output_path, name)
+        self._lock = threading.Lock()
+        self._connection = None
+
+    @property
+    def connection(self):
+        # opened on first use, so that a dry run does not create a bundle
+        if self._connection is None:
+            os.makedirs(self.path.parent, exist_ok=True)
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS outputs "
+                "(name TEXT PRIMARY KEY, content BLOB NOT NULL, updated REAL NOT NULL)"
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS metadata (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+            )
+            connection.commit()
+            self._connection = connection
+
+        return self._connection
+
+    def write(self, name: str, content: str):
+        data = zlib.compress(content.encode("utf-8"))
+
+        with self._lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO outputs (name, content, updated) VALUES (?, ?, ?)",
+                (name, data, time.time()),
+            )
+            self.connection.commit()
+
+    def read(self, name: str):
+        """
+        The content of an output, or None if it does not exist.
+        """
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT content FROM outputs WHERE name = ?", (name,)
+            ).fetchone()
+
+        return zlib.decompress(row[0]).decode("utf-8") if row else None
+
+    def exists(self, name: str) -> bool:
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT 1 FROM outputs WHERE name = ?", (name,)
+            ).fetchone()
+
+        return row is not None
+
+    def remove(self, name: str) -> bool:
+        """
+        Remove an output.
+        :return: True if it existed.
+        """
+        with self._lock:
+            cursor = self.connection.execute(
+                "DELETE FROM outputs WHERE name = ?", (name,)
+            )
+            self.connection.commit()
+
+        return cursor.rowcount > 0
+
+    def names(self):
+        """
+        The names of all outputs in the bundle.
+        """
+        with self._lock:
+            rows = self.connection.execute(
+                "SELECT name FROM outputs ORDER BY name"
+            ).fetchall()
+
+        return [name for (name,) in rows]
+
+    def write_metadata(self, values):
+        """
+        Store run metadata, such as the documented commit, in the bundle.
+        """
+        with self._lock:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO metadata (key, value) VALUES (?, ?)",
+                [(key, str(value)) for key, value in values.items()],
+            )
+            self.connection.commit()
+
+    def read_metadata(self):
+        with self._lock:
+            rows = self.connection.execute("SELECT key, value FROM metadata").fetchall()
+
+        return dict(rows)
+
+    def merge(self, bundle_path: Path):
+        """
+        Copy every output and the metadata of another bundle, such as the
+        bundle of one shard of a run, replacing outputs of the same name.
+        """
+        with self._lock:
+            connection = self.connection
+            connection.execute("ATTACH DATABASE ? AS other", (str(bundle_path),))
+            try:
+                with connection:
+                    connection.execute(
+                        "INSERT OR REPLACE INTO outputs (name, content, updated) "
+                        "SELECT name, content, updated FROM other.outputs"
+                    )
+                    connection.execute(
+                        "INSERT OR REPLACE INTO metadata (key, value) "
+                        "SELECT key, value FROM other.metadata"
+                    )
+            finally:
+                connection.execute("DETACH DATABASE other")
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+def get_bundle_path(output_path: Path, name: str = ""):
+    """
+    Path of the bundle in an output directory.  A name distinguishes the
+    bundles of sharded runs, which "merge" combines.
+    """
+    file_name = f"doc-buddy-bundle-{name}.sqlite" if name else BUNDLE_FILE_NAME
+    return Path(output_path) / file_name
+
+
+def open_output_store():
+    """
+    The output store selected by the configuration, one bundle per shard.
+    """
+    if config.bundle:
+        name = (
+            shard_name(config.shard_index, config.shard_count)
+            if config.shard_count
+            else ""
+        )
+        return BundleOutput(config.output_path, name)
+
+    return MarkdownOutput(config.output_path)
+
+
+class OutputStore:
+    """
+    The output store selected by the configuration, which every module
+    writes through.  A batch run reopens it for each repository.
+    """
+
+    def __init__(self):
+        self.store = open_output_store()
+
+    def reopen(self):
+        """
+        Close the store and open the one selected by the configuration now.
+        """
+        self.store.close()
+        self.store = open_output_store()
+
+    def __getattr__(self, name):
+        if name == "store":
+            raise AttributeError(name)
+        return getattr(self.store, name)
+
+
+# Create a global output store to be shared across all modules
+output_store = OutputStore()
@@ -0,0 +1,183 @@
+"""
+This module supports updating existing documentation from a diff instead of
+regenerating it: the previous documentation and source are read back from
+the documentation page, and the sections returned by the model are patched
+into the previous documentation.
+
+The previous source is the listing at the end of the page, which is exactly
+the source the documentation was written for, also when the tree was dirty.
+"""
+
+import difflib
+import re
+from .doc_summaries import CODE_LISTING_MARKER
+
+# Replies of the model that are not sections
+NO_CHANGES = "NO CHANGES"
+DELETE_SECTION = "DELETE SECTION"
+
+# The heading used for the text before the first heading
+INTRODUCTION = "(introduction)"
+
+# Above this share of changed source lines, the file is documented from scratch
+MAX_CHANGED_RATIO = 0.3
+
+CODE_LISTING_END = "\n```\n<br>\n"
+HEADING_PATTERN = re.compile(r"^#{1,6}\s")
+
+
+def read_previous(page):
+    """
+    Split a documentation page written by generate_doc.
+
+    :param page: The markdown page, or None.
+    :return: A tuple of (documentation, source), or None if the page is not
+        a complete documentation page.
+    """
+    if not page:
+        return None
+
+    _, rule, body = page.partition("\n---\n")
+    documentation, marker, listing = body.partition(CODE_LISTING_MARKER)
+
+    if not rule or not marker:
+        return None
+
+    # skip the rest of the marker line and the opening fence
+    lines = listing.split("\n", 2)
+    source, end, _ = lines[-1].rpartition(CODE_LISTING_END)
+
+    if len(lines) < 3 or not end:
+        return None
+
+    return documentation, source
+
+
+def diff_source(previous_source: str, source: str, file_name: str) -> str:
+    """
+    A unified diff between two versions of a source file.
+    """
+    return "".join(
+        difflib.unified_diff(
+            previous_source.splitlines(keepends=True),
+            source.splitlines(keepends=True),
+            f"a/{file_name}",
+            f"b/{file_name}",
+        )
+    )
+
+
+def is_small_change(previous_source: str, source: str) -> bool:
+    """
+    True if few enough lines changed for an update to be worth it.
+    """
+    previous_lines = previous_source.splitlines()
+    lines = source.splitlines()
+    matcher = difflib.SequenceMatcher(None, previous_lines, lines, autojunk=False)
+    unchanged = sum(block.size for block in matcher.get_matching_blocks())
+    changed = max(len(previous_lines), len(lines)) - unchanged
+
+    return changed <= MAX_CHANGED_RATIO * max(len(lines), 1)
+
+
+def split_sections(text: str):
+    """
+    Split markdown into sections at its headings, ignoring lines in code blocks.
+
+    :return: A list of [heading line, body] pairs; the heading of the text
+        before the first heading is "".
+    """
+    sections = [["", ""]]
+    fenced = False
+
+    for line in text.splitlines(keepends=True):
+        if line.lstrip().startswith("```"):
+            fenced = not fenced
+
+        if not fenced and (HEADING_PATTERN.match(line) or line.strip() == INTRODUCTION):
+            sections.append([line.rstrip("\n"), ""])
+        else:
+            sections[-1][1] += line
+
+    return sections
+
+
+def apply_sections(documentation: str, response: str):
+    """
+    Patch the sections returned by the model into the previous documentation.
+
+    Returned sections replace the first section with the same heading after
+    the previously replaced one; sections with a new heading are inserted
+    after it, or appended if none was.
+
+    :param documentation: The previous documentation.
+    :param response: The reply of the model to an update prompt.
+    :return: The updated documentation, or None if the reply has no sections.
+    """
+    if response is None:
+        return None
+
+    if response.strip().strip(".") == NO_CHANGES:
+        return documentation
+
+    replies = split_sections(response.strip() + "\n")
+    if replies[0][1].strip() or len(replies) == 1:
+        return None
+
+    sections = split_sections(documentation)
+    replaced = set()
+    cursor = None
+
+    for heading, body in replies[1:]:
+        key = "" if heading.strip() == INTRODUCTION else heading.strip()
+        start = 0 if cursor is None else cursor + 1
+        order = list(range(start, len(sections))) + list(range(0, start))
+        index = next(
+            (
+                i
+                for i in order
+                if i not in replaced and sections[i] and sections[i][0].strip() == key
+            ),
+            None,
+        )
+        if index is None:
+            index = len(sections) if cursor is None else cursor + 1
+
+            # an inserted heading needs a blank line before it
+            before = next(
+                (section for section in reversed(sections[:index]) if section), None
+            )
+            if before is not None and before[1].strip():
+                before[1] = before[1].rstrip("\n") + "\n\n"
+
+            sections.insert(
+                index, [heading, leading_blank_lines(body) + body.strip("\n") + "\n\n"]
+            )
+            replaced = {i + 1 if i >= index else i for i in replaced}
+        elif body.strip() == DELETE_SECTION:
+            sections[index] = None
+        else:
+            # keep the blank lines the previous section had after its heading
+            previous_heading, previous_body = sections[index]
+            sections[index] = [
+                previous_heading,
+                leading_blank_lines(previous_body) + body.strip("\n") + "\n\n",
+            ]
+
+        replaced.add(index)
+        cursor = index
+
+    text = ""
+    for section in sections:
+        if section is not None:
+            heading, body = section
+            text += (heading + "\n" if heading else "") + body
+
+    return text.strip("\n") + "\n"
+
+
+def leading_blank_lines(text: str) -> str:
+    """
+    The line breaks that open a section body, separating it from its heading.
+    """
+    return text[: len(text) - len(text.lstrip("\n"))]
@@ -1,5 +1,36 @@
 # file/__init__.py
 from .render_tree import render_tree, render_tree_html
 from .find_files import find_files
+from .shard_files import shard_files
+from .git_ref import GitRef, git_ref
+from .file_table import FileTable, file_table, get_file_table_path
+from .guess_language_for_markdown import guess_language_for_markdown
+from .read_source import (
+    index_files,
+    read_source,
+    source_size,
+    source_stamp,
+    source_key,
+    is_source_file,
+    is_source_dir,
+)
 
-__all__ = ["render_tree", "find_files", "render_tree_html"]
+__all__ = [
+    "render_tree",
+    "find_files",
+    "render_tree_html",
+    "shard_files",
+    "GitRef",
+    "git_ref",
+    "FileTable",
+    "file_table",
+    "get_file_table_path",
+    "guess_language_for_markdown",
+    "index_files",
+    "read_source",
+    "source_size",
+    "source_stamp",
+    "source_key",
+    "is_source_file",
+    "is_source_dir",
+]
@@ -0,0 +1,316 @@
+"""
+This module keeps the per-file state of a project in one compact columnar
+table: the size and modification time found by discovery, and the outcome
+and duration of the last documentation of every file.
+
+Paths are stored once: directories are interned in a list, file names are
+packed into a single byte string, and rows are sorted by path so that a path
+is found by binary search rather than through a dict.  Every other column is
+an array.  A saved table is memory-mapped when loaded, so opening the table
+of a million files takes milliseconds and only reads the pages it touches.
+"""
+
+import math
+import mmap
+import os
+import struct
+from array import array
+
+FILE_NAME = ".doc-buddy-files.bin"
+MAGIC = b"DBFT"
+VERSION = 1
+
+# magic, version, files, directories, bytes of directory names, bytes of file names
+HEADER = struct.Struct("<4sIQQQQ")
+
+# The outcome of the last documentation of a file
+STATUS_UNKNOWN = 0
+STATUS_DONE = 1
+STATUS_FAILED = 2
+
+# The array columns of a saved table in file order, 8 byte columns first so
+# that every column stays aligned
+COLUMNS = (
+    ("directory_starts", "q"),
+    ("name_offsets", "q"),
+    ("sizes", "q"),
+    ("mtimes", "q"),
+    ("latencies", "f"),
+    ("statuses", "B"),
+)
+
+
+def get_file_table_path(output_path, name: str = ""):
+    """
+    Path of the file table in an output directory.  A name distinguishes the
+    tables of sharded runs.
+    """
+    file_name = f".doc-buddy-files-{name}.bin" if name else FILE_NAME
+    return os.path.join(output_path, file_name)
+
+
+class FileTable:
+    """
+    Per-file state, one row per file, addressed by posix paths relative to
+    the project root.  A loaded table is read-only until rebuilt.
+    """
+
+    __slots__ = (
+        "directories",
+        "directory_ids",
+        "directory_starts",
+        "name_offsets",
+        "names",
+        "sizes",
+        "mtimes",
+        "latencies",
+        "statuses",
+        "_mmap",
+    )
+
+    def __init__(self):
+        self.directories = []
+        self.directory_ids = {}
+        self.directory_starts = array("q", [0])
+        self.name_offsets = array("q", [0])
+        self.names = b""
+        self.sizes = array("q")
+        self.mtimes = array("q")
+        self.latencies = array("f")
+        self.statuses = array("B")
+        self._mmap = None
+
+    def __len__(self):
+        return len(self.sizes)
+
+    def build(self, entries, previous=None):
+        """
+        Replace the rows of the table.
+
+        :param entries: (path, size, mtime_ns) tuples, in any order.
+        :param previous: The table of a previous run, whose duration and
+            outcome of every file still present are kept.
+        """
+        keys = []
+        sizes = array("q")
+        mtimes = array("q")
+        for path, size, mtime in entries:
+            # "\0" sorts first, so the files of a directory stay together
+            directory, _, name = path.rpartition("/")
+            keys.append(f"{directory}\0{name}")
+            sizes.append(size)
+            mtimes.append(mtime)
+
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        table = FileTable()
+
+        table.directory_starts = array("q")
+        names = bytearray()
+        for row, index in enumerate(order):
+            directory, _, name = keys[index].partition("\0")
+            if not table.directories or table.directories[-1] != directory:
+                table.directories.append(directory)
+                table.directory_starts.append(row)
+            names += name.encode("utf-8", "surrogateescape")
+            table.name_offsets.append(len(names))
+        table.directory_starts.append(len(order))
+        del keys
+
+        table.directory_ids = {
+            name: index for index, name in enumerate(table.directories)
+        }
+        table.names = bytes(names)
+        table.sizes = array("q", (sizes[index] for index in order))
+        table.mtimes = array("q", (mtimes[index] for index in order))
+        table.latencies = array("f", [math.nan]) * len(order)
+        table.statuses = array("B", [STATUS_UNKNOWN]) * len(order)
+
+        # previous may be this table, it is replaced only once carried over
+        if previous is not None and len(previous):
+            for row, path in enumerate(table.paths()):
+                old = previous.row(path)
+                if old is not None:
+                    table.latencies[row] = previous.latencies[old]
+                    table.statuses[row] = previous.statuses[old]
+
+        self.close()
+        self.take(table)
+
+    def take(self, table):
+        """
+        Take over the rows of another table.
+        """
+        for name in self.__slots__:
+            setattr(self, name, getattr(table, name))
+
+    def row(self, path: str):
+        """
+        The row of a file, or None if the table has no such file.
+        """
+        directory, _, name = path.rpartition("/")
+        directory_id = self.directory_ids.get(directory)
+        if directory_id is None:
+            return None
+
+        low = self.directory_starts[directory_id]
+        high = self.directory_starts[directory_id + 1]
+        while low < high:
+            middle = (low + high) // 2
+            if self.name(middle) < name:
+                low = middle + 1
+            else:
+                high = middle
+
+        if low < self.directory_starts[directory_id + 1] and self.name(low) == name:
+            return low
+
+        return None
+
+    def name(self, row: int) -> str:
+        start, end = self.name_offsets[row], self.name_offsets[row + 1]
+        return bytes(self.names[start:end]).decode("utf-8", "surrogateescape")
+
+    def path(self, row: int) -> str:
+        """
+        The posix path of a row.
+        """
+        # the directory whose range holds the row
+        low, high = 0, len(self.directories) - 1
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self.directory_starts[middle] <= row:
+                low = middle
+            else:
+                high = middle - 1
+
+        directory = self.directories[low]
+        return f"{directory}/{self.name(row)}" if directory else self.name(row)
+
+    def paths(self):
+        """
+        Every path, in row order.
+        """
+        for directory_id, directory in enumerate(self.directories):
+            prefix = f"{directory}/" if directory else ""
+            start = self.directory_starts[directory_id]
+            end = self.directory_starts[directory_id + 1]
+            for row in range(start, end):
+                yield prefix + self.name(row)
+
+    def latency(self, path: str):
+        """
+        The seconds the last documentation of a file took, or None.
+        """
+        row = self.row(path)
+        if row is None or math.isnan(self.latencies[row]):
+            return None
+        return self.latencies[row]
+
+    def record(self, path: str, succeeded: bool, latency: float = None):
+        """
+        Record the outcome of documenting a file, and how long it took.
+        """
+        row = self.row(path)
+        if row is None:
+            return
+
+        self.statuses[row] = STATUS_DONE if succeeded else STATUS_FAILED
+        if latency is not None:
+            self.latencies[row] = latency
+
+    def save(self, table_path):
+        """
+        Write the table, atomically replacing an older one.
+        """
+        directory_names = "\0".join(self.directories).encode("utf-8", "surrogateescape")
+        temporary_path = f"{table_path}.tmp"
+
+        os.makedirs(os.path.dirname(os.fspath(table_path)) or ".", exist_ok=True)
+        with open(temporary_path, "wb") as handle:
+            handle.write(
+                HEADER.pack(
+                    MAGIC,
+                    VERSION,
+                    len(self),
+                    len(self.directories),
+                    len(directory_names),
+                    len(self.names),
+                )
+            )
+            for column in self.columns():
+                handle.write(memoryview(column).cast("B"))
+            handle.write(directory_names)
+            handle.write(self.names)
+
+        os.replace(temporary_path, table_path)
+
+    def columns(self):
+        return tuple(getattr(self, name) for name, _ in COLUMNS)
+
+    @classmethod
+    def load(cls, table_path):
+        """
+        Map a saved table into memory.
+
+        :return: The table, or None if there is no valid table at the path.
+        """
+        try:
+            with open(table_path, "rb") as handle:
+                mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+
+        try:
+            magic, version, files, directories, directory_bytes, name_bytes = (
+                HEADER.unpack_from(mapped)
+            )
+        except struct.error:
+            mapped.close()
+            return None
+
+        if magic != MAGIC or version != VERSION:
+            mapped.close()
+            return None
+
+        table = cls()
+        view = memoryview(mapped)
+        offset = HEADER.size
+        # the offset columns have one more entry than there are rows
+        counts = {"directory_starts": directories + 1, "name_offsets": files + 1}
+        for name, typecode in COLUMNS:
+            size = counts.get(name, files) * array(typecode).itemsize
+            setattr(table, name, view[offset : offset + size].cast(typecode))
+            offset += size
+
+        names = bytes(view[offset : offset + directory_bytes]).decode(
+            "utf-8", "surrogateescape"
+        )
+        table.directories = names.split("\0") if directories else []
+        table.directory_ids = {
+            name: index for index, name in enumerate(table.directories)
+        }
+        table.names = view[
+            offset + directory_bytes : offset + directory_bytes + name_bytes
+        ]
+        table._mmap = mapped
+
+        return table
+
+    def close(self):
+        """
+        Release the mapping of a loaded table.
+        """
+        if self._mmap is None:
+            return
+
+        mapped, self._mmap = self._mmap, None
+        self.take(FileTable())
+        try:
+            mapped.close()
+        except BufferError:
+            # a view of a column is still referenced, the mapping goes with it
+            pass
+
+
+# Create a global file table, filled by discovery once per run
+file_table = FileTable()
@@ -2,6 +2,7 @@ import os
 import subprocess
 from pathlib import Path
 from config import config
+from .git_ref import git_ref
 
 
 def find_files(input_path: Path = None, limit_by_extensions_if_git=True):
@@ -12,6 +13,12 @@ def find_files(input_path: Path = None, limit_by_extensions_if_git=True):
     gitmode = config.gitmode
     git_root = config.targets_root_path
 
+    if git_ref:
+        return convert_str_array_to_path_array(
+            get_git_ref_files(git_root, input_path, limit_by_extensions_if_git),
+            config.targets_root_path,
+        )
+
     if gitmode:
         return convert_str_array_to_path_array(
             get_git_repo_files(git_root, input_path, limit_by_extensions_if_git),
@@ -72,18 +79,8 @@ def get_git_repo_files(
         files = [file.strip() for file in result.stdout.split("\n") if file.strip()]
 
         # If extensions are provided via config.file_types, filter the files by the given extensions
-        if (len(config.file_types) > 0) and limit_by_extensions:
-            extensions = [
-                ext if ext.startswith(".") else f".{ext}" for ext in config.file_types
-            ]
-            filtered_files = []
-            for file in files:
-                for ext in extensions:
-                    if file.endswith(ext):
-                        filtered_files.append(file)
-                        break
-
-            files = filtered_files
+        if limit_by_extensions:
+            files = filter_by_extensions(files)
 
         return files
 
@@ -92,5 +89,52 @@ def get_git_repo_files(
         return []
 
 
+def get_git_ref_files(
+    repo_path: Path, folder_path: Path = None, limit_by_extensions=True
+):
+    """
+    Finds all the files in a specific folder of the git ref selected with
+    --ref, filtering by extensions.
+
+    :param repo_path: Path to the root of the git repository.
+    :param folder_path: Specific folder within the repository to list files from.
+    :return: A list of file paths relative to the root of the repository.
+    """
+    folder = ""
+    if folder_path:
+        folder = Path(os.path.relpath(folder_path, repo_path)).as_posix()
+
+    if git_ref.is_file(folder):
+        files = [folder]
+    else:
+        files = sorted(git_ref.files(folder))
+
+    if limit_by_extensions:
+        files = filter_by_extensions(files)
+
+    return files
+
+
+def filter_by_extensions(files):
+    """
+    Keep the files with one of the extensions of config.file_types, or all
+    files if none were given.
+    """
+    if not config.file_types:
+        return files
+
+    extensions = [
+        ext if ext.startswith(".") else f".{ext}" for ext in config.file_types
+    ]
+    filtered_files = []
+    for file in files:
+        for ext in extensions:
+            if file.endswith(ext):
+                filtered_files.append(file)
+                break
+
+    return filtered_files
+
+
 def convert_str_array_to_path_array(str_array, input_path=config.input_path):
     return [Path(os.path.join(input_path, file)) for file in str_array]
@@ -0,0 +1,187 @@
+"""
+This module reads the files of a git ref (a tag, branch or commit) straight
+from the object database, so that any ref can be documented without checking
+it out, and several refs can be documented at once from the same clone.
+
+Files are listed once with `git ls-tree` and their contents are streamed
+through a single long-lived `git cat-file --batch` process.
+"""
+
+import os
+import subprocess
+import sys
+import threading
+from pathlib import Path
+from config import config
+
+
+class GitRef:
+    """
+    The files of one git ref.  Paths are posix paths relative to the
+    repository root.  Reading is thread-safe.  A GitRef without a ref is
+    false, the files are then read from the working tree.
+    """
+
+    def __init__(self, repo_path: Path = None, ref: str = ""):
+        self.repo_path = None
+        self.ref = ""
+        self.commit = ""
+        self.entries = {}
+        self.directories = set()
+        self._lock = threading.Lock()
+        self._process = None
+        self._pid = None
+
+        if ref:
+            self.open(repo_path, ref)
+
+    def __bool__(self):
+        return bool(self.ref)
+
+    def open(self, repo_path: Path, ref: str):
+        """
+        Read the files of another ref, or of the working tree if ref is "".
+        :raise subprocess.CalledProcessError: If the ref cannot be read.
+        """
+        self.close()
+        self.repo_path = Path(repo_path)
+        self.ref = ""
+        self.commit, self.entries, self.directories = "", {}, set()
+
+        if not ref:
+            return
+
+        self.commit = (
+            self.git("rev-parse", "--verify", f"{ref}^{{commit}}").decode().strip()
+        )
+        self.entries = self.list_tree()
+        self.directories = {
+            parent.as_posix() for path in self.entries for parent in Path(path).parents
+        }
+        self.ref = ref
+
+    def git(self, *args) -> bytes:
+        result = subprocess.run(
+            ["git", "-C", str(self.repo_path), *args], capture_output=True, check=True
+        )
+        return result.stdout
+
+    def list_tree(self):
+        """
+        :return: A dict of path to a (blob id, size) tuple for every file of
+            the ref.  Submodules and symbolic links are left out.
+        """
+        entries = {}
+        output = self.git("ls-tree", "-r", "-z", "--long", "--full-tree", self.commit)
+
+        for record in output.split(b"\0"):
+            if not record:
+                continue
+            info, _, path = record.partition(b"\t")
+            mode, kind, blob, size = info.split()
+            if kind != b"blob" or mode == b"120000":
+                continue
+            entries[path.decode("utf-8", "surrogateescape")] = (
+                blob.decode(),
+                int(size),
+            )
+
+        return entries
+
+    def files(self, folder: str = ""):
+        """
+        The paths of the files in a folder of the ref, "" for all files.
+        """
+        if not folder or folder == ".":
+            return list(self.entries)
+
+        prefix = folder.rstrip("/") + "/"
+        return [path for path in self.entries if path.startswith(prefix)]
+
+    def is_file(self, path: str) -> bool:
+        return path in self.entries
+
+    def is_dir(self, path: str) -> bool:
+        return path in self.directories
+
+    def blob(self, path: str) -> str:
+        """
+        The blob id of a file, which identifies its contents.
+        :raise FileNotFoundError: If the ref has no such file.
+        """
+        try:
+            return self.entries[path][0]
+        except KeyError:
+            raise FileNotFoundError(f"{path} is not in {self.ref}") from None
+
+    def size(self, path: str) -> int:
+        """
+        The size of a file in bytes.
+        :raise FileNotFoundError: If the ref has no such file.
+        """
+        self.blob(path)
+        return self.entries[path][1]
+
+    def read(self, path: str) -> str:
+        """
+        The contents of a file as text.
+        :raise FileNotFoundError: If the ref has no such file.
+        :raise UnicodeDecodeError: If the file is not UTF-8 text.
+        """
+        return self.read_blob(self.blob(path)).decode("utf-8")
+
+    def read_blob(self, blob: str) -> bytes:
+        # a forked worker must not share the pipes, or the lock, of its parent
+        if self._pid is not None and self._pid != os.getpid():
+            self._lock = threading.Lock()
+            self._process = None
+
+        with self._lock:
+            process = self.process()
+            process.stdin.write(blob.encode() + b"\n")
+            process.stdin.flush()
+
+            header = process.stdout.readline().split()
+            if len(header) != 3:
+                raise FileNotFoundError(f"git object {blob} is missing")
+
+            data = process.stdout.read(int(header[2]))
+            process.stdout.read(1)
+
+        return data
+
+    def process(self):
+        # one process serves every read of the run, close() ends it
+        if self._process is None:
+            self._process = subprocess.Popen(  # pylint: disable=consider-using-with
+                ["git", "-C", str(self.repo_path), "cat-file", "--batch"],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+            )
+            self._pid = os.getpid()
+
+        return self._process
+
+    def close(self):
+        with self._lock:
+            if self._process is not None and self._pid == os.getpid():
+                self._process.stdin.close()
+                self._process.wait()
+                self._process.stdout.close()
+            self._process = None
+
+
+def open_git_ref():
+    """
+    Read the ref selected with --ref, or the working tree without one.
+    """
+    try:
+        git_ref.open(config.targets_root_path, config.ref)
+    except subprocess.CalledProcessError as e:
+        print(f"Error: cannot read ref '{config.ref}': {e.stderr.decode().strip()}")
+        sys.exit(1)
+
+
+# Create a global git ref to be shared across all modules, false without --ref
+git_ref = GitRef()
+open_git_ref()
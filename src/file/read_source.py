@@ -0,0 +1,130 @@
+"""
+This module reads project files either from the working tree or, with --ref,
+from the git ref being documented.  Every reader of project sources goes
+through it, so the rest of doc-buddy does not need to know where the files
+come from.
+
+Files are given as absolute paths under the project root in both cases.
+Sizes and modification times come from the file table filled by discovery.
+"""
+
+import os
+from pathlib import Path
+from config import config
+from run import content_hash
+from .file_table import FileTable, file_table
+from .git_ref import git_ref
+
+
+def ref_path(file) -> str:
+    """
+    The posix path of a file relative to the project root.
+    """
+    root = os.path.join(config.targets_root_path, "")
+    file = os.fspath(file)
+
+    # discovery yields paths below the root, which need no normalizing
+    if file.startswith(root) and ".." not in file:
+        return file[len(root) :].replace(os.sep, "/")
+
+    return Path(os.path.relpath(file, config.targets_root_path)).as_posix()
+
+
+def index_files(files, table_path=None):
+    """
+    Record the size and modification time of every project file in the file
+    table, so that the sources are not stat-ed again by every reader.  The
+    outcome and duration of each file are kept from the table saved in
+    table_path by a previous run, if any.
+    """
+    previous = FileTable.load(table_path) if table_path else file_table
+    entries = []
+
+    for file in files:
+        path = ref_path(file)
+        try:
+            if git_ref:
+                entries.append((path, git_ref.size(path), 0))
+            else:
+                stat = os.stat(file)
+                entries.append((path, stat.st_size, stat.st_mtime_ns))
+        except OSError:
+            continue
+
+    file_table.build(entries, previous)
+
+    if previous is not None and previous is not file_table:
+        previous.close()
+
+
+def read_source(file) -> str:
+    """
+    The contents of a project file.
+    :raise OSError: If the file does not exist.
+    :raise UnicodeDecodeError: If the file is not UTF-8 text.
+    """
+    if git_ref:
+        return git_ref.read(ref_path(file))
+
+    with open(file, "r", encoding="utf-8") as handle:
+        return handle.read()
+
+
+def source_size(file) -> int:
+    """
+    The size of a project file in bytes.
+    :raise OSError: If the file does not exist.
+    """
+    if git_ref:
+        return git_ref.size(ref_path(file))
+
+    row = file_table.row(ref_path(file))
+    if row is not None:
+        return file_table.sizes[row]
+
+    return os.path.getsize(file)
+
+
+def source_stamp(file):
+    """
+    A value that changes when a project file changes: its blob id in a ref,
+    otherwise its modification time and size.  None if it does not exist.
+    """
+    try:
+        if git_ref:
+            return git_ref.blob(ref_path(file))
+
+        row = file_table.row(ref_path(file))
+        if row is not None:
+            return [file_table.mtimes[row], file_table.sizes[row]]
+
+        stat = os.stat(file)
+    except OSError:
+        return None
+
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def source_key(file, contents: str) -> str:
+    """
+    The key identifying the contents of a project file, for the journal and
+    caches: the blob id in a ref, which needs no hashing, otherwise a hash.
+    """
+    if git_ref:
+        return git_ref.blob(ref_path(file))
+
+    return content_hash(contents)
+
+
+def is_source_file(file) -> bool:
+    if git_ref:
+        return git_ref.is_file(ref_path(file))
+
+    return Path(file).is_file()
+
+
+def is_source_dir(file) -> bool:
+    if git_ref:
+        return git_ref.is_dir(ref_path(file))
+
+    return Path(file).is_dir()
@@ -1,5 +1,6 @@
 import os
 from config import config
+from .read_source import source_size
 
 
 def render_tree(files, markdown=False, include_size=False, base_path=None):
@@ -38,7 +39,7 @@ def render_tree(files, markdown=False, include_size=False, base_path=None):
             # Determine if we need to add file size
             size_str = ""
             if include_size and not current[key]:  # Only files, not directories
-                file_size = os.path.getsize(base_path / relative_path)
+                file_size = source_size(base_path / relative_path)
                 size_str = f" [{file_size} bytes]"
 
             if markdown and not current[key]:
@@ -0,0 +1,49 @@
+import hashlib
+import heapq
+import os
+from config import config
+from .read_source import source_size
+
+
+def shard_files(files, shard_index: int, shard_count: int):
+    """
+    Deterministically partitions files across shards so that every CI node
+    computes the same assignment from the same checkout.
+
+    Files are weighted by size and assigned largest first to the currently
+    lightest shard; a stable hash of the path breaks ties, so the result does
+    not depend on the order the files were listed in.
+
+    :param files: List of file paths.
+    :param shard_index: The 1-based index of the shard to return.
+    :param shard_count: The total number of shards.
+    :return: The files of the requested shard, in their original order.
+    """
+    if shard_count <= 1:
+        return list(files)
+
+    def weight(file):
+        try:
+            size = source_size(file)
+        except OSError:
+            size = 0
+        # every file costs at least one request, whatever its size
+        return size + 1024
+
+    def path_hash(file):
+        relative_path = os.path.relpath(file, config.targets_root_path)
+        return hashlib.sha256(relative_path.encode("utf-8")).hexdigest()
+
+    weights = {file: weight(file) for file in files}
+    ordered = sorted(files, key=lambda file: (-weights[file], path_hash(file)))
+
+    loads = [(0, index) for index in range(1, shard_count + 1)]
+    selected = set()
+
+    for file in ordered:
+        load, index = heapq.heappop(loads)
+        if index == shard_index:
+            selected.add(file)
+        heapq.heappush(loads, (load + weights[file], index))
+
+    return [file for file in files if file in selected]
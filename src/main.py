@@ -5,11 +5,44 @@ https://github.com/scott-r-lindsey/doc-buddy/
 
 # from document.tree import tree_from_dir, find_files, render_tree
 import os
+import sys
 from pathlib import Path
 from config import config
 from util import initialize_provider
-from file import render_tree, find_files
-from document import generate_doc, generate_toc, add_readme
+from file import (
+    render_tree,
+    find_files,
+    shard_files,
+    git_ref,
+    index_files,
+    get_file_table_path,
+    is_source_file,
+    is_source_dir,
+)
+from document import (
+    generate_doc,
+    generate_toc,
+    add_readme,
+    document_files,
+    merge_shards,
+    export_bundle,
+    output_store,
+)
+from analysis import import_graph, context_index, forecast_run
+from run_context import run_context
+from run import (
+    Journal,
+    install_signal_handlers,
+    metrics,
+    progress,
+    get_report_path,
+    shard_name,
+    write_shard_manifest,
+)
+from search import search_index, search_docs
+from watch import watch
+from server import serve
+from batch import run_batch
 
 
 def main(input_path: Path, dry_run: bool, summary: bool) -> None:
@@ -22,49 +55,130 @@ def main(input_path: Path, dry_run: bool, summary: bool) -> None:
         dry_run (bool): If True, perform a dry run.
         summary (bool): A dictionary summarizing some information.
     """
-    provider = initialize_provider()  # Initialize the provider
+    if config.command == "merge":
+        # merging only needs the shard manifests, not a provider
+        if not merge_shards():
+            sys.exit(1)
+        print("Done!")
+        return
+
+    if config.command == "search":
+        if not search_docs(config.search_query, config.search_limit):
+            sys.exit(1)
+        return
+
+    if config.command == "export":
+        if not export_bundle():
+            sys.exit(1)
+        print("Done!")
+        return
+
+    if config.command == "batch":
+        # every repository is documented by main() in turn, in this process
+        if not run_batch(main):
+            sys.exit(1)
+        print("Done!")
+        return
 
     context_files = find_files(config.targets_root_path, False)
+    name = (
+        shard_name(config.shard_index, config.shard_count) if config.shard_count else ""
+    )
+    index_files(context_files, get_file_table_path(config.output_path, name))
     context_tree = render_tree(context_files, False, True, config.targets_root_path)
+    import_graph.build(context_files, config.targets_root_path)
+    context_index.build(
+        context_files, config.targets_root_path, None if dry_run else config.output_path
+    )
+
+    # after the project is prepared on forked processes, see run.process_pool
+    provider = initialize_provider()  # Initialize the provider
+
+    if config.serve:
+        serve(provider, context_files, context_tree)
 
-    if summary:
+    elif summary:
         print("Generating summary...")
         print("Not implemented yet.")
 
     else:
-        if input_path.is_file():
+        if is_source_file(input_path):
             if dry_run:
                 print("-> Dry run enabled. No files will be created.")
                 print(f"-> Context contains {len(context_files)} files.")
                 print(f"-> File to be processed: {input_path}")
+                forecast_run(
+                    [input_path],
+                    provider,
+                    context_tree,
+                    get_report_path(config.output_path),
+                )
 
             else:
                 # If it's a single file, document it
                 print(f"-> Context contains {len(context_files)} files.")
                 print(f"-> Processing single file '{input_path}'")
-                generate_doc(input_path, provider, context_tree)
+                progress.start(1)
+                try:
+                    generate_doc(input_path, provider, context_tree)
+                finally:
+                    progress.stop()
                 print("Done!")
 
-        elif input_path.is_dir():
+        elif is_source_dir(input_path) and config.watch and not dry_run:
+            watch(provider, context_files, context_tree)
+
+        elif is_source_dir(input_path):
             files = find_files()
 
+            if config.shard_count:
+                files = shard_files(files, config.shard_index, config.shard_count)
+                print(f"-> Documenting {name} with {len(files)} files.")
+
             if dry_run:
                 print("-> Dry run enabled. No files will be created.")
                 print(f"-> Context contains {len(context_files)} files.")
                 print("Files to be processed:")
                 print(render_tree(files))
+                forecast_run(
+                    files,
+                    provider,
+                    context_tree,
+                    get_report_path(config.output_path, name),
+                )
 
             else:
                 print(f"-> Context tree contains {len(context_files)} files.")
                 print(f"-> Processing {len(files)} files...")
-                for file in files:
-                    generate_doc(file, provider, context_tree)
-
-                # Generate table of contents
-                generate_toc(files)
 
-                # Add a README file
-                add_readme()
+                install_signal_handlers()
+                journal = Journal(config.output_path, config.resume, name)
+
+                try:
+                    results = document_files(files, provider, context_tree, journal)
+                finally:
+                    journal.close()
+
+                if config.shard_count:
+                    # the table of contents is generated once by "merge"
+                    write_shard_manifest(
+                        config.output_path,
+                        config.shard_index,
+                        config.shard_count,
+                        run_context.commit_hash,
+                        {
+                            file.relative_to(config.targets_root_path).as_posix(): ok
+                            for file, ok in results.items()
+                        },
+                    )
+                else:
+                    # Generate table of contents
+                    generate_toc(files)
+
+                    # Add a README file
+                    add_readme()
+
+                metrics.report(config.output_path, name)
                 print("Done!")
 
         else:
@@ -73,4 +187,10 @@ def main(input_path: Path, dry_run: bool, summary: bool) -> None:
 
 if __name__ == "__main__":
     # Pass file types only if the input is a directory
-    main(config.input_path, config.dry_run, config.summary)
+    try:
+        main(config.input_path, config.dry_run, config.summary)
+    finally:
+        # checkpoint the bundle, if any, and the search index into their files
+        output_store.close()
+        search_index.close()
+        git_ref.close()
@@ -0,0 +1,34 @@
+# run/__init__.py
+from .journal import Journal, content_hash, install_signal_handlers
+from .metrics import RunMetrics, metrics, get_report_path, read_report
+from .progress import Progress, progress
+from .scheduler import run_in_dependency_order
+from .process_pool import map_in_processes, stop_forking
+from .rate_limiter import RateLimiter, rate_limiter
+from .response_cache import ResponseCache, response_cache
+from .request_policy import RequestPolicy, request_policy
+from .shard_manifest import shard_name, write_shard_manifest, read_shard_manifests
+
+__all__ = [
+    "Journal",
+    "content_hash",
+    "install_signal_handlers",
+    "RunMetrics",
+    "metrics",
+    "get_report_path",
+    "read_report",
+    "Progress",
+    "progress",
+    "run_in_dependency_order",
+    "map_in_processes",
+    "stop_forking",
+    "RateLimiter",
+    "rate_limiter",
+    "ResponseCache",
+    "response_cache",
+    "RequestPolicy",
+    "request_policy",
+    "shard_name",
+    "write_shard_manifest",
+    "read_shard_manifests",
+]
@@ -0,0 +1,158 @@
+"""
+This module provides an append-only journal of completed files, so that an
+interrupted run can be resumed without redoing finished work.
+
+Each line of the journal is a JSON record:
+    {"event": "done", "path": ..., "source_hash": ..., "output_hash": ...}
+    {"event": "failed", "path": ..., "source_hash": ..., "error": ...}
+"""
+
+import hashlib
+import json
+import os
+import signal
+import threading
+from pathlib import Path
+
+JOURNAL_FILE_NAME = ".doc-buddy-journal.jsonl"
+
+
+def content_hash(text: str) -> str:
+    """
+    Returns the sha256 hex digest of a string.
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class Journal:
+    """
+    Append-only record of per-file results, stored in the output directory.
+    Every record is flushed and fsync'd as it is written, so a lost run costs
+    at most the files that were in flight.
+    """
+
+    def __init__(self, output_path: Path, resume: bool = False, name: str = ""):
+        file_name = f".doc-buddy-journal-{name}.jsonl" if name else JOURNAL_FILE_NAME
+        self.path = Path(output_path) / file_name
+        self.output_path = Path(output_path)
+        self.completed = {}
+        self.failed = {}
+        self._lock = threading.Lock()
+
+        if resume:
+            self.load()
+
+        os.makedirs(self.output_path, exist_ok=True)
+
+        # a fresh run starts a new journal, a resumed run appends to it; it
+        # stays open for the whole run and is closed by close()
+        self._file = open(  # pylint: disable=consider-using-with
+            self.path, "a" if resume else "w", encoding="utf-8"
+        )
+
+        # terminate a line left half-written by a crash before appending to it
+        if resume and self._file.tell() > 0:
+            with open(self.path, "rb") as file:
+                file.seek(-1, os.SEEK_END)
+                if file.read(1) != b"\n":
+                    self._file.write("\n")
+
+    def load(self):
+        """
+        Reads an existing journal.  The last record for a path wins; a
+        truncated final line (the run died mid-write) is ignored.
+        """
+        if not self.path.exists():
+            return
+
+        with open(self.path, "r", encoding="utf-8") as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+                path = record.get("path")
+                if record.get("event") == "done":
+                    self.completed[path] = record
+                    self.failed.pop(path, None)
+                elif record.get("event") == "failed":
+                    self.failed[path] = record
+                    self.completed.pop(path, None)
+
+        print(
+            f"-> Resuming: {len(self.completed)} files completed, "
+            f"{len(self.failed)} failed files will be retried."
+        )
+
+    def is_complete(self, relative_path, source_hash: str, output_exists) -> bool:
+        """
+        True if the file was documented from identical sources and its output
+        is still present.  output_exists is a function checking the output,
+        only called when the sources match.
+        """
+        record = self.completed.get(str(relative_path))
+
+        if record is None or record.get("source_hash") != source_hash:
+            return False
+
+        return output_exists()
+
+    def record_done(self, relative_path, source_hash: str, documentation: str):
+        """
+        Records a successfully documented file.
+        """
+        record = {
+            "event": "done",
+            "path": str(relative_path),
+            "source_hash": source_hash,
+            "output_hash": content_hash(documentation),
+        }
+        self.completed[record["path"]] = record
+        self._write(record)
+
+    def record_failed(self, relative_path, source_hash: str, error: str):
+        """
+        Records a file that could not be documented.
+        """
+        record = {
+            "event": "failed",
+            "path": str(relative_path),
+            "source_hash": source_hash,
+            "error": error,
+        }
+        self.failed[record["path"]] = record
+        self._write(record)
+
+    def _write(self, record):
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.write(json.dumps(record) + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        """
+        Flushes and closes the journal.
+        """
+        with self._lock:
+            if not self._file.closed:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+
+
+def install_signal_handlers():
+    """
+    Turns SIGTERM and SIGHUP into SystemExit so that cleanup in finally blocks
+    (closing the journal, clearing the progress display) runs before the process exits.
+    """
+
+    def handle_signal(signum, _frame):
+        print(f"\n-> Received signal {signum}, stopping after cleanup.")
+        raise SystemExit(128 + signum)
+
+    for signum in (signal.SIGTERM, getattr(signal, "SIGHUP", None)):
+        if signum is not None:
+            signal.signal(signum, handle_signal)
@@ -0,0 +1,332 @@
+"""
+This module collects per-call metrics during a run and writes the run report.
+"""
+
+import json
+import os
+import statistics
+import threading
+import time
+from collections import defaultdict, deque
+from pathlib import Path
+
+REPORT_FILE_NAME = "doc-buddy-report.json"
+
+# Progress events kept for the run report, long-lived processes such as
+# --watch and --serve drop the oldest
+MAX_EVENTS = 10000
+
+# Latencies kept per tier for the median and p95 of the run report
+MAX_LATENCIES = 10000
+
+# Measurements of a call that are added up per tier
+COUNTERS = (
+    "input_tokens",
+    "output_tokens",
+    "cost",
+    "tool_rounds",
+    "prefetched_files",
+    "requested_files",
+    "tool_bytes",
+    "diff_updates",
+    "diff_update_fallbacks",
+    "timeouts",
+    "hedged_requests",
+    "tool_source_bytes",
+    "tool_budget_stops",
+    "compacted_tool_results",
+)
+
+
+class TierTotals:
+    """
+    Running totals of the calls of one tier.  Calls are added up rather than
+    kept, so that --watch and --serve processes do not grow with every call;
+    only the latest latencies are kept for the median and p95.
+    """
+
+    def __init__(self):
+        self.models = set()
+        self.files = 0
+        self.failed = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.latencies = deque(maxlen=MAX_LATENCIES)
+        self.counters = defaultdict(float)
+
+    def add(self, model: str, values):
+        latency = values.get("latency", 0.0)
+
+        self.models.add(model)
+        self.files += 1
+        self.failed += 1 if values.get("failed") else 0
+        self.latency_total += latency
+        self.latency_max = max(self.latency_max, latency)
+        self.latencies.append(latency)
+        for name in COUNTERS:
+            self.counters[name] += values.get(name, 0)
+
+    def summarize(self):
+        latencies = list(self.latencies)
+        summary = {
+            "models": sorted(self.models),
+            "files": self.files,
+            "failed": self.failed,
+            "latency_median": statistics.median(latencies) if latencies else 0.0,
+            "latency_p95": percentile(latencies, 95),
+            "latency_max": self.latency_max,
+            "latency_total": self.latency_total,
+        }
+        for name in COUNTERS:
+            value = self.counters[name]
+            summary[name] = value if name == "cost" else int(value)
+
+        return summary
+
+
+class RunMetrics:
+    """
+    Thread-safe accumulator for provider call metrics, grouped by model tier.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = threading.local()
+        self.tiers = defaultdict(TierTotals)
+        # one entry per documented file, for the file history of the report
+        self.file_latencies = defaultdict(lambda: {"latency": 0.0, "tool_rounds": 0})
+        self.events = deque(maxlen=MAX_EVENTS)
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    def reset(self):
+        """
+        Start over, before documenting another project.
+        """
+        with self._lock:
+            self.tiers = defaultdict(TierTotals)
+            self.file_latencies = defaultdict(
+                lambda: {"latency": 0.0, "tool_rounds": 0}
+            )
+            self.events = deque(maxlen=MAX_EVENTS)
+            self.input_tokens = 0
+            self.output_tokens = 0
+
+    def add(self, name: str, amount=1):
+        """
+        Adds to a counter of the call in progress on the current thread, such
+        as tool rounds taken by a provider.  The counters are attached to the
+        next call recorded from this thread.
+        """
+        pending = getattr(self._pending, "values", None)
+        if pending is None:
+            pending = self._pending.values = defaultdict(int)
+        pending[name] += amount
+
+    def amend(self, name: str, amount=1):
+        """
+        Adds to a counter of the call last recorded on the current thread,
+        for outcomes only known once the call returned.
+        """
+        tier = getattr(self._pending, "last_tier", None)
+        if tier is None:
+            return
+
+        with self._lock:
+            self.tiers[tier].counters[name] += amount
+
+    def record_call(self, tier: str, model: str, **values):
+        """
+        Records one provider call.
+
+        :param tier: The routing tier the call was sent to.
+        :param model: The model that served the call.
+        :param values: Numeric measurements such as latency, input_tokens,
+            output_tokens and cost, and the posix path of the documented file.
+        """
+        pending = getattr(self._pending, "values", None) or {}
+        self._pending.values = None
+        values = {**pending, **values}
+        self._pending.last_tier = tier
+
+        with self._lock:
+            self.tiers[tier].add(model, values)
+            if tier != "cached" and "file" in values and not values.get("failed"):
+                measured = self.file_latencies[values["file"]]
+                measured["latency"] += values.get("latency", 0.0)
+                measured["tool_rounds"] += values.get("tool_rounds", 0)
+            self.input_tokens += values.get("input_tokens", 0)
+            self.output_tokens += values.get("output_tokens", 0)
+
+    def record_event(self, event: str, **values):
+        """
+        Records a progress event of the run, such as a file starting or
+        finishing, for the run report.
+
+        :param event: The kind of event.
+        :param values: The details of the event, such as the file path.
+        """
+        with self._lock:
+            self.events.append(
+                {"time": round(time.time(), 3), "event": event, **values}
+            )
+
+    def summarize(self):
+        """
+        Aggregates the recorded calls per tier.
+        :return: A dict of tier name to summary statistics.
+        """
+        with self._lock:
+            return {tier: totals.summarize() for tier, totals in self.tiers.items()}
+
+    def report(self, output_path: Path, name: str = ""):
+        """
+        Prints the per-tier summary and writes it to the run report in the
+        output directory.  A name distinguishes the reports of sharded runs.
+        """
+        summary = self.summarize()
+
+        if not summary:
+            return
+
+        report_path = get_report_path(output_path, name)
+        previous = read_report(report_path)
+
+        print("-> Run report:")
+        for tier, values in summary.items():
+            print(
+                f"   {tier:<8} {values['files']:>5} files  "
+                f"median {values['latency_median']:.2f}s  "
+                f"p95 {values['latency_p95']:.2f}s  "
+                f"~{values['input_tokens']} in / {values['output_tokens']} out tokens  "
+                f"~${values['cost']:.4f}"
+            )
+
+        files = sum(values["files"] for values in summary.values())
+        rounds = sum(values["tool_rounds"] for values in summary.values()) / files
+        prefetched = sum(values["prefetched_files"] for values in summary.values())
+        print(f"   {rounds:.2f} tool rounds per file, {prefetched} files prefetched")
+
+        tool_bytes = sum(values["tool_bytes"] for values in summary.values())
+        source_bytes = sum(values["tool_source_bytes"] for values in summary.values())
+        if source_bytes:
+            print(
+                f"   tool results {tool_bytes / 1024:.1f} KB for "
+                f"{source_bytes / 1024:.1f} KB of requested source"
+            )
+
+        diff_updates = sum(values["diff_updates"] for values in summary.values())
+        fallbacks = sum(values["diff_update_fallbacks"] for values in summary.values())
+        if diff_updates or fallbacks:
+            print(
+                f"   {diff_updates} files updated from a diff of their source, "
+                f"{fallbacks} documented again after an unusable update"
+            )
+
+        timeouts = sum(values["timeouts"] for values in summary.values())
+        hedged = sum(values["hedged_requests"] for values in summary.values())
+        if timeouts or hedged:
+            print(f"   {timeouts} requests timed out, {hedged} slow requests hedged")
+
+        stops = sum(values["tool_budget_stops"] for values in summary.values())
+        compacted = sum(values["compacted_tool_results"] for values in summary.values())
+        if stops or compacted:
+            print(
+                f"   {stops} files stopped by a tool budget, "
+                f"{compacted} earlier tool results compacted"
+            )
+
+        previous_rounds = tool_rounds_per_file(previous)
+        if previous_rounds is not None:
+            print(
+                f"   tool rounds per file {previous_rounds:.2f} -> {rounds:.2f} "
+                "compared to the previous run"
+            )
+
+        os.makedirs(output_path, exist_ok=True)
+        with open(report_path, "w", encoding="utf-8") as file:
+            with self._lock:
+                events = list(self.events)
+            json.dump(
+                {
+                    "tiers": summary,
+                    "files": self.file_history((previous or {}).get("files")),
+                    "events": events,
+                },
+                file,
+                indent=2,
+            )
+
+    def file_history(self, previous=None):
+        """
+        The time and tool rounds each file took, for scheduling later runs.
+        Files not documented in this run keep their entry of earlier runs.
+
+        :param previous: The file history of the previous run report.
+        :return: A dict of posix path to a dict of latency and tool_rounds.
+        """
+        history = dict(previous or {})
+
+        with self._lock:
+            measured = {
+                path: dict(values) for path, values in self.file_latencies.items()
+            }
+
+        for path, values in measured.items():
+            history[path] = {
+                "latency": round(values["latency"], 3),
+                "tool_rounds": values["tool_rounds"],
+            }
+
+        return history
+
+
+def get_report_path(output_path: Path, name: str = ""):
+    """
+    Path of the run report in an output directory.
+    """
+    file_name = f"doc-buddy-report-{name}.json" if name else REPORT_FILE_NAME
+    return Path(output_path) / file_name
+
+
+def read_report(report_path: Path):
+    """
+    Reads a run report written by a previous run, if any.
+    """
+    try:
+        with open(report_path, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def tool_rounds_per_file(report):
+    """
+    Average tool rounds per file of a run report, or None if unknown.
+    """
+    if not report:
+        return None
+
+    tiers = report.get("tiers", {}).values()
+    files = sum(values.get("files", 0) for values in tiers)
+
+    if not files or any("tool_rounds" not in values for values in tiers):
+        return None
+
+    return sum(values["tool_rounds"] for values in tiers) / files
+
+
+def percentile(values, pct):
+    """
+    Nearest-rank percentile of a list of numbers.
+    """
+    if not values:
+        return 0.0
+
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+# Create a global metrics instance to be shared across all modules
+metrics = RunMetrics()
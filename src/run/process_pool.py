@@ -0,0 +1,72 @@
+"""
+This module runs CPU-bound per-file work, such as parsing source files and
+extracting their terms, on a pool of forked processes, so that preparing a
+large project scales with the cores of the machine.
+
+Workers are forked, so they inherit the state of the parent (the config, the
+import graph being built, the provider) instead of receiving it pickled.  The
+mapped function must be a module-level function, and should return a compact
+record since every result is pickled back to the parent.
+
+Forking a process that runs other threads can deadlock the child on a lock
+one of them held.  The provider SDKs start native threads (gRPC, connection
+pools) that threading cannot see, so the project is prepared before the
+provider is initialised, and from then on, as during the incremental updates
+of --watch and --serve, the work runs in the calling process.
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from config import config
+
+# Fewer items than this are processed in the calling process
+MIN_PARALLEL_ITEMS = 64
+
+# Items handed to a worker at a time, bounds the pickling overhead per item
+MAX_CHUNK_SIZE = 256
+
+# Cleared once the process may run threads a fork cannot see
+_state = {"can_fork": True}
+
+
+def stop_forking():
+    """
+    Run all further work in the calling process.  Called when the provider is
+    initialised for a run that sends requests, since its SDK may start
+    threads at any time after.
+    """
+    _state["can_fork"] = False
+
+
+def map_in_processes(function, items, processes: int = None):
+    """
+    Apply function to every item, in parallel when there is enough work.
+
+    :param function: A module-level function of one item.
+    :param items: The items to process.
+    :param processes: The number of processes, None for --processes.
+    :return: The list of results, in the order of items.
+    """
+    items = list(items)
+
+    if processes is None:
+        processes = config.processes
+
+    processes = min(processes or os.cpu_count() or 1, len(items) // MIN_PARALLEL_ITEMS)
+
+    if (
+        processes <= 1
+        or not _state["can_fork"]
+        or "fork" not in multiprocessing.get_all_start_methods()
+        or threading.active_count() > 1
+    ):
+        return [function(item) for item in items]
+
+    # a few chunks per process, so that a slow chunk does not hold up the end
+    chunksize = max(1, min(MAX_CHUNK_SIZE, len(items) // (processes * 4)))
+    context = multiprocessing.get_context("fork")
+
+    with ProcessPoolExecutor(max_workers=processes, mp_context=context) as executor:
+        return list(executor.map(function, items, chunksize=chunksize))
@@ -0,0 +1,260 @@
+"""
+This module reports the progress of a run: the files in flight, how many are
+done, the throughput, the time left and the tokens used so far.
+
+On a terminal, a status block is kept below the log and redrawn in place.
+Otherwise, such as in CI logs, a status line is logged periodically.  The
+start and outcome of every file are also recorded in the run report.
+"""
+
+import shutil
+import sys
+import threading
+import time
+from .metrics import metrics
+
+# Seconds between redraws of the status block on a terminal
+REFRESH_INTERVAL = 0.1
+
+# Seconds between status lines when stdout is not a terminal
+LOG_INTERVAL = 30.0
+
+# Files in flight listed in the status block
+MAX_SHOWN_TASKS = 8
+
+SPINNER_CHARS = "|/-\\"
+
+
+class Progress:
+    """
+    Thread-safe progress of the files of a run.  Outside of a run, between
+    stop() and the next start(), events are only logged as lines.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._stream = None
+        self._output = None
+        self.live = False
+        self.total = 0
+        self.done = 0
+        self.failed = 0
+        self.skipped = 0
+        self.tasks = {}
+        self.start_time = 0.0
+        self.shown_lines = 0
+        self.frame = 0
+
+    def start(self, total: int):
+        """
+        Start reporting a run of total files, on one thread for the run.
+        """
+        with self._lock:
+            self.total = total
+            self.done = self.failed = self.skipped = 0
+            self.tasks = {}
+            self.start_time = time.monotonic()
+            self._stream = sys.stdout
+            self.live = self._stream.isatty()
+
+            # other output is written above the status block
+            if self.live:
+                self._output = sys.stdout = ProgressOutput(self, self._stream)
+
+        metrics.record_event("run_started", files=total)
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop reporting the run, and log its outcome.
+        """
+        if self._thread is None:
+            return
+
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+        with self._lock:
+            self.clear()
+            if self.live:
+                sys.stdout = self._stream
+            self.live = False
+
+            elapsed = time.monotonic() - self.start_time
+            counts = {"done": self.done, "failed": self.failed, "skipped": self.skipped}
+
+        metrics.record_event("run_finished", seconds=round(elapsed, 3), **counts)
+        print(
+            f"-> Documented {counts['done']} files in {format_duration(elapsed)}, "
+            f"{counts['failed']} failed, {counts['skipped']} skipped."
+        )
+
+    def run(self):
+        interval = REFRESH_INTERVAL if self.live else LOG_INTERVAL
+
+        while not self._stop.wait(interval):
+            with self._lock:
+                if self.live:
+                    self.draw()
+                else:
+                    self._stream.write(f"-> Progress: {self.status()}\n")
+                    self._stream.flush()
+
+    def task_started(self, name: str):
+        """
+        A file is being documented.
+        """
+        with self._lock:
+            self.tasks[name] = time.monotonic()
+
+        metrics.record_event("file_started", file=name)
+
+    def task_message(self, name: str, message: str):
+        """
+        A message about a file in flight, such as the files the model asked for.
+        """
+        print(f"{name}: {message}")
+
+    def task_finished(self, name: str, succeeded: bool):
+        """
+        A file was documented, or failed to be.
+        """
+        with self._lock:
+            elapsed = time.monotonic() - self.tasks.pop(name, time.monotonic())
+            if succeeded:
+                self.done += 1
+            else:
+                self.failed += 1
+
+        metrics.record_event(
+            "file_finished" if succeeded else "file_failed",
+            file=name,
+            seconds=round(elapsed, 3),
+        )
+
+        if succeeded:
+            print(f"Documenting file {name} - {elapsed:.2f} seconds")
+        else:
+            print(f"Failed to document {name} after {elapsed:.2f} seconds")
+
+    def task_skipped(self, name: str, reason: str):
+        """
+        A file needed no documenting.
+        """
+        with self._lock:
+            self.skipped += 1
+
+        metrics.record_event("file_skipped", file=name, reason=reason)
+        print(f"Skipping file {name} - {reason}")
+
+    def status(self):
+        """
+        One line with the files done, the throughput, the time left and the
+        tokens used.
+        """
+        elapsed = time.monotonic() - self.start_time
+        finished = self.done + self.failed
+        remaining = self.total - finished - self.skipped
+
+        # skipped files take no time, they would make the estimate optimistic
+        rate = finished / elapsed if elapsed > 0 else 0.0
+        eta = format_duration(remaining / rate) if rate > 0 else "--"
+
+        return (
+            f"[{finished + self.skipped}/{self.total}] {len(self.tasks)} running, "
+            f"{rate * 60:.1f} files/min, ETA {eta}, "
+            f"{format_count(metrics.input_tokens)} in / "
+            f"{format_count(metrics.output_tokens)} out tokens"
+        )
+
+    def draw(self):
+        """
+        Redraw the status block: the status line, then the files in flight.
+        """
+        if not self._output.at_line_start:
+            return
+
+        now = time.monotonic()
+        spinner = SPINNER_CHARS[self.frame % len(SPINNER_CHARS)]
+        self.frame += 1
+
+        lines = [self.status()]
+        running = sorted(self.tasks.items(), key=lambda task: task[1])
+        for name, start_time in running[:MAX_SHOWN_TASKS]:
+            lines.append(f"  {spinner} {name} {now - start_time:.0f}s")
+        if len(running) > MAX_SHOWN_TASKS:
+            lines.append(f"  ... and {len(running) - MAX_SHOWN_TASKS} more")
+
+        width = max(20, shutil.get_terminal_size().columns - 1)
+        self.clear()
+        self._stream.write("".join(line[:width] + "\n" for line in lines))
+        self._stream.flush()
+        self.shown_lines = len(lines)
+
+    def clear(self):
+        """
+        Remove the status block, the cursor is left where it started.
+        """
+        if self.shown_lines:
+            self._stream.write(f"\033[{self.shown_lines}F\033[J")
+            self.shown_lines = 0
+
+
+class ProgressOutput:
+    """
+    Stands in for stdout while the status block is shown, so that anything
+    printed appears above the block instead of inside it.
+    """
+
+    def __init__(self, owner: Progress, stream):
+        self.progress = owner
+        self.stream = stream
+        self.at_line_start = True
+
+    def write(self, text: str):
+        with self.progress._lock:  # pylint: disable=protected-access
+            self.progress.clear()
+            if text:
+                self.at_line_start = text.endswith("\n")
+            return self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+def format_duration(seconds: float):
+    """
+    Format seconds as a short human readable duration.
+    """
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+
+    if hours:
+        return f"{hours}h {minutes}m"
+    if minutes:
+        return f"{minutes}m {seconds}s"
+    return f"{seconds}s"
+
+
+def format_count(count: int):
+    """
+    Format a count as 950, 12.3k or 4.5M.
+    """
+    if count >= 1_000_000:
+        return f"{count / 1_000_000:.1f}M"
+    if count >= 1000:
+        return f"{count / 1000:.1f}k"
+    return str(count)
+
+
+# Create a global progress to be shared across all modules
+progress = Progress()
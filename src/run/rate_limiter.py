@@ -0,0 +1,46 @@
+"""
+This module provides a process-wide rate limiter for provider requests, so
+that concurrent workers, watch mode and the documentation service share one
+request budget per API key.
+"""
+
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    Spaces requests evenly to stay under a requests-per-minute limit.
+    A limit of 0 disables rate limiting.
+    """
+
+    def __init__(self, requests_per_minute: float = 0):
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+        self.requests_per_minute = requests_per_minute
+
+    def configure(self, requests_per_minute: float):
+        """
+        Set the requests-per-minute limit.
+        """
+        with self._lock:
+            self.requests_per_minute = requests_per_minute
+
+    def acquire(self):
+        """
+        Block until the next request may be sent.
+        """
+        with self._lock:
+            if self.requests_per_minute <= 0:
+                return
+
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + 60.0 / self.requests_per_minute
+
+        if slot > now:
+            time.sleep(slot - now)
+
+
+# Create a global rate limiter to be shared across all providers
+rate_limiter = RateLimiter()
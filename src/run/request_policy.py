@@ -0,0 +1,228 @@
+"""
+This module bounds the latency of provider requests.  Every request gets a
+deadline, a request still running after the observed p95 latency of its
+model can be hedged with a duplicate, and models that keep timing out are
+reported as failing so that the router can switch to a fallback model.
+"""
+
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from .metrics import metrics, percentile
+from .rate_limiter import rate_limiter
+
+# Latencies kept per model for the hedging threshold
+LATENCY_WINDOW = 200
+
+# No hedging until a model has answered this many requests
+MIN_LATENCY_SAMPLES = 20
+
+# A failing model is tried again after this many seconds
+FAILING_RETRY_INTERVAL = 60.0
+
+
+class RequestPolicy:
+    """
+    Thread-safe deadlines, hedging and timeout tracking for provider requests.
+    """
+
+    def __init__(self, timeout=300.0, hedge_budget=0.0, failing_after=2):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.latencies = defaultdict(lambda: deque(maxlen=LATENCY_WINDOW))
+        self.consecutive_timeouts = defaultdict(int)
+        self.last_timeout = {}
+        self.requests = 0
+        self.hedges = 0
+        self.configure(timeout, hedge_budget, failing_after)
+
+    def configure(self, timeout: float, hedge_budget: float, failing_after: int):
+        """
+        :param timeout: Seconds a request may take, 0 for no deadline.
+        :param hedge_budget: The share of requests that may be hedged, 0 disables hedging.
+        :param failing_after: Consecutive timeouts after which a model is failing.
+        """
+        with self._lock:
+            self.timeout = timeout
+            self.hedge_budget = hedge_budget
+            self.failing_after = failing_after
+
+    def call(self, model: str, send, hedge=True):
+        """
+        Send a request within the deadline, hedging it when it is slow.
+
+        :param model: The model the request is sent to.
+        :param send: A function of the seconds left before the deadline, or
+            None without one, sending the request with that timeout and
+            returning its response.  It runs on the calling thread unless the
+            request may be hedged, then on a thread per attempt, each
+            attempt being admitted by the rate limiter.
+        :param hedge: False to never hedge, for requests that must not be
+            sent twice.
+        :return: The response of the first attempt to succeed.
+        :raise TimeoutError: If no attempt answered before the deadline.
+        """
+        self._local.timed_out = False
+
+        with self._lock:
+            self.requests += 1
+
+        start_time = time.monotonic()
+        deadline = start_time + self.timeout if self.timeout > 0 else None
+        hedge_delay = self.hedge_delay(model) if hedge else None
+
+        # without a hedge to race, the request is sent on the calling thread
+        if hedge_delay is None or not self.can_hedge():
+            try:
+                response = send(self.timeout if self.timeout > 0 else None)
+            except Exception as e:
+                if isinstance(e, TimeoutError) or self.past(deadline):
+                    raise self.timeout_error(model) from e
+                raise
+
+            self.record_latency(model, time.monotonic() - start_time)
+            return response
+
+        attempts = [start_attempt(send, deadline)]
+        error = None
+
+        while attempts:
+            hedge_time = start_time + hedge_delay if len(attempts) == 1 else None
+            wake = min(
+                (t for t in (deadline, hedge_time) if t is not None), default=None
+            )
+            done, _ = wait(
+                attempts,
+                timeout=None if wake is None else max(0.0, wake - time.monotonic()),
+                return_when=FIRST_COMPLETED,
+            )
+
+            for attempt in done:
+                attempts.remove(attempt)
+                if attempt.exception() is None:
+                    self.record_latency(model, attempt.latency)
+                    return attempt.result()
+                error = attempt.exception()
+
+            if self.past(deadline) and attempts:
+                raise self.timeout_error(model)
+
+            if attempts and hedge_time is not None and time.monotonic() >= hedge_time:
+                hedge_delay = None
+                if self.take_hedge():
+                    metrics.add("hedged_requests")
+                    rate_limiter.acquire()
+                    attempts.append(start_attempt(send, deadline))
+
+        # the client gave up at the deadline it was given
+        if self.past(deadline):
+            raise self.timeout_error(model) from error
+
+        raise error
+
+    @staticmethod
+    def past(deadline) -> bool:
+        return deadline is not None and time.monotonic() >= deadline
+
+    def timeout_error(self, model: str) -> TimeoutError:
+        """
+        Record a timeout of a model and return the error to raise for it.
+        """
+        self.record_timeout(model)
+        return TimeoutError(f"{model} did not answer within {self.timeout:.0f}s")
+
+    def hedge_delay(self, model: str):
+        """
+        The p95 latency of a model, or None while hedging is off or the
+        model has answered too few requests.
+        """
+        with self._lock:
+            latencies = list(self.latencies[model])
+
+        if self.hedge_budget <= 0 or len(latencies) < MIN_LATENCY_SAMPLES:
+            return None
+
+        return percentile(latencies, 95)
+
+    def can_hedge(self) -> bool:
+        """
+        True if the budget would allow a hedge of the current request.
+        """
+        with self._lock:
+            return self.hedges + 1 <= self.hedge_budget * self.requests
+
+    def take_hedge(self) -> bool:
+        """
+        Count a hedge if the budget allows one.
+        """
+        with self._lock:
+            if self.hedges + 1 > self.hedge_budget * self.requests:
+                return False
+            self.hedges += 1
+            return True
+
+    def record_latency(self, model: str, latency: float):
+        with self._lock:
+            self.latencies[model].append(latency)
+            self.consecutive_timeouts[model] = 0
+
+    def record_timeout(self, model: str):
+        metrics.add("timeouts")
+        self._local.timed_out = True
+
+        with self._lock:
+            self.consecutive_timeouts[model] += 1
+            self.last_timeout[model] = time.monotonic()
+
+    def timed_out(self) -> bool:
+        """
+        True if the last request of the calling thread hit its deadline.
+        """
+        return getattr(self._local, "timed_out", False)
+
+    def is_failing(self, model: str) -> bool:
+        """
+        True if the last requests to a model timed out.  A failing model is
+        let through again once in a while to find out whether it recovered.
+        """
+        with self._lock:
+            if self.consecutive_timeouts[model] < self.failing_after:
+                return False
+
+            if time.monotonic() - self.last_timeout[model] < FAILING_RETRY_INTERVAL:
+                return True
+
+            # let one request probe the model
+            self.last_timeout[model] = time.monotonic()
+            return False
+
+
+def start_attempt(send, deadline=None):
+    """
+    Run send on a daemon thread, so that a request that never returns does
+    not keep the process alive.  The request is given the time left before
+    the deadline as its timeout, so that the client abandons it as well.
+    :return: A future of its response, with the latency of the attempt.
+    """
+    future = Future()
+    start_time = time.monotonic()
+    timeout = None if deadline is None else max(0.0, deadline - start_time)
+
+    def run():
+        try:
+            response = send(timeout)
+        except BaseException as e:  # pylint: disable=broad-except
+            future.latency = time.monotonic() - start_time
+            future.set_exception(e)
+        else:
+            future.latency = time.monotonic() - start_time
+            future.set_result(response)
+
+    threading.Thread(target=run, daemon=True).start()
+
+    return future
+
+
+# Create a global request policy to be shared across all providers
+request_policy = RequestPolicy()
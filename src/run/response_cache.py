@@ -0,0 +1,68 @@
+"""
+This module provides an in-memory cache of provider responses, shared by
+every job of a process.
+"""
+
+import threading
+from collections import OrderedDict
+
+
+class ResponseCache:
+    """
+    Thread-safe LRU cache of generated documentation.  Concurrent requests for
+    the same key are collapsed: the second caller waits for the first one's
+    result instead of sending a duplicate request.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._in_flight = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key: str, compute):
+        """
+        Return the cached value for key, or compute and cache it.
+        Falsy results (failed generations) are not cached.
+
+        :param key: The cache key.
+        :param compute: A function producing the value.
+        """
+        while True:
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return self._entries[key]
+
+                event = self._in_flight.get(key)
+                if event is None:
+                    event = self._in_flight[key] = threading.Event()
+                    self.misses += 1
+                    break
+
+            # another thread is computing this key, wait for it and retry
+            event.wait()
+
+        try:
+            value = compute()
+
+            if value:
+                with self._lock:
+                    self._entries[key] = value
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+
+            return value
+
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            event.set()
+
+
+# Create a global response cache to be shared across all modules
+response_cache = ResponseCache()
@@ -0,0 +1,123 @@
+"""
+This module runs per-file work on a worker pool in dependency order: a file is
+started only once every file it imports has finished, so that its generated
+documentation can be used as compact context for the files that import it.
+"""
+
+import heapq
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+def run_in_dependency_order(items, dependencies, worker, workers=1, costs=None):
+    """
+    Run worker(item) for every item, dependencies first.
+
+    Items become ready as soon as all of their dependencies are done, rather
+    than when a whole layer is done, which keeps the pool busy.  Import cycles
+    are broken by releasing the waiting item with the fewest unfinished
+    dependencies.
+
+    With costs, the ready item with the longest remaining chain (its own cost
+    plus the costs of the items waiting on it) starts first, so that long
+    work does not start last and leave the other workers idle.
+
+    :param items: The items to process, in their preferred order.
+    :param dependencies: A function returning the items an item depends on.
+    :param worker: The function to run for each item.
+    :param workers: The number of worker threads.
+    :param costs: Optional dict of item to its estimated cost.
+    """
+    items = list(items)
+    known = set(items)
+
+    waiting_on = {
+        item: {dep for dep in dependencies(item) if dep in known} for item in items
+    }
+    waiting_on = {item: deps - {item} for item, deps in waiting_on.items()}
+    dependents = {item: [] for item in items}
+    for item, deps in waiting_on.items():
+        for dep in deps:
+            dependents[dep].append(item)
+
+    order = {item: index for index, item in enumerate(items)}
+    ranks = chain_costs(items, dependents, costs) if costs else {}
+
+    # a heap of ready items, order is unique so items are never compared
+    ready = [
+        (-ranks.get(item, 0), order[item], item)
+        for item in items
+        if not waiting_on[item]
+    ]
+    heapq.heapify(ready)
+    pending = {item for item in items if waiting_on[item]}
+
+    executor = ThreadPoolExecutor(max_workers=max(1, workers))
+    running = {}
+
+    try:
+        while ready or pending or running:
+            if not ready and not running:
+                # only cycles are left, release the least blocked item
+                item = min(
+                    pending, key=lambda item: (len(waiting_on[item]), order[item])
+                )
+                pending.discard(item)
+                heapq.heappush(ready, (-ranks.get(item, 0), order[item], item))
+
+            while ready and len(running) < max(1, workers):
+                item = heapq.heappop(ready)[2]
+                running[executor.submit(worker, item)] = item
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                item = running.pop(future)
+                future.result()
+
+                for dependent in dependents[item]:
+                    waiting_on[dependent].discard(item)
+                    if not waiting_on[dependent] and dependent in pending:
+                        pending.discard(dependent)
+                        heapq.heappush(
+                            ready,
+                            (-ranks.get(dependent, 0), order[dependent], dependent),
+                        )
+
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def chain_costs(items, dependents, costs):
+    """
+    The cost of every item plus the most costly chain of items waiting on it.
+    Edges closing an import cycle are ignored.
+
+    :return: A dict of item to chain cost.
+    """
+    ranks = {}
+    visiting = set()
+
+    for root in items:
+        if root in ranks:
+            continue
+
+        # iterative depth-first search, an item is ranked after its dependents
+        stack = [(root, iter(dependents[root]))]
+        visiting.add(root)
+
+        while stack:
+            item, children = stack[-1]
+            child = next(children, None)
+
+            if child is None:
+                stack.pop()
+                visiting.discard(item)
+                ranks[item] = costs.get(item, 0) + max(
+                    (ranks.get(dependent, 0) for dependent in dependents[item]),
+                    default=0,
+                )
+            elif child not in ranks and child not in visiting:
+                visiting.add(child)
+                stack.append((child, iter(dependents[child])))
+
+    return ranks
@@ -0,0 +1,61 @@
+"""
+This module writes and reads the manifests of sharded runs.  Each shard of a
+run writes one manifest next to the documentation it generated; the merge
+command combines them.
+"""
+
+import json
+import os
+from pathlib import Path
+
+MANIFEST_GLOB = ".doc-buddy-shard-*.json"
+
+
+def shard_name(shard_index: int, shard_count: int) -> str:
+    """
+    The name used for the per-shard files of a run, e.g. "shard-2-of-4".
+    """
+    return f"shard-{shard_index}-of-{shard_count}"
+
+
+def write_shard_manifest(
+    output_path: Path, shard_index: int, shard_count: int, commit_hash: str, results
+):
+    """
+    Writes the manifest of one shard.
+
+    :param output_path: The documentation root.
+    :param shard_index: The 1-based index of the shard.
+    :param shard_count: The total number of shards.
+    :param commit_hash: The commit the shard documented.
+    :param results: A dict of file path (relative to the project root) to
+        True if it was documented successfully.
+    """
+    manifest = {
+        "shard_index": shard_index,
+        "shard_count": shard_count,
+        "commit_hash": commit_hash,
+        "files": {
+            str(path): ("done" if ok else "failed") for path, ok in results.items()
+        },
+    }
+
+    os.makedirs(output_path, exist_ok=True)
+    path = Path(output_path) / f".doc-buddy-{shard_name(shard_index, shard_count)}.json"
+
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(manifest, file, indent=2, sort_keys=True)
+
+
+def read_shard_manifests(output_path: Path):
+    """
+    Reads every shard manifest in the documentation root.
+    :return: A list of manifests ordered by shard index.
+    """
+    manifests = []
+
+    for path in sorted(Path(output_path).glob(MANIFEST_GLOB)):
+        with open(path, "r", encoding="utf-8") as file:
+            manifests.append(json.load(file))
+
+    return sorted(manifests, key=lambda manifest: manifest["shard_index"])
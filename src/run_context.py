@@ -0,0 +1,112 @@
+"""
+This module contains the RunContext class that holds metadata computed once per run
+
+fields:
+    commit_hash             - HEAD or the --ref commit of the target repository (gitmode only)
+    branch                  - checked out branch ("HEAD" when detached) or --ref (gitmode only)
+    dirty                   - True if tracked files have uncommitted changes
+    timestamp               - the time the run started, or SOURCE_DATE_EPOCH if set
+    model                   - the AI model used for the run
+    project_name            - the name of the documented project
+"""
+
+import os
+import subprocess
+from datetime import datetime, timezone
+from pydantic import BaseModel
+from config import config
+from file import git_ref
+
+
+class RunContext(BaseModel):
+    commit_hash: str = ""
+    branch: str = ""
+    dirty: bool = False
+    timestamp: datetime
+    model: str = ""
+    project_name: str = ""
+
+    def __init__(self):
+        commit_hash, branch, dirty = "", "", False
+
+        if config.ref:
+            commit_hash, branch = git_ref.commit, config.ref
+        elif config.gitmode:
+            commit_hash, branch, dirty = self.read_git_status(config.targets_root_path)
+
+        super().__init__(
+            commit_hash=commit_hash,
+            branch=branch,
+            dirty=dirty,
+            timestamp=self.find_timestamp(),
+            model=config.model,
+            project_name=config.project_name,
+        )
+
+    def take(self, other: "RunContext"):
+        """
+        Take over the metadata of another run, such as the next repository of
+        a batch run.
+        """
+        for name, value in other:
+            setattr(self, name, value)
+
+    def read_git_status(self, repo_path):
+        """
+        Reads the commit hash, branch and dirty flag with a single git call.
+        Untracked files are ignored, a stray scratch file does not make the
+        documented revision dirty.
+
+        :param repo_path: Path to the root of the git repository.
+        :return: A tuple of (commit_hash, branch, dirty).
+        """
+        commit_hash, branch, dirty = "", "", False
+
+        try:
+            result = subprocess.run(
+                [
+                    "git",
+                    "-C",
+                    repo_path,
+                    "status",
+                    "--porcelain=v2",
+                    "--branch",
+                    "--untracked-files=no",
+                ],
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+        except (OSError, subprocess.CalledProcessError) as e:
+            print(f"Error running git command: {e}")
+            return commit_hash, branch, dirty
+
+        for line in result.stdout.splitlines():
+            if line.startswith("# branch.oid "):
+                commit_hash = line.split(" ", 2)[2]
+                if commit_hash == "(initial)":
+                    commit_hash = ""
+            elif line.startswith("# branch.head "):
+                branch = line.split(" ", 2)[2]
+                if branch == "(detached)":
+                    branch = "HEAD"
+            elif line and not line.startswith("#"):
+                dirty = True
+
+        return commit_hash, branch, dirty
+
+    def find_timestamp(self):
+        """
+        Returns the run timestamp.  Honors SOURCE_DATE_EPOCH so that repeated
+        runs over the same sources produce byte-identical output.
+        """
+        source_date_epoch = os.getenv("SOURCE_DATE_EPOCH")
+
+        if source_date_epoch:
+            return datetime.fromtimestamp(int(source_date_epoch), tz=timezone.utc)
+
+        return datetime.now()
+
+
+# Create a global run context instance to be shared across all modules
+run_context = RunContext()
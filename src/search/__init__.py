@@ -0,0 +1,12 @@
+# search/__init__.py
+from .tokenize_identifiers import tokenize_identifiers
+from .search_index import SearchIndex, search_index, get_search_index_path
+from .search_docs import search_docs
+
+__all__ = [
+    "tokenize_identifiers",
+    "SearchIndex",
+    "search_index",
+    "get_search_index_path",
+    "search_docs",
+]
@@ -0,0 +1,35 @@
+import time
+from config import config
+from .search_index import SearchIndex
+
+
+def search_docs(query: str, limit: int = 10):
+    """
+    Print the documented files best matching a query, from the search index
+    in the output directory.
+
+    Returns:
+        True if an index was found.
+    """
+    index = SearchIndex(config.output_path)
+
+    if not index.path.exists():
+        print(f"Error: no search index found in '{config.output_path}'.")
+        return False
+
+    start_time = time.time()
+
+    try:
+        results = index.search(query, limit)
+    finally:
+        index.close()
+
+    elapsed_ms = (time.time() - start_time) * 1000
+    print(f"-> {len(results)} results for '{query}' in {elapsed_ms:.1f} ms")
+
+    for path, score, summary in results:
+        print(f"{score:8.2f}  {path}{config.documentation_suffix}")
+        if summary:
+            print(f"          {summary}")
+
+    return True
@@ -0,0 +1,282 @@
+"""
+This module maintains a full-text search index over the generated
+documentation and the symbols of the documented source files.
+
+The index is an inverted index in a SQLite file in the output folder.  It is
+updated one file at a time as files are documented, so a run only touches
+the postings of the files it re-documented, and it is ranked with BM25.
+"""
+
+import math
+import os
+import sqlite3
+import threading
+from collections import Counter
+from pathlib import Path
+from config import config
+from run import shard_name
+from .tokenize_identifiers import tokenize_identifiers
+
+INDEX_FILE_NAME = "doc-buddy-search.sqlite"
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Terms of the path count more than terms of the documentation body
+PATH_WEIGHT = 3
+
+
+class SearchIndex:
+    """
+    Thread-safe BM25 search index stored in SQLite.
+    """
+
+    def __init__(self, output_path: Path, name: str = ""):
+        self.path = get_search_index_path(output_path, name)
+        self._lock = threading.Lock()
+        self._connection = None
+
+    @property
+    def connection(self):
+        # opened on first use, so that runs which document nothing create no index
+        if self._connection is None:
+            os.makedirs(self.path.parent, exist_ok=True)
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS documents (
+                    id INTEGER PRIMARY KEY,
+                    path TEXT UNIQUE NOT NULL,
+                    length INTEGER NOT NULL,
+                    summary TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS postings (
+                    term TEXT NOT NULL,
+                    document INTEGER NOT NULL,
+                    frequency INTEGER NOT NULL,
+                    length INTEGER NOT NULL,
+                    PRIMARY KEY (term, document)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS postings_document ON postings (document);
+                CREATE TABLE IF NOT EXISTS totals (
+                    id INTEGER PRIMARY KEY CHECK (id = 0),
+                    documents INTEGER NOT NULL,
+                    length INTEGER NOT NULL
+                );
+                INSERT OR IGNORE INTO totals (id, documents, length) VALUES (0, 0, 0);
+                """
+            )
+            connection.commit()
+            self._connection = connection
+
+        return self._connection
+
+    def update(self, path: str, documentation: str, symbols: str = ""):
+        """
+        Index a documented file, replacing what was indexed for it before.
+        :param path: The posix path of the source file, relative to the project.
+        :param documentation: The generated documentation of the file.
+        :param symbols: Text naming the symbols of the file, such as its outline.
+        """
+        terms = Counter(tokenize_identifiers(documentation))
+        terms.update(tokenize_identifiers(symbols))
+        for term in tokenize_identifiers(path):
+            terms[term] += PATH_WEIGHT
+
+        # the first line of prose, skipping headings
+        summary = next(
+            (
+                line.strip()
+                for line in documentation.splitlines()
+                if line.strip() and not line.lstrip().startswith("#")
+            ),
+            "",
+        )
+
+        with self._lock:
+            connection = self.connection
+            with connection:
+                self._remove(connection, path)
+                length = sum(terms.values())
+                cursor = connection.execute(
+                    "INSERT INTO documents (path, length, summary) VALUES (?, ?, ?)",
+                    (path, length, summary[:200]),
+                )
+                # the document length is repeated in its postings, so that a
+                # query reads nothing but the postings of its terms
+                connection.executemany(
+                    "INSERT INTO postings (term, document, frequency, length) "
+                    "VALUES (?, ?, ?, ?)",
+                    [
+                        (term, cursor.lastrowid, count, length)
+                        for term, count in terms.items()
+                    ],
+                )
+                connection.execute(
+                    "UPDATE totals SET documents = documents + 1, length = length + ?",
+                    (length,),
+                )
+
+    def remove(self, path: str):
+        """
+        Remove a file from the index.
+        """
+        with self._lock:
+            connection = self.connection
+            with connection:
+                self._remove(connection, path)
+
+    def _remove(self, connection, path: str):
+        row = connection.execute(
+            "SELECT id, length FROM documents WHERE path = ?", (path,)
+        ).fetchone()
+
+        if row is not None:
+            document, length = row
+            connection.execute("DELETE FROM postings WHERE document = ?", (document,))
+            connection.execute("DELETE FROM documents WHERE id = ?", (document,))
+            connection.execute(
+                "UPDATE totals SET documents = documents - 1, length = length - ?",
+                (length,),
+            )
+
+    def search(self, query: str, limit: int = 10):
+        """
+        Rank the indexed files against a query with BM25.
+        :param query: Free text; identifiers are split like indexed text.
+        :param limit: The maximum number of results.
+        :return: A list of (path, score, summary) tuples, best first.
+        """
+        terms = set(tokenize_identifiers(query))
+
+        if not terms:
+            return []
+
+        with self._lock:
+            connection = self.connection
+            count, total_length = connection.execute(
+                "SELECT documents, length FROM totals"
+            ).fetchone()
+
+            if not count:
+                return []
+
+            # postings of a term are contiguous in the primary key, so
+            # document frequencies are cheap range counts
+            idfs = []
+            for term in terms:
+                (frequency,) = connection.execute(
+                    "SELECT COUNT(*) FROM postings WHERE term = ?", (term,)
+                ).fetchone()
+                if frequency:
+                    idfs.append((term, bm25_idf(count, frequency)))
+
+            if not idfs:
+                return []
+
+            # scoring runs inside SQLite, a common term can have a posting
+            # for most documents
+            best = connection.execute(
+                "WITH query (term, idf) AS (VALUES "
+                + ", ".join(["(?, ?)"] * len(idfs))
+                + ") SELECT p.document, SUM(q.idf * p.frequency * ? / "
+                "(p.frequency + ? * (? + ? * p.length))) AS score "
+                "FROM query q JOIN postings p ON p.term = q.term "
+                "GROUP BY p.document ORDER BY score DESC LIMIT ?",
+                [value for pair in idfs for value in pair]
+                + [K1 + 1, K1, 1 - B, B / (total_length / count), limit],
+            ).fetchall()
+            rows = {}
+            if best:
+                placeholders = ",".join("?" * len(best))
+                for document, path, summary in connection.execute(
+                    f"SELECT id, path, summary FROM documents WHERE id IN ({placeholders})",
+                    [document for document, _ in best],
+                ):
+                    rows[document] = (path, summary)
+
+        return [
+            (rows[document][0], score, rows[document][1]) for document, score in best
+        ]
+
+    def merge(self, index_path: Path):
+        """
+        Add every file of another index, such as the index of one shard of a
+        run, replacing what this index holds for the same files.
+        """
+        with self._lock:
+            connection = self.connection
+            connection.execute("ATTACH DATABASE ? AS other", (str(index_path),))
+            try:
+                with connection:
+                    connection.execute(
+                        "DELETE FROM postings WHERE document IN (SELECT id FROM documents "
+                        "WHERE path IN (SELECT path FROM other.documents))"
+                    )
+                    connection.execute(
+                        "DELETE FROM documents WHERE path IN (SELECT path FROM other.documents)"
+                    )
+                    connection.execute(
+                        "INSERT INTO documents (path, length, summary) "
+                        "SELECT path, length, summary FROM other.documents"
+                    )
+                    connection.execute(
+                        "INSERT INTO postings (term, document, frequency, length) "
+                        "SELECT p.term, d.id, p.frequency, p.length FROM other.postings p "
+                        "JOIN other.documents o ON o.id = p.document "
+                        "JOIN documents d ON d.path = o.path"
+                    )
+                    connection.execute(
+                        "UPDATE totals SET documents = (SELECT COUNT(*) FROM documents), "
+                        "length = (SELECT COALESCE(SUM(length), 0) FROM documents)"
+                    )
+            finally:
+                connection.execute("DETACH DATABASE other")
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def reopen(self, output_path: Path, name: str = ""):
+        """
+        Close the index and use the one in another output folder.
+        """
+        self.close()
+        with self._lock:
+            self.path = get_search_index_path(output_path, name)
+
+
+def get_search_index_path(output_path: Path, name: str = ""):
+    """
+    Path of the search index in an output directory.  A name distinguishes
+    the indexes of sharded runs, which "merge" combines.
+    """
+    file_name = f"doc-buddy-search-{name}.sqlite" if name else INDEX_FILE_NAME
+    return Path(output_path) / file_name
+
+
+def bm25_idf(count: int, document_frequency: int) -> float:
+    """
+    BM25 inverse document frequency, never negative.
+    """
+    return math.log(1 + (count - document_frequency + 0.5) / (document_frequency + 0.5))
+
+
+def open_search_index():
+    """
+    The search index in the configured output folder, one per shard.
+    """
+    name = (
+        shard_name(config.shard_index, config.shard_count) if config.shard_count else ""
+    )
+
+    return SearchIndex(config.output_path, name)
+
+
+# Create a global search index to be shared across all modules
+search_index = open_search_index()
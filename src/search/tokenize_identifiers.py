@@ -0,0 +1,66 @@
+import re
+
+IDENTIFIER_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+")
+CAMEL_CASE_BOUNDARY = re.compile(r"(?<=[a-z0-9])(?=[A-Z])|(?<=[A-Z])(?=[A-Z][a-z])")
+
+STOP_WORDS = {
+    "a",
+    "an",
+    "and",
+    "are",
+    "as",
+    "at",
+    "be",
+    "by",
+    "for",
+    "from",
+    "if",
+    "in",
+    "is",
+    "it",
+    "its",
+    "of",
+    "on",
+    "or",
+    "that",
+    "the",
+    "this",
+    "to",
+    "was",
+    "which",
+    "with",
+}
+
+
+def tokenize_identifiers(text: str):
+    """
+    Split text into search terms.  Identifiers are kept whole and also split
+    at underscores and camelCase boundaries, so that "getUserName" and
+    "get_user_name" both match a search for "user".
+
+    Args:
+        text: Source code, documentation or a query.
+
+    Returns:
+        The list of lowercase terms, in order and with repetitions.
+    """
+    terms = []
+
+    for identifier in IDENTIFIER_PATTERN.findall(text or ""):
+        parts = [
+            part.lower()
+            for word in identifier.split("_")
+            for part in CAMEL_CASE_BOUNDARY.split(word)
+            if part
+        ]
+        whole = identifier.strip("_").lower()
+
+        if len(whole) > 1 and whole not in STOP_WORDS:
+            terms.append(whole)
+
+        if len(parts) > 1:
+            terms.extend(
+                part for part in parts if len(part) > 1 and part not in STOP_WORDS
+            )
+
+    return terms
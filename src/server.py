@@ -0,0 +1,322 @@
+"""
+Server mode: a local HTTP/JSON service that documents files submitted by
+editors, CI jobs and pre-commit hooks in one warm process, with one priority
+job queue, one response cache and one rate limiter.  Every job starts by
+bringing the context up to date with the project tree, as watch mode does.
+
+endpoints:
+    POST /jobs              - {"files": [...], "priority": 0} -> the new job
+    GET  /jobs              - all jobs
+    GET  /jobs/<id>         - status and progress of one job
+    GET  /health            - queue length and cache statistics
+"""
+
+import itertools
+import json
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from config import config
+from file import find_files
+from document import generate_doc, generate_toc
+from run import Journal, install_signal_handlers, metrics, response_cache
+from watch import TreeWatcher, refresh_context, remove_stale_docs
+
+
+class Job:
+    """
+    A batch of files submitted together, with per-file status.
+    """
+
+    def __init__(self, job_id: int, files, priority: int):
+        self.id = job_id
+        self.priority = priority
+        self.files = files
+        self.status = {file: "queued" for file in files}
+        self.created = time.time()
+        self.finished = None
+
+    @property
+    def state(self):
+        states = set(self.status.values())
+
+        if states & {"queued", "running"}:
+            return "running" if states - {"queued"} else "queued"
+
+        return "failed" if "failed" in states else "done"
+
+    def to_dict(self):
+        done = sum(1 for status in self.status.values() if status in ("done", "failed"))
+        return {
+            "id": self.id,
+            "state": self.state,
+            "priority": self.priority,
+            "progress": {"done": done, "total": len(self.files)},
+            "files": {
+                str(file.relative_to(config.targets_root_path)): status
+                for file, status in self.status.items()
+            },
+            "created": self.created,
+            "finished": self.finished,
+        }
+
+
+class DocumentationService:
+    """
+    Owns the job queue and the worker threads.  Files of higher priority jobs
+    are documented first; within a priority, jobs are served in order.
+
+    The context shared by the workers (the tree, the file table, the import
+    graph and the related-files index) is only replaced while no file is
+    being documented.
+    """
+
+    def __init__(self, provider, context_files, tree, journal, workers: int):
+        self.provider = provider
+        self.tree = tree
+        self.journal = journal
+        self.workers = workers
+        self.files = find_files()
+        self.watcher = TreeWatcher(config.targets_root_path, context_files)
+        self.toc_stale = False
+        self.jobs = {}
+        self.queue = queue.PriorityQueue()
+        self._lock = threading.Lock()
+        self._job_ids = itertools.count(1)
+        self._sequence = itertools.count()
+        self._refresh_lock = threading.Lock()
+        self._context = threading.Condition()
+        self._replacing = False
+        self._running = 0
+
+    def start(self):
+        for _ in range(self.workers):
+            threading.Thread(target=self.work, daemon=True).start()
+
+    def submit(self, paths, priority: int = 0):
+        """
+        Queue a job.
+        :param paths: File paths, absolute or relative to the project root.
+        :param priority: Higher priorities are served first.
+        :return: The new job.
+        """
+        files = [self.resolve(path) for path in paths]
+
+        with self._lock:
+            job = Job(next(self._job_ids), files, priority)
+            self.jobs[job.id] = job
+
+        for file in files:
+            self.queue.put((-priority, next(self._sequence), job.id, file))
+
+        return job
+
+    def resolve(self, path: str):
+        """
+        Validate that a path names a file inside the project.
+        """
+        root_path = Path(config.targets_root_path)
+        file = (root_path / path).resolve()
+
+        if root_path not in file.parents or not file.is_file():
+            raise ValueError(f"Not a file in the project: {path}")
+
+        return file
+
+    def work(self):
+        while True:
+            _, _, job_id, file = self.queue.get()
+            with self._lock:
+                job = self.jobs[job_id]
+                starting = job.state == "queued"
+                job.status[file] = "running"
+
+            # files created or changed since the last job need fresh context
+            if starting:
+                self.refresh()
+
+            with self._context:
+                self._context.wait_for(lambda: not self._replacing)
+                self._running += 1
+
+            try:
+                succeeded = generate_doc(file, self.provider, self.tree, self.journal)
+            except Exception as e:
+                print(f"An error occurred during execution: {e}")
+                succeeded = False
+            finally:
+                with self._context:
+                    self._running -= 1
+                    self._context.notify_all()
+
+            with self._lock:
+                job.status[file] = "done" if succeeded else "failed"
+                finished = job.state in ("done", "failed")
+                if finished:
+                    job.finished = time.time()
+
+            if finished and self.toc_stale:
+                with self.replacing_context():
+                    if self.toc_stale:
+                        self.toc_stale = False
+                        generate_toc(self.files)
+
+            self.queue.task_done()
+
+    def refresh(self):
+        """
+        Bring the context up to date with the project tree, as watch mode
+        does, so that new files get context and, once documented, an entry in
+        the table of contents.
+        """
+        with self._refresh_lock:
+            changed, removed, listing_changed = self.watcher.poll()
+
+            if not changed and not removed:
+                return
+
+            changed = [file for file in changed if file in self.watcher.file_stats]
+
+            with self.replacing_context():
+                self.tree = refresh_context(self.watcher.files, changed)
+
+                if listing_changed:
+                    self.files = find_files()
+                    remove_stale_docs(removed)
+                    self.toc_stale = True
+
+    @contextmanager
+    def replacing_context(self):
+        """
+        Wait for the files being documented to finish, and hold back the
+        others, while the shared context is replaced.
+        """
+        with self._context:
+            self._context.wait_for(lambda: not self._replacing)
+            self._replacing = True
+            self._context.wait_for(lambda: self._running == 0)
+
+        try:
+            yield
+        finally:
+            with self._context:
+                self._replacing = False
+                self._context.notify_all()
+
+    def job_status(self, job_id):
+        """
+        Snapshot the status of a job while no worker updates it.
+        :return: The job as a dict, or None if there is no such job.
+        """
+        with self._lock:
+            job = self.jobs.get(job_id)
+            return None if job is None else job.to_dict()
+
+    def all_job_status(self):
+        """
+        Snapshot the status of all jobs while no worker updates them.
+        """
+        with self._lock:
+            return [job.to_dict() for job in self.jobs.values()]
+
+    def health(self):
+        with self._lock:
+            jobs = len(self.jobs)
+
+        return {
+            "queued": self.queue.qsize(),
+            "jobs": jobs,
+            "cache": {"hits": response_cache.hits, "misses": response_cache.misses},
+        }
+
+
+def make_handler(service: DocumentationService):
+    """
+    Build the request handler class bound to a service.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/health":
+                self.send_json(200, service.health())
+            elif self.path == "/jobs":
+                self.send_json(200, service.all_job_status())
+            elif self.path.startswith("/jobs/"):
+                job = service.job_status(self.job_id())
+                if job is None:
+                    self.send_json(404, {"error": "No such job."})
+                else:
+                    self.send_json(200, job)
+            else:
+                self.send_json(404, {"error": "Not found."})
+
+        def do_POST(self):
+            if self.path != "/jobs":
+                self.send_json(404, {"error": "Not found."})
+                return
+
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                files = request["files"]
+                if isinstance(files, str) or not files:
+                    raise ValueError("files must be a non-empty list.")
+                job = service.submit(files, int(request.get("priority", 0)))
+            except (KeyError, TypeError, ValueError) as e:
+                self.send_json(400, {"error": str(e)})
+                return
+
+            self.send_json(202, service.job_status(job.id))
+
+        def job_id(self):
+            try:
+                return int(self.path.rsplit("/", 1)[1])
+            except ValueError:
+                return None
+
+        def send_json(self, status: int, body):
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+            return
+
+    return Handler
+
+
+def serve(provider, context_files, context_tree):
+    """
+    Run the documentation service until interrupted.
+
+    Args:
+        provider: The initialized AI provider, shared by all jobs.
+        context_files: The files of the project.
+        context_tree: The rendered context tree of the project.
+    """
+    install_signal_handlers()
+
+    journal = Journal(config.output_path, resume=True)
+    service = DocumentationService(
+        provider, context_files, context_tree, journal, config.workers
+    )
+    service.start()
+
+    server = ThreadingHTTPServer(("127.0.0.1", config.port), make_handler(service))
+
+    print(f"-> Serving documentation jobs on http://127.0.0.1:{config.port}")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n-> Stopping server.")
+    finally:
+        server.server_close()
+        journal.close()
+        metrics.report(config.output_path)
@@ -5,9 +5,16 @@ This module contains utility functions that are used by the main script.
 import os
 import sys
 from pathlib import Path
+from config import config
 from ai_provider.open_ai_provider import OpenAIProvider
 from ai_provider.google_gen_ai_provider import GoogleGenAIProvider
 from ai_provider.vertexai_ai_provider import VertexAIProvider
+from ai_provider.local_ai_provider import LocalAIProvider
+from ai_provider.model_router import ModelRouter
+from run import rate_limiter, request_policy, stop_forking
+
+# The provider of the process, created on first use
+_state = {}
 
 
 def get_absolute_path(file_path: str):
@@ -53,10 +60,39 @@ def read_file(file_path: str, dry_run=False):
 
 def initialize_provider():
     """
-    Initialize the AI provider.
+    Initialize the AI provider, once per process: the repositories of a
+    batch run share it.
     """
+    # a dry run sends nothing, so its provider starts no threads and the
+    # prompts of its forecast can still be built on forked processes
+    if not config.dry_run:
+        stop_forking()
+
+    if "provider" in _state:
+        return _state["provider"]
+
+    rate_limiter.configure(config.rate_limit_rpm)
+    request_policy.configure(
+        config.request_timeout, config.hedge_budget, config.fallback_after_timeouts
+    )
+
+    provider = create_provider(os.getenv("AI_PROVIDER"))
+    fallback = None
+
+    if config.fallback_provider:
+        fallback = create_provider(config.fallback_provider)
+    elif config.fallback_model:
+        fallback = provider
 
-    provider_name = os.getenv("AI_PROVIDER").upper()
+    _state["provider"] = ModelRouter(provider, fallback)
+    return _state["provider"]
+
+
+def create_provider(provider_name: str):
+    """
+    Create the AI provider with the given name.
+    """
+    provider_name = provider_name.upper()
 
     # should work uppercase and lowercase, convert to uppercase
     if provider_name == "GOOGLE-GEMINI":
@@ -71,6 +107,10 @@ def initialize_provider():
         print("-> Using OpenAI provider")
         provider = OpenAIProvider()
 
+    elif provider_name == "LOCAL":
+        print("-> Using local inference provider")
+        provider = LocalAIProvider()
+
     else:
         print("Error: AI provider not found.")
         sys.exit(1)
@@ -0,0 +1,171 @@
+"""
+Watch mode: one long-lived process that keeps the provider clients, the
+context tree, the import graph and the summary cache warm, and re-documents
+files as they change.
+"""
+
+import os
+import time
+from pathlib import Path
+from config import config
+from file import render_tree, find_files, index_files
+from document import document_files, generate_toc, add_readme, output_store
+from analysis import import_graph, context_index
+from run import Journal, install_signal_handlers, metrics
+from search import search_index
+
+POLL_INTERVAL = 1.0
+DEBOUNCE_INTERVAL = 0.5
+
+
+class TreeWatcher:
+    """
+    Detects changed files by polling.  Every poll stats the known files; the
+    file listing itself is only refreshed when the modification time of a
+    directory changes, which is when files are created, renamed or deleted.
+    """
+
+    def __init__(self, root_path: Path, files):
+        self.root_path = root_path
+        self.files = list(files)
+        self.file_stats = self.stat_files(self.files)
+        self.dir_stats = self.stat_dirs(self.files)
+
+    def poll(self):
+        """
+        Compare the tree with the previous poll.
+        :return: A tuple of (changed, removed, listing_changed) where changed
+            lists files added or modified and removed lists deleted files.
+        """
+        files = self.files
+        dir_stats = self.stat_dirs(files)
+        listing_changed = dir_stats != self.dir_stats
+
+        if listing_changed:
+            files = find_files(self.root_path, False)
+            dir_stats = self.stat_dirs(files)
+
+        file_stats = self.stat_files(files)
+        changed = [
+            file for file in files if file_stats[file] != self.file_stats.get(file)
+        ]
+        removed = [file for file in self.files if file not in file_stats]
+        listing_changed = listing_changed and (
+            bool(removed) or any(file not in self.file_stats for file in changed)
+        )
+
+        self.files, self.file_stats, self.dir_stats = files, file_stats, dir_stats
+
+        return changed, removed, listing_changed
+
+    def stat_files(self, files):
+        stats = {}
+        for file in files:
+            try:
+                stat = os.stat(file)
+                stats[file] = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                continue
+        return stats
+
+    def stat_dirs(self, files):
+        directories = {self.root_path} | {Path(file).parent for file in files}
+        return self.stat_files(directories)
+
+
+def watch(provider, context_files, context_tree):
+    """
+    Bring the documentation up to date, then keep re-documenting changed
+    files until interrupted.
+
+    Args:
+        provider: The initialized AI provider, reused for every change.
+        context_files: The files of the project.
+        context_tree: The rendered context tree of the project.
+    """
+    install_signal_handlers()
+
+    files = find_files()
+    journal = Journal(config.output_path, resume=True)
+    watcher = TreeWatcher(config.targets_root_path, context_files)
+
+    try:
+        # catch up with changes made while no watcher was running
+        document_files(files, provider, context_tree, journal)
+        generate_toc(files)
+        add_readme()
+
+        print(f"-> Watching {config.input_path} for changes. Press Ctrl+C to stop.")
+
+        while True:
+            time.sleep(POLL_INTERVAL)
+            changed, removed, listing_changed = watcher.poll()
+
+            if not changed and not removed:
+                continue
+
+            # let a burst of saves settle before documenting anything
+            while True:
+                time.sleep(DEBOUNCE_INTERVAL)
+                more_changed, more_removed, more_listing_changed = watcher.poll()
+
+                if not more_changed and not more_removed:
+                    break
+
+                changed = list(dict.fromkeys(changed + more_changed))
+                removed = list(dict.fromkeys(removed + more_removed))
+                listing_changed = listing_changed or more_listing_changed
+
+            changed = [file for file in changed if file in watcher.file_stats]
+
+            if listing_changed:
+                files = find_files()
+
+            context_tree = refresh_context(watcher.files, changed)
+
+            targets = set(files)
+            to_document = [file for file in changed if file in targets]
+
+            print(f"-> {len(to_document)} changed files to document.")
+            document_files(to_document, provider, context_tree, journal)
+
+            if listing_changed:
+                remove_stale_docs(removed)
+                generate_toc(files)
+
+    except KeyboardInterrupt:
+        print("\n-> Stopping watch mode.")
+
+    finally:
+        journal.close()
+        metrics.report(config.output_path)
+
+
+def refresh_context(files, changed):
+    """
+    Bring the file table, the import graph and the related-files index up to
+    date after files changed, reading only the changed files.
+
+    :param files: The files of the project.
+    :param changed: The files added or modified.
+    :return: The rendered context tree of the project.
+    """
+    index_files(files)
+    context_tree = render_tree(files, False, True, config.targets_root_path)
+    import_graph.update(files, changed)
+    context_index.update(files, changed)
+
+    return context_tree
+
+
+def remove_stale_docs(removed):
+    """
+    Delete the documentation of files that no longer exist.
+    """
+    for file in removed:
+        relative_path = Path(file).relative_to(config.targets_root_path)
+        output_name = relative_path.as_posix() + config.documentation_suffix
+        search_index.remove(relative_path.as_posix())
+
+        if output_store.remove(output_name):
+            print(f"-> Removed documentation for deleted file {relative_path}")
@@ -0,0 +1,25 @@
+"""
+The modules of doc-buddy read the command line and the environment when they
+are first imported, so the tests point them at a throwaway project and output
+folder before any test module imports them.
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+SRC_PATH = Path(__file__).resolve().parent.parent / "src"
+PROJECT_PATH = Path(tempfile.mkdtemp(prefix="doc-buddy-project-"))
+OUTPUT_PATH = Path(tempfile.mkdtemp(prefix="doc-buddy-output-"))
+
+sys.path.insert(0, str(SRC_PATH))
+sys.argv = ["doc-buddy", str(PROJECT_PATH), str(OUTPUT_PATH)]
+os.environ.update(
+    {
+        "USER_CWD": str(PROJECT_PATH),
+        "AI_PROVIDER": "openai",
+        "OPENAI_API_KEY": "test",
+        "AI_MODEL": "test-model",
+    }
+)
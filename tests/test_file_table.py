@@ -0,0 +1,103 @@
+from file.file_table import STATUS_DONE, STATUS_FAILED, STATUS_UNKNOWN, FileTable
+
+ENTRIES = [
+    ("src/main.py", 120, 1_000),
+    ("README.md", 40, 2_000),
+    ("src/util/strings.py", 300, 3_000),
+    ("src/util/__init__.py", 0, 4_000),
+    ("src/app.py", 80, 5_000),
+    ("docs/café.md", 10, 6_000),
+]
+
+
+def build_table():
+    table = FileTable()
+    table.build(ENTRIES)
+    table.record("src/main.py", True, 1.5)
+    table.record("src/util/strings.py", False)
+    return table
+
+
+def test_rows_are_found_by_path():
+    table = build_table()
+
+    assert len(table) == len(ENTRIES)
+    assert sorted(table.paths()) == sorted(path for path, _, _ in ENTRIES)
+    for path, size, mtime in ENTRIES:
+        row = table.row(path)
+        assert table.path(row) == path
+        assert (table.sizes[row], table.mtimes[row]) == (size, mtime)
+
+    assert table.row("src/missing.py") is None
+    assert table.row("missing/main.py") is None
+
+
+def test_files_of_a_directory_stay_together():
+    paths = list(build_table().paths())
+
+    assert paths.index("src/app.py") + 1 == paths.index("src/main.py")
+    assert paths.index("src/util/__init__.py") + 1 == paths.index("src/util/strings.py")
+
+
+def test_round_trip(tmp_path):
+    table = build_table()
+    table_path = tmp_path / "files.bin"
+    table.save(table_path)
+
+    loaded = FileTable.load(table_path)
+    try:
+        assert list(loaded.paths()) == list(table.paths())
+        assert loaded.directories == table.directories
+        # compared as bytes, since unknown latencies are NaN
+        assert [bytes(column) for column in loaded.columns()] == [
+            bytes(column) for column in table.columns()
+        ]
+
+        assert loaded.latency("src/main.py") == 1.5
+        assert loaded.latency("src/app.py") is None
+        assert loaded.statuses[loaded.row("src/main.py")] == STATUS_DONE
+        assert loaded.statuses[loaded.row("src/util/strings.py")] == STATUS_FAILED
+        assert loaded.statuses[loaded.row("README.md")] == STATUS_UNKNOWN
+    finally:
+        loaded.close()
+
+    assert len(loaded) == 0
+    assert not list(loaded.paths())
+
+
+def test_empty_round_trip(tmp_path):
+    table_path = tmp_path / "files.bin"
+    FileTable().save(table_path)
+
+    loaded = FileTable.load(table_path)
+
+    assert len(loaded) == 0
+    assert loaded.row("src/main.py") is None
+    loaded.close()
+
+
+def test_rebuild_keeps_the_outcome_of_remaining_files(tmp_path):
+    table_path = tmp_path / "files.bin"
+    build_table().save(table_path)
+    table = FileTable.load(table_path)
+
+    # a loaded table is rebuilt from itself at the start of the next run
+    table.build([("src/main.py", 130, 7_000), ("src/new.py", 5, 8_000)], table)
+
+    assert list(table.paths()) == ["src/main.py", "src/new.py"]
+    assert table.latency("src/main.py") == 1.5
+    assert table.statuses[table.row("src/main.py")] == STATUS_DONE
+    assert table.latency("src/new.py") is None
+    assert table.sizes[table.row("src/main.py")] == 130
+
+
+def test_load_rejects_invalid_files(tmp_path):
+    assert FileTable.load(tmp_path / "missing.bin") is None
+
+    empty_path = tmp_path / "empty.bin"
+    empty_path.write_bytes(b"")
+    assert FileTable.load(empty_path) is None
+
+    other_path = tmp_path / "other.bin"
+    other_path.write_bytes(b"NOPE" + bytes(100))
+    assert FileTable.load(other_path) is None
@@ -0,0 +1,101 @@
+import importlib
+import pytest
+from config import config
+from document.merge_shards import merge_shards
+from document.output_store import BundleOutput, get_bundle_path, output_store
+from run import shard_name, write_shard_manifest
+from search import SearchIndex, search_index
+
+# the package exports the function under the name of its module
+merge_shards_module = importlib.import_module("document.merge_shards")
+
+
+@pytest.fixture(autouse=True)
+def clean_shards():
+    """
+    The shard files of a test are removed from the shared output folder.
+    """
+    yield
+    for pattern in (".doc-buddy-shard-*.json", "doc-buddy-*-shard-*.sqlite*"):
+        for path in config.output_path.glob(pattern):
+            path.unlink()
+
+
+def write_shard(shard_index: int, shard_count: int, files, bundle=False):
+    """
+    Write what one shard of a run leaves in the output folder: its manifest,
+    its search index and, with bundle, its bundle.
+    """
+    name = shard_name(shard_index, shard_count)
+    write_shard_manifest(config.output_path, shard_index, shard_count, "abc123", files)
+
+    index = SearchIndex(config.output_path, name)
+    store = BundleOutput(config.output_path, name) if bundle else None
+    for path in files:
+        index.update(path, f"Documents {path}.")
+        if store is not None:
+            store.write(f"{path}.md", f"# {path}")
+    index.close()
+    if store is not None:
+        store.close()
+
+
+def test_merges_the_search_indexes_of_all_shards():
+    write_shard(1, 2, {"billing/invoice.py": True})
+    write_shard(2, 2, {"search/ranking.py": True})
+
+    assert merge_shards()
+
+    assert [path for path, _, _ in search_index.search("invoice")] == [
+        "billing/invoice.py"
+    ]
+    assert [path for path, _, _ in search_index.search("ranking")] == [
+        "search/ranking.py"
+    ]
+    assert output_store.exists("index.md")
+    assert output_store.exists("README.txt")
+
+
+def test_merging_again_replaces_the_indexed_files():
+    write_shard(1, 1, {"orders/cart.py": True})
+    assert merge_shards()
+    assert merge_shards()
+
+    assert len(search_index.search("cart")) == 1
+
+
+def test_missing_or_failed_shards_fail_the_merge():
+    write_shard(1, 3, {"users/account.py": True})
+    write_shard(3, 3, {"users/session.py": False})
+
+    assert not merge_shards()
+
+    # the shards that are there are merged all the same
+    assert [path for path, _, _ in search_index.search("account")] == [
+        "users/account.py"
+    ]
+
+
+def test_no_manifests_fail_the_merge():
+    assert not merge_shards()
+
+
+def test_merges_the_bundles_of_all_shards(monkeypatch):
+    bundle = BundleOutput(config.output_path)
+    monkeypatch.setattr(merge_shards_module, "output_store", bundle)
+    write_shard(1, 2, {"api/routes.py": True}, bundle=True)
+    write_shard(2, 2, {"api/models.py": True}, bundle=True)
+
+    try:
+        assert merge_shards()
+        assert bundle.read("api/routes.py.md") == "# api/routes.py"
+        assert bundle.read("api/models.py.md") == "# api/models.py"
+    finally:
+        bundle.close()
+        get_bundle_path(config.output_path).unlink()
+
+
+def test_bundles_need_a_bundle_merge():
+    write_shard(1, 1, {"api/views.py": True}, bundle=True)
+
+    assert not merge_shards()
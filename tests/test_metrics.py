@@ -0,0 +1,31 @@
+from run.metrics import MAX_LATENCIES, RunMetrics
+
+
+def test_calls_are_added_up_per_tier():
+    metrics = RunMetrics()
+    metrics.add("tool_rounds", 2)
+    metrics.record_call("strong", "big", file="src/a.py", latency=2.0, input_tokens=10)
+    metrics.amend("diff_updates")
+    metrics.record_call("fast", "small", file="src/b.py", latency=1.0, failed=True)
+    metrics.record_call("strong", "big", file="src/a.py", latency=4.0, cost=0.5)
+
+    summary = metrics.summarize()
+
+    assert summary["strong"]["files"] == 2
+    assert summary["strong"]["latency_total"] == 6.0
+    assert summary["strong"]["latency_max"] == 4.0
+    assert summary["strong"]["tool_rounds"] == 2
+    assert summary["strong"]["diff_updates"] == 1
+    assert summary["strong"]["cost"] == 0.5
+    assert summary["fast"]["failed"] == 1
+    assert metrics.file_history() == {"src/a.py": {"latency": 6.0, "tool_rounds": 2}}
+
+
+def test_latencies_kept_are_bounded():
+    metrics = RunMetrics()
+
+    for _ in range(MAX_LATENCIES + 10):
+        metrics.record_call("strong", "big", latency=1.0)
+
+    assert len(metrics.tiers["strong"].latencies) == MAX_LATENCIES
+    assert metrics.summarize()["strong"]["files"] == MAX_LATENCIES + 10
@@ -0,0 +1,20 @@
+import importlib
+import os
+
+from run.process_pool import MIN_PARALLEL_ITEMS, map_in_processes, stop_forking
+
+
+def process_id(_item):
+    return os.getpid()
+
+
+def test_runs_in_the_calling_process_once_forking_stopped(monkeypatch):
+    module = importlib.import_module("run.process_pool")
+    monkeypatch.setitem(module._state, "can_fork", True)
+    items = range(MIN_PARALLEL_ITEMS * 2)
+
+    assert os.getpid() not in map_in_processes(process_id, items, processes=2)
+
+    stop_forking()
+
+    assert set(map_in_processes(process_id, items, processes=2)) == {os.getpid()}
@@ -0,0 +1,58 @@
+import importlib
+import threading
+import time
+
+import pytest
+
+from run.request_policy import MIN_LATENCY_SAMPLES, RequestPolicy
+
+
+def warm_up(policy, model, latency=0.01):
+    for _ in range(MIN_LATENCY_SAMPLES):
+        policy.record_latency(model, latency)
+
+
+def test_sends_on_the_calling_thread_without_hedging():
+    policy = RequestPolicy(timeout=5.0)
+    threads = []
+
+    def send(timeout):
+        threads.append(threading.current_thread())
+        return timeout
+
+    assert policy.call("big", send) == 5.0
+    assert threads == [threading.current_thread()]
+
+
+def test_hedges_a_slow_request_through_the_rate_limiter(monkeypatch):
+    policy = RequestPolicy(timeout=5.0, hedge_budget=1.0)
+    warm_up(policy, "big")
+    acquired = []
+    module = importlib.import_module("run.request_policy")
+    monkeypatch.setattr(module.rate_limiter, "acquire", lambda: acquired.append(1))
+    sent = []
+
+    def send(_timeout):
+        sent.append(threading.current_thread())
+        if len(sent) == 1:
+            time.sleep(0.5)
+            return "slow"
+        return "hedged"
+
+    assert policy.call("big", send) == "hedged"
+    assert len(sent) == 2 and threading.current_thread() not in sent
+    assert acquired == [1]
+
+
+def test_a_client_timeout_past_the_deadline_is_a_timeout():
+    policy = RequestPolicy(timeout=0.05)
+
+    def send(timeout):
+        time.sleep(timeout)
+        raise RuntimeError("client gave up")
+
+    with pytest.raises(TimeoutError):
+        policy.call("big", send)
+
+    assert policy.timed_out()
+    assert policy.consecutive_timeouts["big"] == 1
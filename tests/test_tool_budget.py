@@ -0,0 +1,142 @@
+import json
+from ai_provider.tool_budget import SUMMARY_CHARS, ToolBudget
+
+
+def make_budget(rounds=0, input_tokens=0, seconds=0, compact_after=0):
+    """
+    A budget with the given limits, 0 for no limit.
+    """
+    return ToolBudget(rounds, input_tokens, seconds, compact_after)
+
+
+def test_stops_after_the_round_limit():
+    budget = make_budget(rounds=2)
+
+    assert budget.allows_tools()
+    budget.record_round()
+    assert budget.allows_tools()
+    budget.record_round()
+
+    assert not budget.allows_tools()
+    assert budget.exhausted == "2 tool rounds"
+
+
+def test_zero_is_no_limit():
+    budget = make_budget()
+
+    for _ in range(50):
+        budget.record_round()
+        budget.record_request("x" * 10000)
+
+    assert budget.allows_tools()
+    assert not budget.should_compact()
+
+
+def test_stops_at_the_input_token_limit():
+    budget = make_budget(input_tokens=100)
+
+    budget.record_request("word " * 10)
+    assert budget.allows_tools()
+
+    budget.record_request("word " * 1000)
+    assert not budget.allows_tools()
+    assert budget.exhausted.endswith("input tokens")
+
+
+def test_stops_at_the_time_limit():
+    budget = make_budget(seconds=1)
+    budget.start_time -= 2
+
+    assert not budget.allows_tools()
+
+
+def test_final_answer_is_due_once_after_a_stop():
+    budget = make_budget(rounds=1)
+
+    assert budget.allows_tools()
+    assert not budget.final_answer_due()
+
+    budget.record_round()
+    assert not budget.allows_tools()
+    assert budget.final_answer_due()
+    assert not budget.final_answer_due()
+
+
+def test_no_final_answer_prompt_when_the_tool_was_never_offered():
+    budget = make_budget(input_tokens=10)
+    budget.record_request("word " * 100)
+
+    assert not budget.allows_tools()
+    assert not budget.final_answer_due()
+
+
+def test_compacts_after_the_given_rounds():
+    budget = make_budget(compact_after=2)
+
+    budget.record_round()
+    budget.record_round()
+    assert not budget.should_compact()
+
+    budget.record_round()
+    assert budget.should_compact()
+
+
+def test_compact_messages_summarizes_tool_results():
+    budget = make_budget(compact_after=1)
+    contents = "line\n" * 200
+    results = [
+        {"file_path": "src/a.py", "contents": contents},
+        {"file_path": "src/b.py", "error": "File not found."},
+    ]
+    messages = [
+        {"role": "user", "content": "Document src/main.py"},
+        {"role": "tool", "content": json.dumps(results)},
+        {"role": "tool", "content": "not json"},
+        {"role": "assistant", "content": None},
+        {"role": "tool", "content": json.dumps(results)},
+    ]
+
+    budget.compact_messages(messages)
+
+    assert messages[0]["content"] == "Document src/main.py"
+    assert messages[2]["content"] == "not json"
+
+    compacted = json.loads(messages[1]["content"])
+    assert compacted[0]["file_path"] == "src/a.py"
+    assert compacted[0]["summary"] == contents[:SUMMARY_CHARS] + "..."
+    assert "contents" not in compacted[0]
+    assert compacted[1] == results[1]
+
+    # the results of the last round are kept
+    assert json.loads(messages[4]["content"]) == results
+
+    # results compacted before are left as they are
+    assert budget.compact_results(compacted) == compacted
+
+
+def tool_results(*paths):
+    return {
+        "role": "tool",
+        "content": json.dumps(
+            [{"file_path": path, "contents": "x = 1"} for path in paths]
+        ),
+    }
+
+
+def test_compacts_only_results_older_than_the_given_rounds():
+    budget = make_budget(compact_after=2)
+    messages = [{"role": "user", "content": "Document src/main.py"}]
+    for round_index in range(1, 5):
+        messages.append({"role": "assistant", "content": f"round {round_index}"})
+        messages.append(tool_results(f"src/a{round_index}.py"))
+        messages.append(tool_results(f"src/b{round_index}.py"))
+
+    budget.compact_messages(messages)
+
+    compacted = [
+        "contents" not in json.loads(message["content"])[0]
+        for message in messages
+        if message["role"] == "tool"
+    ]
+    # the results of rounds 1 and 2 are compacted, those of rounds 3 and 4 kept
+    assert compacted == [True, True, True, True, False, False, False, False]
@@ -0,0 +1,77 @@
+from document.update_doc import DELETE_SECTION, NO_CHANGES, apply_sections
+
+DOCUMENTATION = """Parses the settings file.
+
+## Functions
+
+### load
+
+Reads the file.
+
+### save
+
+Writes the file.
+"""
+
+
+def test_replaces_a_section_and_keeps_its_separator():
+    updated = apply_sections(DOCUMENTATION, "### load\n\nReads and validates the file.")
+
+    assert updated == DOCUMENTATION.replace(
+        "Reads the file.", "Reads and validates the file."
+    )
+
+
+def test_keeps_a_section_without_blank_line_after_its_heading():
+    documentation = "## Usage\nRun it.\n\n## Notes\nNone.\n"
+
+    updated = apply_sections(documentation, "## Usage\n\nRun it twice.")
+
+    assert updated == "## Usage\nRun it twice.\n\n## Notes\nNone.\n"
+
+
+def test_inserts_a_new_section_after_the_previous_reply():
+    updated = apply_sections(
+        DOCUMENTATION, "### load\n\nReads the file.\n\n### reload\n\nReads it again."
+    )
+
+    assert updated.index("### load") < updated.index("### reload")
+    assert updated.index("### reload") < updated.index("### save")
+    assert "\n### reload\n\nReads it again.\n\n### save" in updated
+
+
+def test_appends_a_new_section_when_nothing_was_replaced():
+    updated = apply_sections(DOCUMENTATION, "## Examples\n\nload()")
+
+    assert updated.endswith("Writes the file.\n\n## Examples\n\nload()\n")
+
+
+def test_deletes_a_section():
+    updated = apply_sections(DOCUMENTATION, f"### save\n\n{DELETE_SECTION}")
+
+    assert "### save" not in updated
+    assert updated.endswith("Reads the file.\n")
+
+
+def test_replaces_the_introduction():
+    updated = apply_sections(DOCUMENTATION, "(introduction)\n\nLoads the settings.")
+
+    assert updated.startswith("Loads the settings.\n\n## Functions\n")
+
+
+def test_ignores_headings_in_code_blocks():
+    documentation = "## Example\n\n```\n# not a heading\n```\n\n## Notes\n\nNone.\n"
+
+    updated = apply_sections(documentation, "## Notes\n\nSome.")
+
+    assert updated == documentation.replace("None.", "Some.")
+
+
+def test_no_changes_returns_the_documentation():
+    assert apply_sections(DOCUMENTATION, f"{NO_CHANGES}.") == DOCUMENTATION
+
+
+def test_unusable_replies_return_none():
+    assert apply_sections(DOCUMENTATION, None) is None
+    assert apply_sections(DOCUMENTATION, "The file now validates its input.") is None
+    assert apply_sections(DOCUMENTATION, "Changed:\n\n### load\n\nNew.") is None